@@ -0,0 +1,125 @@
+"""回测数据 — 本地日K存储对齐成 (股票 × 交易日) 面板, 附 data_history 中的行情快照"""
+from __future__ import annotations
+import json
+import logging
+import sys
+from collections import defaultdict
+from pathlib import Path
+import numpy as np
+from db import get_db
+
+# 把 scripts/ 加入 sys.path 以便 import akshare_service
+_scripts_dir = str(Path(__file__).resolve().parent.parent.parent / "scripts")
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+
+import akshare_service as aks  # noqa: E402
+from kline_store import COL, date_to_int, int_to_date  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+PANEL_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+class BacktestData:
+    """回测输入: 各面板为 [股票, 交易日] 的 float64 数组, 停牌 / 未上市处为 NaN
+
+    snapshots[t] 为第 t 个交易日最后一份持久化的行情 dict (按代码), 用于补充K线没有的字段 (名称 / PE / 换手率 ...)。
+    """
+
+    def __init__(
+        self,
+        codes: list[str],
+        dates: np.ndarray,
+        open: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+        names: list[str] | None = None,
+    ) -> None:
+        self.codes = list(codes)
+        self.names = list(names) if names else [""] * len(codes)
+        self.dates = np.asarray(dates, dtype=np.int64)   # yyyymmdd, 升序
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.index = {c: i for i, c in enumerate(self.codes)}
+        self.snapshots: dict[int, dict[str, dict]] = {}
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.close.shape
+
+    def date_str(self, t: int) -> str:
+        return int_to_date(self.dates[t])
+
+    def slice(self, start: int, end: int) -> "BacktestData":
+        """交易日下标 [start, end) 的子区间 (面板为视图)"""
+        sub = BacktestData(
+            self.codes, self.dates[start:end],
+            *(getattr(self, f)[:, start:end] for f in PANEL_FIELDS),
+            names=self.names,
+        )
+        sub.snapshots = {t - start: s for t, s in self.snapshots.items() if start <= t < end}
+        return sub
+
+    @classmethod
+    def from_bars(cls, bars_by_code: dict, start: str | None = None, end: str | None = None) -> "BacktestData":
+        """{code: KlineBars} → 按全部交易日对齐的面板; start / end 为 YYYY-MM-DD (含)"""
+        bars_by_code = {c: b for c, b in bars_by_code.items() if b is not None and len(b)}
+        if not bars_by_code:
+            dates = np.zeros(0, dtype=np.int64)
+        else:
+            dates = np.unique(np.concatenate([b.date for b in bars_by_code.values()]).astype(np.int64))
+        if start:
+            dates = dates[dates >= date_to_int(start)]
+        if end:
+            dates = dates[dates <= date_to_int(end)]
+
+        codes = list(bars_by_code)
+        panels = {f: np.full((len(codes), len(dates)), np.nan) for f in PANEL_FIELDS}
+        for i, code in enumerate(codes):
+            bars = bars_by_code[code]
+            d = bars.date.astype(np.int64)
+            keep = (d >= dates[0]) & (d <= dates[-1]) if len(dates) else np.zeros(len(d), dtype=bool)
+            cols = np.searchsorted(dates, d[keep])
+            for f in PANEL_FIELDS:
+                panels[f][i, cols] = bars.data[COL[f], keep]
+        return cls(codes, dates, **panels)
+
+    @classmethod
+    def from_kline_store(cls, codes: list[str], start: str | None = None, end: str | None = None) -> "BacktestData":
+        """读取本地日K存储 (不联网); 本地没有的代码跳过"""
+        bars = {code: aks.cached_kline_bars(code) for code in codes}
+        missing = [c for c, b in bars.items() if b is None]
+        if missing:
+            logger.warning("回测: %d 只股票无本地日K, 已跳过", len(missing))
+        return cls.from_bars(bars, start, end)
+
+    async def load_snapshots(self, data_type: str = "quote") -> int:
+        """从 data_history 读取回测区间内的行情快照, 每个交易日每只股票保留最后一份; 返回命中的交易日数"""
+        if not len(self.dates):
+            return 0
+        db = await get_db()
+        cur = await db.execute(
+            """SELECT snapshot_time, stock_code, data_json FROM data_history
+               WHERE data_type = ? AND snapshot_time BETWEEN ? AND ?
+               ORDER BY snapshot_time""",
+            (data_type, f"{self.date_str(0)} 00:00:00", f"{self.date_str(-1)} 23:59:59"),
+        )
+        day_index = {int(d): t for t, d in enumerate(self.dates)}
+        snapshots: dict[int, dict[str, dict]] = defaultdict(dict)
+        for snapshot_time, code, data_json in await cur.fetchall():
+            t = day_index.get(date_to_int(snapshot_time[:10]))
+            if t is None or code not in self.index:
+                continue
+            snapshots[t][code] = json.loads(data_json)
+        self.snapshots = dict(snapshots)
+        for quotes in self.snapshots.values():
+            for code, q in quotes.items():
+                if q.get("name") and not self.names[self.index[code]]:
+                    self.names[self.index[code]] = q["name"]
+        return len(self.snapshots)
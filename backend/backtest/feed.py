@@ -0,0 +1,140 @@
+"""回测数据源 — 按游标 (交易日下标) 提供时点数据, 策略只能看到当日收盘及以前的信息"""
+from __future__ import annotations
+import sys
+from pathlib import Path
+import numpy as np
+from strategies.data_feed import DataFeed
+from backtest.data import BacktestData
+
+# 把 scripts/ 加入 sys.path 以便 import indicators
+_scripts_dir = str(Path(__file__).resolve().parent.parent.parent / "scripts")
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+
+import indicators  # noqa: E402
+from indicator_stream import EXTREMUM_WINDOW, MA_WINDOWS, VOL_MIN_RETURNS, VOL_WINDOW  # noqa: E402
+from kline_store import int_to_date  # noqa: E402
+from quote_frame import QuoteFrame  # noqa: E402
+
+# 快照中K线没有的字段, 取当日或之前最近一份快照的值
+_SNAPSHOT_FIELDS = ("name", "amount", "turnoverRate", "pe", "pb")
+
+
+def _ffill(x: np.ndarray) -> np.ndarray:
+    """沿交易日向前填充 NaN"""
+    valid = ~np.isnan(x)
+    idx = np.where(valid, np.arange(x.shape[-1]), 0)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    return np.take_along_axis(x, idx, axis=-1)
+
+
+class BacktestFeed(DataFeed):
+    """DataFeed 的回测实现; 指标与实盘流式指标同口径, 按每只股票自身的K线序列预先算好"""
+
+    def __init__(self, data: BacktestData) -> None:
+        self.data = data
+        self.t = 0
+        self._static: dict[str, dict] = {}
+        self._static_t = -1
+        self._prev_close = np.concatenate(
+            [np.full((len(data.codes), 1), np.nan), _ffill(data.close)[:, :-1]], axis=1,
+        )
+        self._indicators = self._precompute()
+
+    def _precompute(self) -> dict[str, np.ndarray]:
+        d = self.data
+        keys = [f"ma{w}" for w in MA_WINDOWS] + ["volatility", "support", "resistance", "bars"]
+        out = {k: np.full(d.shape, np.nan) for k in keys}
+        for i in range(len(d.codes)):
+            cols = np.flatnonzero(~np.isnan(d.close[i]))
+            if not len(cols):
+                continue
+            close = d.close[i, cols]
+            for w in MA_WINDOWS:
+                out[f"ma{w}"][i, cols] = indicators.sma(close, w)
+            out["volatility"][i, cols] = indicators.rolling_volatility(close, VOL_WINDOW, min_returns=VOL_MIN_RETURNS)
+            out["support"][i, cols] = indicators.rolling_min(d.low[i, cols], EXTREMUM_WINDOW)
+            out["resistance"][i, cols] = indicators.rolling_max(d.high[i, cols], EXTREMUM_WINDOW)
+            out["bars"][i, cols] = np.arange(1, len(cols) + 1)
+        out["close"] = d.close
+        out["date"] = np.where(np.isnan(d.close), np.nan, d.dates.astype(np.float64))
+        # 停牌日沿用最近一根K线的指标
+        return {k: _ffill(v) for k, v in out.items()}
+
+    def at(self, t: int) -> "BacktestFeed":
+        self.t = t
+        return self
+
+    def _snapshot_fields(self) -> dict[str, dict]:
+        """截至当前交易日的最近快照字段 (游标前进时增量合并)"""
+        if self.t < self._static_t:
+            self._static, self._static_t = {}, -1
+        for t in range(self._static_t + 1, self.t + 1):
+            for code, q in self.data.snapshots.get(t, {}).items():
+                self._static[code] = {k: q[k] for k in _SNAPSHOT_FIELDS if k in q}
+        self._static_t = self.t
+        return self._static
+
+    async def stock_pool(self, codes: list[str] | None = None) -> list[dict]:
+        """当日有K线的股票 (停牌的不在池中), 价格为当日收盘"""
+        d, t = self.data, self.t
+        rows = np.arange(len(d.codes)) if codes is None else np.array(
+            [d.index[c] for c in codes if c in d.index], dtype=np.int64)
+        rows = rows[~np.isnan(d.close[rows, t])]
+        static = self._snapshot_fields()
+        pool = []
+        for i, o, h, l, c, v, pc in zip(
+            rows.tolist(), *(x[rows, t].tolist() for x in (d.open, d.high, d.low, d.close, d.volume)),
+            self._prev_close[rows, t].tolist(),
+        ):
+            code = d.codes[i]
+            pc = c if pc != pc else pc   # 首日无前收
+            quote = {
+                "code": code, "name": d.names[i], "price": c,
+                "change": round(c - pc, 4), "changePercent": round((c / pc - 1) * 100, 2) if pc else 0.0,
+                "volume": int(v), "amount": 0.0, "high": h, "low": l, "open": o, "prevClose": pc,
+                "turnoverRate": 0.0, "pe": 0.0, "pb": 0.0,
+            }
+            quote.update(static.get(code, {}))
+            pool.append(quote)
+        return pool
+
+    async def quote_frame(self):
+        return QuoteFrame.from_dicts(await self.stock_pool())
+
+    def _indicator_rows(self, rows: list[int]) -> list[dict]:
+        t = self.t
+        cols = {k: v[rows, t].tolist() for k, v in self._indicators.items()}
+        out = []
+        for values in zip(*cols.values()):
+            row = {k: (None if x != x else x) for k, x in zip(cols, values)}
+            row["bars"] = int(row["bars"] or 0)
+            if row["date"] is not None:
+                row["date"] = int(row["date"])
+            out.append(row)
+        return out
+
+    async def indicators(self, code: str) -> dict:
+        i = self.data.index.get(code)
+        if i is None:
+            raise KeyError(code)
+        return self._indicator_rows([i])[0]
+
+    async def indicators_many(self, codes: list[str]) -> dict[str, dict]:
+        """整列切片, 不逐只创建协程"""
+        codes = [c for c in codes if c in self.data.index]
+        return dict(zip(codes, self._indicator_rows([self.data.index[c] for c in codes])))
+
+    async def kline(self, code: str, count: int = 30) -> list[dict]:
+        i = self.data.index.get(code)
+        if i is None:
+            return []
+        d = self.data
+        cols = np.flatnonzero(~np.isnan(d.close[i, : self.t + 1]))[-count:]
+        return [
+            {"date": int_to_date(dt), "open": o, "close": c, "high": h, "low": l, "volume": int(v)}
+            for dt, o, c, h, l, v in zip(
+                d.dates[cols].tolist(),
+                *(x[i, cols].tolist() for x in (d.open, d.close, d.high, d.low, d.volume)),
+            )
+        ]
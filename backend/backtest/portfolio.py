@@ -0,0 +1,206 @@
+"""组合模拟 — 目标权重 → 次日开盘成交, 按日推进、全股票池向量化
+
+成交规则与实盘一致: 整手、T+1 (当日买入不可卖)、佣金 (含最低收费) + 卖出印花税,
+以及 RiskManager 的各项限制 (单笔金额、单票仓位、日内笔数、ST 拦截、可卖数量、现金充足)。
+"""
+from __future__ import annotations
+import math
+from dataclasses import dataclass, field
+import numpy as np
+from config import settings
+
+TRADING_DAYS = 252
+
+
+@dataclass
+class CostModel:
+    commission: float = 0.00025     # 佣金费率 (双向)
+    min_commission: float = 5.0     # 单笔最低佣金 (元)
+    stamp_duty: float = 0.0005      # 印花税 (仅卖出)
+    slippage: float = 0.0           # 成交价滑点 (比例, 买入上浮 / 卖出下浮)
+
+    def fees(self, notional: np.ndarray, sell: bool) -> np.ndarray:
+        fee = np.maximum(notional * self.commission, self.min_commission)
+        if sell:
+            fee = fee + notional * self.stamp_duty
+        return np.where(notional > 0, fee, 0.0)
+
+
+@dataclass
+class RiskLimits:
+    """RiskManager 规则的回测版 (交易时段规则对日K回测不适用); 取值为 None 表示不限制"""
+    lot_size: int = 100
+    max_order_amount: float | None = None
+    max_position_ratio: float | None = None
+    max_daily_orders: int | None = None
+    block_st: bool = True
+
+    @classmethod
+    def from_settings(cls) -> "RiskLimits":
+        return cls(
+            lot_size=settings.lot_size,
+            max_order_amount=settings.max_single_order_amount,
+            max_position_ratio=settings.max_position_ratio,
+            max_daily_orders=settings.max_daily_orders,
+            block_st=settings.block_st,
+        )
+
+
+@dataclass
+class PortfolioResult:
+    dates: np.ndarray
+    nav: np.ndarray                 # 每日收盘总资产
+    cash: np.ndarray
+    turnover: np.ndarray            # 每日成交额 / 2 / 当日总资产 (单边换手)
+    fees: np.ndarray
+    trades: np.ndarray              # 每日成交笔数
+    rejected: int = 0               # 被风控限制削减或拒绝的委托数
+    positions: dict[str, int] = field(default_factory=dict)   # 期末持仓 (股)
+
+    def drawdown(self) -> np.ndarray:
+        return self.nav / np.maximum.accumulate(self.nav) - 1
+
+    def metrics(self) -> dict:
+        nav = self.nav
+        days = len(nav)
+        if days < 2 or nav[0] <= 0:
+            return {"days": days}
+        rets = nav[1:] / nav[:-1] - 1
+        std = rets.std()
+        total = nav[-1] / nav[0] - 1
+        return {
+            "days": days,
+            "totalReturn": round(float(total), 6),
+            "annualReturn": round(float((nav[-1] / nav[0]) ** (TRADING_DAYS / (days - 1)) - 1), 6),
+            "annualVolatility": round(float(std * math.sqrt(TRADING_DAYS)), 6),
+            "sharpe": round(float(rets.mean() / std * math.sqrt(TRADING_DAYS)), 4) if std > 0 else None,
+            "maxDrawdown": round(float(self.drawdown().min()), 6),
+            "annualTurnover": round(float(self.turnover.mean() * TRADING_DAYS), 4),
+            "fees": round(float(self.fees.sum()), 2),
+            "trades": int(self.trades.sum()),
+            "rejected": self.rejected,
+            "finalNav": round(float(nav[-1]), 2),
+        }
+
+
+def _lots(shares: np.ndarray, lot: int) -> np.ndarray:
+    return np.floor(np.maximum(shares, 0) / lot) * lot
+
+
+def simulate(
+    data,
+    targets: dict[int, np.ndarray],
+    initial_cash: float = 1_000_000.0,
+    cost: CostModel | None = None,
+    limits: RiskLimits | None = None,
+) -> PortfolioResult:
+    """targets[t] 为第 t 日收盘后决定的目标权重 (NaN=保持现有持仓), 于 t+1 日开盘成交"""
+    cost = cost or CostModel()
+    limits = limits or RiskLimits()
+    lot = limits.lot_size
+    n, days = data.shape
+    st = np.array(["ST" in (name or "").upper() for name in data.names]) if limits.block_st else np.zeros(n, bool)
+
+    shares = np.zeros(n)
+    cash = float(initial_cash)
+    last_px = np.full(n, np.nan)
+    nav = np.zeros(days)
+    cash_hist = np.zeros(days)
+    turnover = np.zeros(days)
+    fees_hist = np.zeros(days)
+    trades = np.zeros(days, dtype=np.int64)
+    rejected = 0
+
+    for t in range(days):
+        open_px = data.open[:, t]
+        target = targets.get(t - 1)
+        if target is not None:
+            tradable = ~np.isnan(open_px) & (open_px > 0)
+            px = np.where(tradable, open_px, 0.0)
+            mark = np.where(np.isnan(last_px), 0.0, last_px)
+            mark = np.where(tradable, open_px, mark)
+            total = cash + shares @ mark
+
+            keep = np.isnan(target)
+            weight = np.where(keep, 0.0, target)
+            if limits.max_position_ratio is not None:
+                weight = np.minimum(weight, limits.max_position_ratio)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                desired = np.where(tradable, _lots(weight * total / px, lot), shares)
+            desired = np.where(keep | ~tradable, shares, desired)
+            delta = desired - shares
+            # ST 拦截: 不新增买入
+            delta = np.where(st & (delta > 0), 0.0, delta)
+            # 单笔金额上限: 截到上限内的整手数
+            if limits.max_order_amount is not None:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    cap = np.where(tradable, _lots(limits.max_order_amount / px, lot), 0.0)
+                clipped = np.abs(delta) > cap
+                rejected += int(clipped.sum())
+                delta = np.sign(delta) * np.minimum(np.abs(delta), cap)
+            # 可卖数量 (T+1): 只能卖出开盘前已持有的股数
+            delta = np.maximum(delta, -shares)
+
+            sell = delta < 0
+            buy = delta > 0
+            # 日内笔数上限: 先卖后买, 同方向按成交额从大到小保留
+            if limits.max_daily_orders is not None:
+                notional = np.abs(delta) * px
+                order = np.concatenate([
+                    np.flatnonzero(sell)[np.argsort(-notional[sell], kind="stable")],
+                    np.flatnonzero(buy)[np.argsort(-notional[buy], kind="stable")],
+                ])
+                dropped = order[limits.max_daily_orders:]
+                rejected += len(dropped)
+                delta[dropped] = 0.0
+                sell, buy = delta < 0, delta > 0
+
+            # 卖出
+            sell_px = px * (1 - cost.slippage)
+            sell_notional = np.where(sell, -delta * sell_px, 0.0)
+            sell_fees = cost.fees(sell_notional, sell=True)
+            cash += sell_notional.sum() - sell_fees.sum()
+            shares = shares + np.where(sell, delta, 0.0)
+
+            # 买入: 现金不足时等比缩减, 仍不足则放弃成交额最小的委托
+            buy_px = px * (1 + cost.slippage)
+            qty = np.where(buy, delta, 0.0)
+            # 单票仓位上限 (按成交后市值 / 总资产)
+            if limits.max_position_ratio is not None:
+                room = _lots((limits.max_position_ratio * total - shares * mark) / np.where(buy, buy_px, 1.0), lot)
+                over = buy & (qty > room)
+                rejected += int(over.sum())
+                qty = np.where(over, room, qty)
+            need = qty * buy_px
+            spend = need.sum() + cost.fees(need, sell=False).sum()
+            if spend > cash and spend > 0:
+                qty = _lots(qty * (cash / spend), lot)
+                need = qty * buy_px
+                fees = cost.fees(need, sell=False)
+                for i in np.flatnonzero(qty > 0)[np.argsort(need[qty > 0], kind="stable")]:
+                    if need.sum() + fees.sum() <= cash:
+                        break
+                    qty[i], need[i], fees[i] = 0.0, 0.0, 0.0
+                    rejected += 1
+            buy_fees = cost.fees(need, sell=False)
+            cash -= need.sum() + buy_fees.sum()
+            shares = shares + qty
+
+            traded = sell_notional.sum() + need.sum()
+            fees_hist[t] = sell_fees.sum() + buy_fees.sum()
+            trades[t] = int(sell.sum() + (qty > 0).sum())
+            turnover[t] = traded / 2
+
+        close_px = data.close[:, t]
+        last_px = np.where(np.isnan(close_px), last_px, close_px)
+        nav[t] = cash + shares @ np.where(np.isnan(last_px), 0.0, last_px)
+        cash_hist[t] = cash
+        if nav[t] > 0:
+            turnover[t] /= nav[t]
+
+    held = np.flatnonzero(shares > 0)
+    return PortfolioResult(
+        dates=data.dates, nav=nav, cash=cash_hist, turnover=turnover, fees=fees_hist,
+        trades=trades, rejected=rejected,
+        positions={data.codes[i]: int(shares[i]) for i in held},
+    )
@@ -0,0 +1,101 @@
+"""回测运行器 — 逐个调仓日把时点数据喂给策略, 信号转为目标权重后交给组合模拟"""
+from __future__ import annotations
+import copy
+import logging
+import time
+from dataclasses import dataclass
+import numpy as np
+from strategies.base import BaseStrategy, StrategySignal
+from backtest.data import BacktestData
+from backtest.feed import BacktestFeed
+from backtest.portfolio import CostModel, PortfolioResult, RiskLimits, simulate
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BacktestResult:
+    strategy: str
+    portfolio: PortfolioResult
+    rebalances: int
+    signals: int
+    elapsed: float                  # 秒
+
+    def summary(self) -> dict:
+        p = self.portfolio
+        return {
+            "strategy": self.strategy,
+            "start": str(p.dates[0]) if len(p.dates) else None,
+            "end": str(p.dates[-1]) if len(p.dates) else None,
+            "rebalances": self.rebalances,
+            "signals": self.signals,
+            "elapsedMs": round(self.elapsed * 1000, 1),
+            **p.metrics(),
+        }
+
+    def series(self) -> dict:
+        p = self.portfolio
+        return {
+            "dates": [str(d) for d in p.dates.tolist()],
+            "nav": np.round(p.nav, 2).tolist(),
+            "drawdown": np.round(p.drawdown(), 6).tolist(),
+            "turnover": np.round(p.turnover, 6).tolist(),
+        }
+
+
+def signals_to_weights(
+    signals: list[StrategySignal], index: dict[str, int], n: int, max_weight: float | None = None,
+) -> np.ndarray:
+    """buy → 等权 (不超过单票上限), sell → 0, 其余 (hold / 未提及) → NaN 保持现有持仓"""
+    weights = np.full(n, np.nan)
+    buys = [index[s.stock_code] for s in signals if s.signal == "buy" and s.stock_code in index]
+    sells = [index[s.stock_code] for s in signals if s.signal == "sell" and s.stock_code in index]
+    weights[sells] = 0.0
+    if buys:
+        w = 1.0 / len(buys)
+        weights[buys] = w if max_weight is None else min(w, max_weight)
+    return weights
+
+
+async def run_backtest(
+    strategy: BaseStrategy,
+    data: BacktestData,
+    rebalance_every: int = 1,
+    initial_cash: float = 1_000_000.0,
+    cost: CostModel | None = None,
+    limits: RiskLimits | None = None,
+    warmup: int = 0,
+    start: int = 0,
+    end: int | None = None,
+    feed: BacktestFeed | None = None,
+) -> BacktestResult:
+    """回测任意 BaseStrategy: 每 rebalance_every 个交易日收盘后生成信号, 次日开盘调仓
+
+    strategy 会被浅拷贝后改接回测数据源, 原实例不受影响; warmup 为开始调仓前跳过的交易日数 (指标预热)。
+    start / end 为交易日下标区间 [start, end), 区间前的K线仍用于指标 (分段回测 / 滚动验证);
+    feed 可传入同一份数据上已建好的 BacktestFeed 以复用预计算的指标。
+    """
+    t0 = time.perf_counter()
+    limits = limits or RiskLimits.from_settings()
+    feed = feed or BacktestFeed(data)
+    strat = copy.copy(strategy)
+    strat.feed = feed
+
+    targets: dict[int, np.ndarray] = {}
+    n_signals = 0
+    end = data.shape[1] if end is None else end
+    for t in range(max(start, warmup), end - 1, max(1, rebalance_every)):
+        feed.at(t)
+        pool = await feed.stock_pool()
+        if not pool:
+            continue
+        signals = await strat.generate_signals(pool)
+        n_signals += len(signals)
+        targets[t - start] = signals_to_weights(signals, data.index, len(data.codes), limits.max_position_ratio)
+
+    window = data if (start, end) == (0, data.shape[1]) else data.slice(start, end)
+    portfolio = simulate(window, targets, initial_cash, cost, limits)
+    result = BacktestResult(strat.name, portfolio, len(targets), n_signals, time.perf_counter() - t0)
+    logger.debug("回测 %s: %d 个交易日, %d 次调仓, %.0f ms",
+                 strat.name, end - start, len(targets), result.elapsed * 1000)
+    return result
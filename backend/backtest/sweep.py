@@ -0,0 +1,302 @@
+"""参数扫描 / 滚动验证 — 候选参数的回测分发到进程池, 日K面板经共享内存只读共享"""
+from __future__ import annotations
+import asyncio
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from multiprocessing import shared_memory
+import numpy as np
+from config import settings
+from db import get_db
+from strategies.base import BaseStrategy
+from backtest.data import PANEL_FIELDS, BacktestData
+from backtest.feed import BacktestFeed
+from backtest.portfolio import CostModel, RiskLimits
+from backtest.runner import run_backtest
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("sharpe", "annualReturn", "totalReturn", "maxDrawdown", "annualVolatility", "annualTurnover")
+LOWER_IS_BETTER = ("annualVolatility", "annualTurnover")   # 其余指标越大越好
+
+
+# ── 搜索空间 ──
+def grid(space: dict[str, list]) -> list[dict]:
+    """网格搜索: 每个参数的取值列表做笛卡尔积"""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def random_search(space: dict[str, list | tuple], samples: int, seed: int = 0) -> list[dict]:
+    """随机搜索: 列表为离散取值, (lo, hi) 元组为均匀区间 (两端为整数时取整数)"""
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(samples):
+        params = {}
+        for k, v in space.items():
+            if isinstance(v, tuple) and len(v) == 2:
+                lo, hi = v
+                params[k] = rnd.randint(lo, hi) if isinstance(lo, int) and isinstance(hi, int) else rnd.uniform(lo, hi)
+            else:
+                params[k] = rnd.choice(list(v))
+        out.append(params)
+    return out
+
+
+def walk_forward_splits(
+    days: int, train: int, test: int, start: int = 0, step: int | None = None, anchored: bool = False,
+) -> list[tuple[int, int, int, int]]:
+    """滚动切分: [(train_start, train_end, test_start, test_end)], 区间左闭右开, 测试段紧接训练段
+
+    anchored=True 时训练段起点固定在 start (扩展窗口), 否则为定长滑动窗口。
+    """
+    step = step or test
+    splits = []
+    train_end = start + train
+    while train_end + test <= days:
+        splits.append((start if anchored else train_end - train, train_end, train_end, train_end + test))
+        train_end += step
+    return splits
+
+
+# ── 共享内存: 面板只写一次, 工作进程按名字挂载为只读视图 ──
+class SharedPanels:
+    """把 BacktestData 的五个面板放进一块共享内存 (上下文管理器, 退出时释放)"""
+
+    def __init__(self, data: BacktestData) -> None:
+        stacked = np.stack([getattr(data, f) for f in PANEL_FIELDS])
+        self.shm = shared_memory.SharedMemory(create=True, size=max(stacked.nbytes, 1))
+        np.ndarray(stacked.shape, dtype=np.float64, buffer=self.shm.buf)[:] = stacked
+        # 工作进程初始化参数: 面板以外的部分很小, 直接 pickle
+        self.spec = {
+            "name": self.shm.name, "shape": stacked.shape,
+            "codes": data.codes, "names": data.names, "dates": data.dates, "snapshots": data.snapshots,
+        }
+
+    def __enter__(self) -> "SharedPanels":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+
+_worker: dict = {}   # 工作进程内: shm / data / feed
+
+
+def _attach(spec: dict) -> None:
+    """工作进程初始化: 挂载共享内存并建好 BacktestFeed (指标每个进程只算一次)"""
+    # 子进程与创建方共用同一个资源追踪器, 由创建方 unlink
+    shm = shared_memory.SharedMemory(name=spec["name"])
+    panels = np.ndarray(spec["shape"], dtype=np.float64, buffer=shm.buf)
+    panels.flags.writeable = False
+    data = BacktestData(spec["codes"], spec["dates"], *panels, names=spec["names"])
+    data.snapshots = spec["snapshots"]
+    _worker.update(shm=shm, data=data, feed=BacktestFeed(data))
+
+
+def _run_task(task: dict) -> dict:
+    """单次回测 (在工作进程中执行)"""
+    strat: BaseStrategy = task["strategy"].with_params(**task["params"])
+    result = asyncio.run(run_backtest(
+        strat, _worker["data"], feed=_worker["feed"], start=task["start"], end=task["end"], **task["options"],
+    ))
+    summary = result.summary()
+    return {
+        "params": task["params"], "fold": task["fold"], "phase": task["phase"],
+        "start": summary["start"], "end": summary["end"],
+        **{m: summary.get(m) for m in METRICS},
+        "trades": summary.get("trades", 0),
+        "elapsedMs": summary["elapsedMs"],
+    }
+
+
+def _sort_key(metric: str):
+    # maxDrawdown 为负数, 越大越好; 波动率 / 换手越小越好; 缺失值排在最后
+    sign = 1.0 if metric in LOWER_IS_BETTER else -1.0
+
+    def key(row: dict):
+        v = row.get(metric)
+        return (v is None or (isinstance(v, float) and math.isnan(v)), sign * (v or 0.0))
+    return key
+
+
+@dataclass
+class SweepResult:
+    sweep_id: str
+    strategy: str
+    metric: str
+    rows: list[dict]                        # 全部回测 (训练段按 fold 内排名)
+    folds: list[dict] = field(default_factory=list)   # 滚动验证: 每折最优参数及样本外表现
+    elapsed: float = 0.0
+
+    def ranked(self) -> list[dict]:
+        """参数排名表: 无滚动验证时按全区间指标, 否则按各折样本外指标的均值"""
+        if not self.folds:
+            return [r for r in self.rows if r["phase"] == "full"]
+        by_params: dict[str, list[dict]] = {}
+        for f in self.folds:
+            by_params.setdefault(json.dumps(f["params"], sort_keys=True), []).append(f)
+        table = []
+        for key, folds in by_params.items():
+            vals = [f["test"].get(self.metric) for f in folds if f["test"].get(self.metric) is not None]
+            table.append({
+                "params": json.loads(key), "folds": len(folds),
+                self.metric: round(float(np.mean(vals)), 6) if vals else None,
+            })
+        table.sort(key=_sort_key(self.metric))
+        for i, row in enumerate(table):
+            row["rank"] = i + 1
+        return table
+
+    def summary(self) -> dict:
+        return {
+            "sweepId": self.sweep_id, "strategy": self.strategy, "metric": self.metric,
+            "runs": len(self.rows), "elapsedMs": round(self.elapsed * 1000, 1),
+            "ranked": self.ranked(), "folds": self.folds,
+        }
+
+
+def run_sweep(
+    strategy: BaseStrategy,
+    data: BacktestData,
+    candidates: list[dict],
+    metric: str = "sharpe",
+    splits: list[tuple[int, int, int, int]] | None = None,
+    workers: int | None = None,
+    rebalance_every: int = 5,
+    warmup: int = 60,
+    initial_cash: float = 1_000_000.0,
+    cost: CostModel | None = None,
+    limits: RiskLimits | None = None,
+) -> SweepResult:
+    """候选参数逐一回测 (进程池并行), 按 metric 从优到劣排名 (LOWER_IS_BETTER 中的指标升序, 其余降序)
+
+    splits 为 walk_forward_splits() 的结果时: 每折在训练段选出最优参数, 再在紧随的测试段做样本外回测。
+    阻塞调用, 后端应在线程中运行。
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric 仅支持 {METRICS}")
+    for params in candidates:
+        strategy.with_params(**params)   # 提前校验参数名
+    t0 = time.perf_counter()
+    options = {
+        "rebalance_every": rebalance_every, "warmup": warmup, "initial_cash": initial_cash,
+        "cost": cost, "limits": limits or RiskLimits.from_settings(),
+    }
+    days = data.shape[1]
+
+    def task(params, fold, phase, start, end):
+        return {"strategy": strategy, "params": params, "fold": fold, "phase": phase,
+                "start": start, "end": end, "options": options}
+
+    workers = workers or settings.backtest_workers or os.cpu_count() or 1
+    with SharedPanels(data) as shared, ProcessPoolExecutor(
+        max_workers=min(workers, max(len(candidates), 1)), initializer=_attach, initargs=(shared.spec,),
+    ) as pool:
+        if not splits:
+            rows = list(pool.map(_run_task, [task(p, None, "full", 0, days) for p in candidates]))
+            rows.sort(key=_sort_key(metric))
+            for i, row in enumerate(rows):
+                row["rank"] = i + 1
+            folds = []
+        else:
+            rows = list(pool.map(_run_task, [
+                task(p, k, "train", ts, te) for k, (ts, te, _, _) in enumerate(splits) for p in candidates
+            ]))
+            best = []
+            for k in range(len(splits)):
+                fold_rows = sorted((r for r in rows if r["fold"] == k), key=_sort_key(metric))
+                for i, row in enumerate(fold_rows):
+                    row["rank"] = i + 1
+                best.append(fold_rows[0])
+            tests = list(pool.map(_run_task, [
+                task(b["params"], k, "test", splits[k][2], splits[k][3]) for k, b in enumerate(best)
+            ]))
+            rows.extend(tests)
+            folds = [
+                {"fold": k, "params": b["params"], "train": {m: b.get(m) for m in METRICS},
+                 "test": {m: t.get(m) for m in METRICS}, "testStart": t["start"], "testEnd": t["end"]}
+                for k, (b, t) in enumerate(zip(best, tests))
+            ]
+
+    result = SweepResult(uuid.uuid4().hex[:12], strategy.name, metric, rows, folds, time.perf_counter() - t0)
+    logger.info("参数扫描 %s: %d 组参数, %d 次回测, %.1f s",
+                strategy.name, len(candidates), len(rows), result.elapsed)
+    return result
+
+
+# ── 持久化 ──
+async def save_sweep(result: SweepResult, config: dict | None = None) -> None:
+    """写入 backtest_sweeps (汇总) 与 backtest_runs (逐次回测)"""
+    db = await get_db()
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    summary = result.summary()
+    await db.execute(
+        """INSERT INTO backtest_sweeps (sweep_id, strategy, metric, config_json, ranked_json, folds_json,
+                                        runs, elapsed_ms, created_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (result.sweep_id, result.strategy, result.metric, json.dumps(config or {}, ensure_ascii=False),
+         json.dumps(summary["ranked"]), json.dumps(result.folds), len(result.rows),
+         summary["elapsedMs"], now),
+    )
+    await db.executemany(
+        """INSERT INTO backtest_runs (sweep_id, fold, phase, params_json, start_date, end_date, rank,
+                                      sharpe, annual_return, max_drawdown, annual_turnover, metrics_json)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        [
+            (result.sweep_id, r["fold"], r["phase"], json.dumps(r["params"], sort_keys=True),
+             r["start"], r["end"], r.get("rank"), r.get("sharpe"), r.get("annualReturn"),
+             r.get("maxDrawdown"), r.get("annualTurnover"), json.dumps({m: r.get(m) for m in METRICS}))
+            for r in result.rows
+        ],
+    )
+    await db.commit()
+
+
+async def list_sweeps(strategy: str | None = None, limit: int = 20) -> list[dict]:
+    db = await get_db()
+    sql = "SELECT sweep_id, strategy, metric, runs, elapsed_ms, created_at, ranked_json FROM backtest_sweeps"
+    args: list = []
+    if strategy:
+        sql += " WHERE strategy = ?"
+        args.append(strategy)
+    cur = await db.execute(sql + " ORDER BY created_at DESC LIMIT ?", args + [limit])
+    return [
+        {"sweepId": r[0], "strategy": r[1], "metric": r[2], "runs": r[3], "elapsedMs": r[4],
+         "createdAt": r[5], "best": (json.loads(r[6]) or [None])[0]}
+        for r in await cur.fetchall()
+    ]
+
+
+async def load_sweep(sweep_id: str) -> dict | None:
+    db = await get_db()
+    cur = await db.execute(
+        """SELECT strategy, metric, config_json, ranked_json, folds_json, runs, elapsed_ms, created_at
+           FROM backtest_sweeps WHERE sweep_id = ?""", [sweep_id],
+    )
+    row = await cur.fetchone()
+    if not row:
+        return None
+    cur = await db.execute(
+        """SELECT fold, phase, params_json, start_date, end_date, rank, metrics_json
+           FROM backtest_runs WHERE sweep_id = ? ORDER BY fold, phase, rank""", [sweep_id],
+    )
+    runs = [
+        {"fold": r[0], "phase": r[1], "params": json.loads(r[2]), "start": r[3], "end": r[4], "rank": r[5],
+         **json.loads(r[6])}
+        for r in await cur.fetchall()
+    ]
+    return {
+        "sweepId": sweep_id, "strategy": row[0], "metric": row[1], "config": json.loads(row[2]),
+        "ranked": json.loads(row[3]), "folds": json.loads(row[4]), "runs": row[5],
+        "elapsedMs": row[6], "createdAt": row[7], "results": runs,
+    }
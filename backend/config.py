@@ -20,6 +20,21 @@ class Settings(BaseSettings):
     lot_size: int = 100                         # A股最小手数
     skip_trading_hours_check: bool = False       # 开发模式跳过时段检查
 
+    # --- 行情数据 ---
+    quote_cache_ttl: float = 5.0                 # 行情快照缓存 TTL (秒)
+    universe_file: str = ""                      # 股票池文件 (每行一个代码), 空=默认 30 只
+    data_dir: str = ""                           # 本地资金流/K线存储目录, 空=仓库根目录 data/
+    mf_weights: str = ""                         # 多因子权重 "momentum:0.3,value:0.3,...", 空=默认
+    mf_sector_neutral: bool = True               # 多因子打分是否按行业中性化
+
+    # --- 策略引擎 ---
+    strategy_process_workers: int = 0            # CPU 密集策略的进程池大小, 0=放在线程中运行
+    strategy_fallback_interval: float = 300.0    # 兜底定时全量运行间隔 (秒)
+    strategy_trigger_debounce: float = 2.0       # 行情触发后等待合并的时间 (秒)
+    strategy_trigger_min_interval: float = 30.0  # 同一策略两次事件触发运行的最小间隔 (秒)
+    signal_bucket_minutes: int = 0               # 信号 ID 的时间分桶 (分钟), 0=按自然日
+    backtest_workers: int = 0                    # 参数扫描的进程数, 0=CPU 核数
+
     # --- 服务 ---
     host: str = "0.0.0.0"
     port: int = 8000
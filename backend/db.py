@@ -73,6 +73,73 @@ async def _init_tables(db: aiosqlite.Connection) -> None:
             ON data_history (data_type, data_id)
             WHERE data_id IS NOT NULL;
 
+        CREATE TABLE IF NOT EXISTS intraday_bars (
+            stock_code TEXT NOT NULL,
+            interval INTEGER NOT NULL,       -- 分钟: 1 / 5
+            bar_time TEXT NOT NULL,          -- K线结束时刻 YYYY-MM-DD HH:MM
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            volume REAL NOT NULL,            -- 股
+            amount REAL NOT NULL,            -- 元
+            PRIMARY KEY (stock_code, interval, bar_time)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS signals (
+            id TEXT PRIMARY KEY,             -- 策略 / 代码 / 方向 / 时间桶的哈希
+            strategy TEXT NOT NULL,
+            stock_code TEXT NOT NULL,
+            stock_name TEXT,
+            signal TEXT NOT NULL,            -- buy / sell / hold
+            bucket TEXT NOT NULL,            -- 时间桶 YYYYMMDD[THHMM]
+            status TEXT NOT NULL,            -- active / expired
+            confidence REAL,
+            expected_return REAL,
+            risk_level TEXT,
+            factors_json TEXT,
+            first_seen TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            expired_at TEXT,
+            updates INTEGER DEFAULT 0,       -- 内容变化次数
+            version INTEGER NOT NULL,        -- 最近一次变更的信号簿版本
+            data_json TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sig_status
+            ON signals (status, bucket);
+        CREATE INDEX IF NOT EXISTS idx_sig_stock
+            ON signals (stock_code, updated_at);
+
+        CREATE TABLE IF NOT EXISTS backtest_sweeps (
+            sweep_id TEXT PRIMARY KEY,
+            strategy TEXT NOT NULL,
+            metric TEXT NOT NULL,            -- 排名指标
+            config_json TEXT NOT NULL,       -- 搜索空间 / 区间 / 滚动切分等请求参数
+            ranked_json TEXT NOT NULL,
+            folds_json TEXT NOT NULL,
+            runs INTEGER NOT NULL,
+            elapsed_ms REAL NOT NULL,
+            created_at TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS backtest_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sweep_id TEXT NOT NULL,
+            fold INTEGER,                    -- 滚动验证的折序号, 全区间扫描为 NULL
+            phase TEXT NOT NULL,             -- full / train / test
+            params_json TEXT NOT NULL,
+            start_date TEXT,
+            end_date TEXT,
+            rank INTEGER,
+            sharpe REAL,
+            annual_return REAL,
+            max_drawdown REAL,
+            annual_turnover REAL,
+            metrics_json TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_br_sweep
+            ON backtest_runs (sweep_id, fold, phase);
+
         CREATE TABLE IF NOT EXISTS persist_config (
             data_type TEXT PRIMARY KEY,
             enabled INTEGER DEFAULT 1,
@@ -86,6 +153,7 @@ async def _init_tables(db: aiosqlite.Connection) -> None:
         'insight_trend', 'insight_meanrev', 'insight_statarb',
         'insight_hft', 'insight_mf', 'price_tick', 'fund_flow',
         'capital_alert', 'trading_alert', 'huijin', 'ssf', 'broker',
+        'intraday_bar',
     ]
     await db.executemany(
         "INSERT OR IGNORE INTO persist_config (data_type) VALUES (?)",
@@ -9,8 +9,10 @@ from config import settings
 from routers import trade, ws
 from routers.strategy import router as strategy_router
 from routers.history import router as history_router
+from routers.backtest import router as backtest_router
 from services.trader_factory import get_trader
 from services.scheduler import scheduler
+from services.price_service import circuit_breaker
 from strategies.engine import engine as strategy_engine
 from db import close_db
 
@@ -32,16 +34,10 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error("交易服务连接失败: %s", e)
 
-    # 启动策略引擎后台任务
-    async def _strategy_loop():
-        while True:
-            try:
-                await strategy_engine.run_all()
-            except Exception as e:
-                logger.error("策略引擎异常: %s", e)
-            await asyncio.sleep(300)  # 每 5 分钟
-
-    task = asyncio.create_task(_strategy_loop())
+    # 启动策略引擎后台任务: 行情变动触发, 定时兜底; 信号变更经 WebSocket 推送差异
+    await strategy_engine.restore()
+    unsubscribe = strategy_engine.subscribe(ws.broadcast_signals)
+    task = asyncio.create_task(strategy_engine.trigger_loop())
 
     # 启动数据采集调度器
     await scheduler.start()
@@ -49,6 +45,8 @@ async def lifespan(app: FastAPI):
 
     yield
     task.cancel()
+    unsubscribe()
+    strategy_engine.close()
     await scheduler.stop()
     await close_db()
     logger.info("交易服务关闭")
@@ -75,6 +73,7 @@ app.include_router(trade.router)
 app.include_router(ws.router)
 app.include_router(strategy_router)
 app.include_router(history_router)
+app.include_router(backtest_router)
 
 
 @app.get("/health")
@@ -84,6 +83,7 @@ async def health():
         "status": "ok",
         "mode": "mock" if settings.mock_mode else "qmt",
         "connected": trader.is_connected,
+        "breakers": circuit_breaker.stats(),
     }
 
 
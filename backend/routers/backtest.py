@@ -0,0 +1,108 @@
+"""回测路由"""
+from __future__ import annotations
+import asyncio
+import sys
+from pathlib import Path
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from schemas import BacktestRequest, SweepRequest
+from strategies.engine import engine
+from backtest.data import BacktestData
+from backtest.portfolio import RiskLimits
+from backtest.runner import run_backtest
+from backtest.sweep import grid, list_sweeps, load_sweep, random_search, run_sweep, save_sweep, walk_forward_splits
+
+# 把 scripts/ 加入 sys.path
+_scripts_dir = str(Path(__file__).resolve().parent.parent.parent / "scripts")
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+
+import akshare_service as aks  # noqa: E402
+
+router = APIRouter(prefix="/api/backtest", tags=["backtest"])
+
+
+async def _load_data(req: BacktestRequest) -> BacktestData:
+    # 读取全股票池 .npy 为同步磁盘 IO, 放到线程中避免阻塞事件循环
+    data = await asyncio.to_thread(
+        BacktestData.from_kline_store, req.codes or aks.universe_codes(), req.start, req.end)
+    if req.use_snapshots and len(data.dates):
+        await data.load_snapshots()
+    return data
+
+
+@router.post("/run")
+async def run(req: BacktestRequest):
+    """用本地日K (+ 持久化行情快照) 回测一个已注册策略"""
+    strat = engine.strategy(req.strategy)
+    if strat is None:
+        return JSONResponse({"error": f"unknown strategy: {req.strategy}"}, 404)
+
+    data = await _load_data(req)
+    if not len(data.dates):
+        return JSONResponse({"error": "无本地日K数据"}, 404)
+
+    limits = RiskLimits.from_settings() if req.apply_risk_limits else RiskLimits(block_st=False)
+    # 回测为 CPU 密集, 放在线程中的独立事件循环里运行
+    result = await asyncio.to_thread(asyncio.run, run_backtest(
+        strat, data,
+        rebalance_every=req.rebalance_every,
+        initial_cash=req.initial_cash,
+        limits=limits,
+        warmup=req.warmup,
+    ))
+    return {"summary": result.summary(), "series": result.series()}
+
+
+@router.post("/sweep")
+async def sweep(req: SweepRequest):
+    """参数扫描 (网格 / 随机), 可选滚动验证; 结果写入 backtest_sweeps / backtest_runs"""
+    strat = engine.strategy(req.strategy)
+    if strat is None:
+        return JSONResponse({"error": f"unknown strategy: {req.strategy}"}, 404)
+    if req.search == "grid":
+        candidates = grid(req.space)
+    else:
+        space = {k: tuple(v) if len(v) == 2 else v for k, v in req.space.items()}
+        candidates = random_search(space, req.samples, req.seed)
+    try:
+        for params in candidates:
+            strat.with_params(**params)
+    except ValueError as e:
+        return JSONResponse({"error": str(e), "tunable": list(strat.tunable)}, 400)
+
+    data = await _load_data(req)
+    if not len(data.dates):
+        return JSONResponse({"error": "无本地日K数据"}, 404)
+    splits = None
+    if req.train_days:
+        splits = walk_forward_splits(
+            data.shape[1], req.train_days, req.test_days, step=req.step_days, anchored=req.anchored,
+        )
+        if not splits:
+            return JSONResponse({"error": "交易日不足以切分训练 / 测试段"}, 400)
+
+    limits = RiskLimits.from_settings() if req.apply_risk_limits else RiskLimits(block_st=False)
+    try:
+        result = await asyncio.to_thread(
+            run_sweep, strat, data, candidates,
+            metric=req.metric, splits=splits, rebalance_every=req.rebalance_every,
+            warmup=req.warmup, initial_cash=req.initial_cash, limits=limits,
+        )
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, 400)
+    await save_sweep(result, req.model_dump(exclude={"codes"}))
+    return result.summary()
+
+
+@router.get("/sweeps")
+async def sweeps(strategy: str | None = None, limit: int = 20):
+    return await list_sweeps(strategy, limit)
+
+
+@router.get("/sweeps/{sweep_id}")
+async def sweep_detail(sweep_id: str):
+    result = await load_sweep(sweep_id)
+    if result is None:
+        return JSONResponse({"error": "sweep not found"}, 404)
+    return result
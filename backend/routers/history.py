@@ -18,6 +18,8 @@ if _scripts_dir not in sys.path:
 
 import akshare_service as aks  # noqa: E402
 from services.data_fetcher import fetch_and_persist
+from services.intraday_bars import read_bars
+from strategies.insights import insight_engine
 
 router = APIRouter(prefix="/api/history", tags=["history"])
 
@@ -273,6 +275,18 @@ async def retrospective(date: str = Query(..., description="YYYY-MM-DD")):
     }
 
 
+@router.get("/bars")
+async def intraday_bars(
+    code: str = Query(...),
+    interval: int = Query(1, description="1 / 5 分钟"),
+    date: Optional[str] = Query(None, description="YYYY-MM-DD, 默认当日"),
+):
+    """分钟K线 — 由轮询行情快照合成"""
+    if interval not in aks.bar_builder.INTERVALS:
+        return JSONResponse({"error": f"interval 仅支持 {aks.bar_builder.INTERVALS}"}, 400)
+    return {"code": code, "interval": interval, "bars": await read_bars(code, interval, date)}
+
+
 @router.get("/market")
 async def market_proxy(
     action: str = Query("overview"),
@@ -281,31 +295,42 @@ async def market_proxy(
     type: Optional[str] = Query(None),
 ):
     """代理市场数据请求，同时触发持久化"""
-    loop = asyncio.get_running_loop()
-
     handler_map = {
-        "overview": aks.get_market_overview,
-        "quotes": lambda: aks.get_quotes(
+        "overview": aks.get_market_overview_async,
+        "quotes": lambda: aks.get_quotes_async(
             codes.split(",") if codes else None
         ),
-        "kline": lambda: aks.get_kline(code or "688981"),
-        "sectors": aks.get_sector_flows,
-        "events": aks.get_oracle_events,
-        "scanner": aks.get_scanner_stocks,
-        "swsectors": aks.get_sw_sectors,
-        "news": aks.get_event_news,
-        "insights": lambda: aks.get_strategy_insights(
-            type or "trend_follow"
-        ),
-        "price_ticks": aks.get_price_ticks,
-        "fund_flow": aks.get_fund_flow,
-        "kline_flow": lambda: aks.get_kline_flow(code or "688981"),
-        "capital_alerts": aks.get_capital_alerts,
-        "trend": lambda: aks.get_trend(code or "688981"),
-        "trading_alerts": aks.get_trading_alerts,
-        "huijin": aks.get_huijin_monitor,
-        "ssf": aks.get_ssf_monitor,
-        "broker": aks.get_broker_monitor,
+        "kline": lambda: aks.get_kline_async(code or "688981"),
+        "sectors": aks.get_sector_flows_async,
+        "events": aks.get_oracle_events_async,
+        "scanner": aks.get_scanner_stocks_async,
+        "swsectors": aks.get_sw_sectors_async,
+        "news": aks.get_event_news_async,
+        "insights": lambda: insight_engine.get(type or "trend_follow"),
+        "price_ticks": aks.get_price_ticks_async,
+        "fund_flow": aks.get_fund_flow_async,
+        "kline_flow": lambda: aks.get_kline_flow_async(code or "688981"),
+        "capital_alerts": aks.get_capital_alerts_async,
+        "trend": lambda: aks.get_trend_async(code or "688981"),
+        "trading_alerts": aks.get_trading_alerts_async,
+        "huijin": aks.get_huijin_monitor_async,
+        "ssf": aks.get_ssf_monitor_async,
+        "broker": aks.get_broker_monitor_async,
+    }
+
+    # 运行时统计, 无需抓取
+    stats_map = {
+        "cache_stats": aks.quote_cache_stats,
+        "http_stats": aks.http_pool.pool_stats,
+        "async_http_stats": aks.async_http.pool_stats,
+        "source_stats": aks.source_stats,
+        "flow_store_stats": aks.flow_store_stats,
+        "kline_store_stats": aks.kline_store_stats,
+        "indicator_stream_stats": aks.indicator_stream_stats,
+        "feature_store_stats": aks.feature_store_stats,
+        "pair_book_stats": aks.pair_book_stats,
+        "intraday_bar_stats": aks.intraday_bar_stats,
+        "insight_stats": insight_engine.stats,
     }
 
     fn = handler_map.get(action)
@@ -314,13 +339,15 @@ async def market_proxy(
     if action == "oracle_accuracy":
         return await _get_oracle_accuracy()
     if action == "portfolio":
-        return await _get_portfolio(loop)
+        return await _get_portfolio()
+    if action in stats_map:
+        return stats_map[action]()
 
     if not fn:
         return {"error": f"unknown action: {action}"}
 
     try:
-        data = await loop.run_in_executor(None, fn)
+        data = await fn()
     except Exception as e:
         return {"error": str(e)}
 
@@ -351,14 +378,7 @@ async def market_proxy(
         "broker": "broker",
     }
     if action == "insights" and type:
-        type_map = {
-            "trend_follow": "insight_trend",
-            "mean_reversion": "insight_meanrev",
-            "stat_arb": "insight_statarb",
-            "hft": "insight_hft",
-            "multi_factor": "insight_mf",
-        }
-        dt = type_map.get(type)
+        dt = insight_engine.data_type(type)
         if dt:
             asyncio.create_task(fetch_and_persist(dt))
     elif action in persist_map:
@@ -434,7 +454,7 @@ async def _get_oracle_accuracy():
     }
 
 
-async def _get_portfolio(loop):
+async def _get_portfolio():
     """从 positions + account 表读取持仓，用实时价格增强"""
     db = await get_db()
     # 检查 positions 表是否存在
@@ -454,9 +474,7 @@ async def _get_portfolio(loop):
     live_prices = {}
     if codes:
         try:
-            quotes = await loop.run_in_executor(
-                None, lambda: aks.get_quotes(codes)
-            )
+            quotes = await aks.get_quotes_async(codes)
             for q in (quotes or []):
                 live_prices[q['code']] = q
         except Exception:
@@ -2,19 +2,31 @@
 from __future__ import annotations
 from fastapi import APIRouter
 from strategies.engine import engine
+from strategies.signal_book import signal_history
 
 router = APIRouter(prefix="/api/strategy", tags=["strategy"])
 
 
 @router.get("/signals")
-async def get_signals():
+async def get_signals(since: int | None = None):
+    """全量信号; 带 since (上次响应的 version) 时只返回其后新增 / 变化 / 过期的信号"""
+    if since is not None:
+        return {**engine.changes_since(since), "last_run": engine.last_run}
     return {
         "signals": engine.get_cached_signals(),
         "last_run": engine.last_run,
         "count": len(engine.get_cached_signals()),
+        "version": engine.version,
     }
 
 
+@router.get("/signals/history")
+async def get_signal_history(code: str | None = None, strategy: str | None = None,
+                             status: str | None = None, limit: int = 100):
+    """signals 表中的信号生命周期 (首次出现 / 最近变化 / 过期时间)"""
+    return {"signals": await signal_history(code, strategy, status, min(limit, 1000))}
+
+
 @router.post("/run")
 async def run_strategies():
     signals = await engine.run_all()
@@ -22,4 +34,11 @@ async def run_strategies():
         "signals": signals,
         "last_run": engine.last_run,
         "count": len(signals),
+        "version": engine.version,
     }
+
+
+@router.get("/stats")
+async def strategy_stats():
+    """各策略运行耗时 / 超时 / 异常"""
+    return {"strategies": engine.run_stats(), "last_run": engine.last_run}
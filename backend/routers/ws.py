@@ -1,10 +1,11 @@
-"""WebSocket 路由 — 实时推送成交结果"""
+"""WebSocket 路由 — 实时推送成交结果与策略信号变更"""
 from __future__ import annotations
 import asyncio
 import json
 import logging
 from datetime import datetime
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from strategies.engine import engine
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -13,6 +14,11 @@ router = APIRouter()
 _connections: set[WebSocket] = set()
 
 
+async def broadcast_signals(diff: dict) -> None:
+    """策略信号变更 (engine.subscribe 回调)"""
+    await broadcast({"type": "signals", **diff, "timestamp": datetime.now().isoformat()})
+
+
 async def broadcast(message: dict) -> None:
     """向所有连接推送消息"""
     dead: set[WebSocket] = set()
@@ -56,6 +62,12 @@ async def trade_websocket(ws: WebSocket):
                         "channel": msg.get("channel", "trade"),
                         "timestamp": datetime.now().isoformat(),
                     }))
+                    # 信号频道: 补发游标之后的变更 (无游标时为全量), 之后只推送差异
+                    if msg.get("channel") == "signals":
+                        diff = engine.changes_since(int(msg.get("since") or -1))
+                        await ws.send_text(json.dumps({
+                            "type": "signals", **diff, "timestamp": datetime.now().isoformat(),
+                        }, ensure_ascii=False, default=str))
 
             except asyncio.TimeoutError:
                 # 30s 无消息, 发心跳
@@ -1,7 +1,7 @@
 """Pydantic 数据模型 — 对齐前端 types.ts"""
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -46,6 +46,31 @@ class TradeRequest(BaseModel):
 class CancelRequest(BaseModel):
     order_id: str
 
+class BacktestRequest(BaseModel):
+    strategy: str = "dividend_low_vol"
+    codes: Optional[List[str]] = None          # 默认当前股票池
+    start: Optional[str] = None                # YYYY-MM-DD
+    end: Optional[str] = None
+    rebalance_every: int = Field(default=5, ge=1)
+    warmup: int = Field(default=60, ge=0)      # 指标预热的交易日数
+    initial_cash: float = Field(default=1_000_000.0, gt=0)
+    use_snapshots: bool = True                 # 叠加 data_history 中的行情快照
+    apply_risk_limits: bool = True
+
+
+class SweepRequest(BacktestRequest):
+    # {参数名: [取值...]}; search="random" 时 [lo, hi] 两元素区间按均匀分布采样
+    space: Dict[str, List[Any]]
+    search: str = Field(default="grid", pattern="^(grid|random)$")
+    samples: int = Field(default=20, ge=1, le=1000)   # 随机搜索的采样数
+    seed: int = 0
+    metric: str = "sharpe"
+    # 滚动验证 (交易日数), train_days 为空时只做全区间扫描
+    train_days: Optional[int] = Field(default=None, ge=20)
+    test_days: int = Field(default=60, ge=5)
+    step_days: Optional[int] = Field(default=None, ge=1)
+    anchored: bool = False
+
 
 # ── 风控 ──
 class RiskCheck(BaseModel):
@@ -3,7 +3,6 @@
 """
 from __future__ import annotations
 
-import asyncio
 import json
 import logging
 import sys
@@ -13,6 +12,7 @@ from typing import Optional
 
 import aiosqlite
 
+from config import settings
 from db import get_db
 
 # 把 scripts/ 加入 sys.path 以便 import akshare_service
@@ -21,35 +21,52 @@ if _scripts_dir not in sys.path:
     sys.path.insert(0, _scripts_dir)
 
 import akshare_service as aks  # noqa: E402
+from services.intraday_bars import persist_bars  # noqa: E402
+from strategies.insights import insight_engine  # noqa: E402
 
 logger = logging.getLogger("data_fetcher")
 
-# ── 采集函数映射 ──
+# 所有采集循环共享同一份行情快照
+aks.configure_quote_cache(settings.quote_cache_ttl)
+if settings.universe_file:
+    aks.configure_universe(settings.universe_file)
+if settings.data_dir:
+    aks.configure_data_dir(settings.data_dir)
+aks.configure_multi_factor(settings.mf_weights, settings.mf_sector_neutral)
+
+# ── 采集函数映射 (协程, 直接在事件循环内抓取) ──
 FETCH_MAP = {
-    "oracle_event": aks.get_oracle_events,
-    "news": aks.get_event_news,
-    "insight_trend": lambda: aks.get_strategy_insights("trend_follow"),
-    "insight_meanrev": lambda: aks.get_strategy_insights("mean_reversion"),
-    "insight_statarb": lambda: aks.get_strategy_insights("stat_arb"),
-    "insight_hft": lambda: aks.get_strategy_insights("hft"),
-    "insight_mf": lambda: aks.get_strategy_insights("multi_factor"),
-    "quote": lambda: aks.get_quotes(),
-    "scanner": aks.get_scanner_stocks,
-    "sector": aks.get_sector_flows,
-    "price_tick": aks.get_price_ticks,
-    "fund_flow": aks.get_fund_flow,
-    "capital_alert": aks.get_capital_alerts,
-    "trading_alert": aks.get_trading_alerts,
-    "huijin": aks.get_huijin_monitor,
-    "ssf": aks.get_ssf_monitor,
-    "broker": aks.get_broker_monitor,
+    "oracle_event": aks.get_oracle_events_async,
+    "news": aks.get_event_news_async,
+    # 五类洞察共用一次快照刷新 (InsightEngine 按类型缓存)
+    "insight_trend": lambda: insight_engine.get("trend_follow"),
+    "insight_meanrev": lambda: insight_engine.get("mean_reversion"),
+    "insight_statarb": lambda: insight_engine.get("stat_arb"),
+    "insight_hft": lambda: insight_engine.get("hft"),
+    "insight_mf": lambda: insight_engine.get("multi_factor"),
+    "quote": lambda: aks.get_quotes_async(),
+    "scanner": aks.get_scanner_stocks_async,
+    "sector": aks.get_sector_flows_async,
+    "price_tick": aks.get_price_ticks_async,
+    "fund_flow": aks.get_fund_flow_async,
+    "capital_alert": aks.get_capital_alerts_async,
+    "trading_alert": aks.get_trading_alerts_async,
+    "huijin": aks.get_huijin_monitor_async,
+    "ssf": aks.get_ssf_monitor_async,
+    "broker": aks.get_broker_monitor_async,
+}
+
+
+# ── 不走 data_history 的持久化 (协程, 返回写入行数) ──
+PERSIST_MAP = {
+    "intraday_bar": persist_bars,
 }
 
 
 async def fetch_and_persist(data_type: str) -> int:
     """采集一种数据并写入 data_history，返回新增行数"""
     fn = FETCH_MAP.get(data_type)
-    if not fn:
+    if not fn and data_type not in PERSIST_MAP:
         logger.warning("unknown data_type: %s", data_type)
         return 0
 
@@ -63,9 +80,15 @@ async def fetch_and_persist(data_type: str) -> int:
         logger.debug("persist disabled for %s, skip", data_type)
         return 0
 
-    loop = asyncio.get_running_loop()
+    if data_type in PERSIST_MAP:
+        try:
+            return await PERSIST_MAP[data_type]()
+        except Exception as e:
+            logger.error("persist %s failed: %s", data_type, e)
+            return 0
+
     try:
-        raw = await loop.run_in_executor(None, fn)
+        raw = await fn()
     except Exception as e:
         logger.error("fetch %s failed: %s", data_type, e)
         return 0
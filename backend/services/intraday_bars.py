@@ -0,0 +1,64 @@
+"""分钟K线持久化与查询 — 由 akshare_service 的行情快照合成, 写入 intraday_bars"""
+from __future__ import annotations
+
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from db import get_db
+
+# 把 scripts/ 加入 sys.path
+_scripts_dir = str(Path(__file__).resolve().parent.parent.parent / "scripts")
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+
+import akshare_service as aks  # noqa: E402
+
+logger = logging.getLogger("intraday_bars")
+
+_COLUMNS = ("open", "high", "low", "close", "volume", "amount")
+
+
+async def persist_bars() -> int:
+    """写入已完成的分钟K线, 返回行数"""
+    rows = aks.drain_intraday_bars()
+    if not rows:
+        return 0
+    db = await get_db()
+    await db.executemany(
+        """INSERT OR REPLACE INTO intraday_bars
+           (stock_code, interval, bar_time, open, high, low, close, volume, amount)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        rows,
+    )
+    await db.commit()
+    logger.info("persisted intraday_bar: %d bars", len(rows))
+    return len(rows)
+
+
+async def read_bars(code: str, interval: int = 1, date: Optional[str] = None,
+                    include_current: bool = True) -> list[dict]:
+    """某日分钟K线 (升序); 当日默认附上内存中尚未持久化的K线与未完成的当前K线
+
+    只读: 持久化由调度器的 intraday_bar 任务负责 (受 persist_config 控制)。
+    """
+    date = date or datetime.now().strftime("%Y-%m-%d")
+    db = await get_db()
+    cursor = await db.execute(
+        """SELECT bar_time, open, high, low, close, volume, amount FROM intraday_bars
+           WHERE stock_code = ? AND interval = ? AND bar_time BETWEEN ? AND ?
+           ORDER BY bar_time""",
+        (code, interval, f"{date} 00:00", f"{date} 23:59"),
+    )
+    bars = {r[0]: {"time": r[0], **dict(zip(_COLUMNS, r[1:]))} for r in await cursor.fetchall()}
+    if include_current:
+        memory = aks.pending_intraday_bars(code, interval)
+        current = aks.current_intraday_bar(code, interval)
+        if current:
+            memory.append(current)
+        for bar in memory:
+            if bar["time"].startswith(date):
+                bars[bar["time"]] = bar
+    return [bars[t] for t in sorted(bars)]
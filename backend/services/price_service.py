@@ -1,116 +1,111 @@
 """实时行情服务 — 腾讯财经 + 新浪财经"""
 from __future__ import annotations
-import json
 import re
 import sys
 import os
-from urllib.request import Request, urlopen
+from pathlib import Path
+import numpy as np
+
+# 把 scripts/ 加入 sys.path 以便复用共享连接池与行情快照
+_scripts_dir = str(Path(__file__).resolve().parent.parent.parent / "scripts")
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+
+import akshare_service as aks  # noqa: E402
+import circuit_breaker  # noqa: E402
+import http_pool  # noqa: E402
+import source_selector  # noqa: E402
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)",
     "Referer": "https://finance.sina.com.cn",
 }
 
-# 默认股票池
-DEFAULT_CODES = [
-    "600519", "000858", "601318", "000001", "600036",
-    "300750", "002594", "688981", "603259", "000725",
-    "002415", "600900", "601899", "000568", "600276",
-    "002475", "601012", "600030", "002714", "601888",
-    "000333", "600309", "601669", "002049", "600585",
-    "601225", "002352", "300059", "688111", "002371",
-]
-
 
 def _code_to_symbol(code: str) -> str:
     return ("sh" if code.startswith(("6", "9")) else "sz") + code
 
 
 def _http_get(url: str, timeout: int = 10) -> str:
-    req = Request(url, headers=HEADERS)
-    with urlopen(req, timeout=timeout) as resp:
-        return resp.read().decode("gbk", errors="replace")
+    # 最新价用于下单, 熔断时不返回旧响应
+    body = circuit_breaker.call(
+        url, lambda: http_pool.get(url, headers=HEADERS, timeout=timeout).body, stale=False)
+    return body.decode("gbk", errors="replace")
+
+
+_price_selector = source_selector.HedgedSelector("latest_price", ("tencent", "sina"))
+
+
+def _tencent_price(code: str) -> float:
+    raw = _http_get(f"http://qt.gtimg.cn/q={_code_to_symbol(code)}")
+    fields = raw.split("~")
+    return float(fields[3]) if len(fields) > 3 else 0.0
+
+
+def _sina_price(code: str) -> float:
+    raw = _http_get(f"http://hq.sinajs.cn/list={_code_to_symbol(code)}")
+    m = re.search(r'"(.+)"', raw)
+    return float(m.group(1).split(",")[3]) if m else 0.0
 
 
 def fetch_latest_price(code: str) -> float:
-    """获取单只股票最新价 — 腾讯优先, 新浪备用"""
-    # 腾讯
-    try:
-        symbol = _code_to_symbol(code)
-        raw = _http_get(f"http://qt.gtimg.cn/q={symbol}")
-        fields = raw.split("~")
-        if len(fields) > 3:
-            price = float(fields[3])
-            if price > 0:
-                return price
-    except Exception:
-        pass
-    # 新浪
+    """获取单只股票最新价 — 腾讯为主, 超过延迟截止时间或失败时对冲新浪"""
     try:
-        symbol = _code_to_symbol(code)
-        raw = _http_get(f"http://hq.sinajs.cn/list={symbol}")
-        m = re.search(r'"(.+)"', raw)
-        if m:
-            fields = m.group(1).split(",")
-            price = float(fields[3])
-            if price > 0:
-                return price
+        price, _ = _price_selector.call(
+            {"tencent": lambda: _tencent_price(code), "sina": lambda: _sina_price(code)},
+            accept=lambda p: p > 0,
+        )
     except Exception:
-        pass
-    raise ValueError(f"无法获取 {code} 最新价")
+        raise ValueError(f"无法获取 {code} 最新价")
+    return price
 
 
 def fetch_stock_pool(codes: list = None) -> list:
-    """批量获取股票池行情 — 供策略引擎使用"""
-    target = codes or DEFAULT_CODES
-    symbols = ",".join(_code_to_symbol(c) for c in target)
-    url = f"http://qt.gtimg.cn/q={symbols}"
-    raw = _http_get(url)
-    results = []
-    for line in raw.strip().split("\n"):
-        m = re.match(r'v_(\w+)="(.+)";', line.strip())
-        if not m:
-            continue
-        fields = m.group(2).split("~")
-        if len(fields) < 50:
-            continue
-        try:
-            results.append({
-                "code": fields[2],
-                "name": fields[1],
-                "price": float(fields[3] or 0),
-                "changePercent": float(fields[32] or 0),
-                "volume": int(float(fields[36] or 0)),
-                "amount": float(fields[37] or 0),
-                "high": float(fields[33] or 0),
-                "low": float(fields[34] or 0),
-                "open": float(fields[5] or 0),
-                "prevClose": float(fields[4] or 0),
-                "turnoverRate": float(fields[38] or 0),
-                "pe": float(fields[39] or 0),
-            })
-        except (ValueError, IndexError):
-            continue
-    return results
+    """批量获取股票池行情 — 供策略引擎使用 (共享快照, 全市场时分片并发)"""
+    return aks.get_quote_snapshot(codes or aks.universe_codes())
+
+
+async def fetch_stock_pool_async(codes: list = None) -> list:
+    return await aks.get_quote_snapshot_async(codes or aks.universe_codes())
+
+
+async def fetch_quote_frame_async():
+    """股票池行情快照 (QuoteFrame, 列式)"""
+    return await aks.get_quote_frame_async()
+
+
+def subscribe_quote_frames(callback):
+    """订阅新行情快照, 返回取消订阅函数"""
+    aks.add_frame_listener(callback)
+    return lambda: aks.remove_frame_listener(callback)
+
+
+def _kline_rows(bars) -> list:
+    opens, closes, highs, lows, volumes = bars.data[1:].tolist()
+    return [
+        {"date": d, "open": o, "close": c, "high": h, "low": l, "volume": int(v)}
+        for d, o, c, h, l, v in zip(bars.date_strings(), opens, closes, highs, lows, volumes)
+    ]
 
 
 def fetch_kline(code: str, count: int = 30) -> list:
-    """获取日K线 — 腾讯财经"""
-    symbol = _code_to_symbol(code)
-    url = f"http://web.ifzq.gtimg.cn/appstock/app/fqkline/get?param={symbol},day,,,{count},qfq"
-    raw = _http_get(url)
-    data = json.loads(raw)
-    days = data.get("data", {}).get(symbol, {}).get("qfqday", [])
-    if not days:
-        days = data.get("data", {}).get(symbol, {}).get("day", [])
-    results = []
-    for d in days:
-        results.append({
-            "date": d[0],
-            "open": float(d[1]),
-            "close": float(d[2]),
-            "high": float(d[3]),
-            "low": float(d[4]),
-            "volume": int(float(d[5])) if len(d) > 5 else 0,
-        })
-    return results
+    """获取前复权日K线 — 腾讯财经, 经本地K线存储 (只抓缺失部分)"""
+    return _kline_rows(aks.get_kline_bars(code, count))
+
+
+async def fetch_kline_async(code: str, count: int = 30) -> list:
+    return _kline_rows(await aks.get_kline_bars_async(code, count))
+
+
+def fetch_indicators(code: str) -> dict:
+    """当前指标 (均线 / 年化波动率 / 支撑阻力) — 流式状态, 随行情快照更新, 不重算窗口"""
+    return aks.get_indicators(code)
+
+
+async def fetch_indicators_async(code: str) -> dict:
+    return await aks.get_indicators_async(code)
+
+
+async def fetch_features_async(names: list, codes: list) -> np.ndarray:
+    """命名因子矩阵 [len(codes), len(names)] — 因子特征库缓存, 多个策略共用一次计算"""
+    return await aks.get_features_async(names, codes)
@@ -30,6 +30,7 @@ INTERVALS = {
     "huijin": 60,
     "ssf": 60,
     "broker": 60,
+    "intraday_bar": 60,   # 写入由行情快照合成的分钟K线
 }
 
 
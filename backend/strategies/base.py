@@ -1,8 +1,10 @@
 """策略基类"""
 from __future__ import annotations
+import copy
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import List
+from strategies.data_feed import DataFeed, MarketDataFeed
 
 
 @dataclass
@@ -19,8 +21,45 @@ class StrategySignal:
 
 class BaseStrategy(ABC):
     name: str = "base"
+    timeout: float = 60.0          # 单次运行期限 (秒), 超时保留上一次的信号
+    run_in_process: bool = False   # True: 引擎 await prepare() 后把 compute() 放进进程池
+    # 事件触发: 关注的代码 (None=整个股票池) 相对上次运行的价格变动超过阈值 (%) 时重算
+    watch_codes: tuple[str, ...] | None = None
+    trigger_threshold: float = 0.5
+    tunable: tuple[str, ...] = ()   # 可调参数 (实例属性名), 供回测参数扫描
+
+    def __init__(self, feed: DataFeed | None = None) -> None:
+        self.feed = feed or MarketDataFeed()
 
     @abstractmethod
     async def generate_signals(self, stock_pool: list[dict]) -> list[StrategySignal]:
-        """根据股票池行情生成信号"""
+        """根据股票池行情生成信号; 其余数据经 self.feed 异步获取"""
         ...
+
+    # ── CPU 密集策略: 取数 (事件循环内) 与计算 (进程池内) 分离 ──
+    async def prepare(self, stock_pool: list[dict]):
+        """经 self.feed 取齐计算所需数据, 返回值需可 pickle"""
+        return stock_pool
+
+    def compute(self, data) -> list[StrategySignal]:
+        """纯计算, 不得访问网络或 self.feed"""
+        raise NotImplementedError
+
+    def params(self) -> dict:
+        return {k: getattr(self, k) for k in self.tunable}
+
+    def with_params(self, **params) -> "BaseStrategy":
+        """浅拷贝并覆盖可调参数; 未声明的参数名报错"""
+        unknown = set(params) - set(self.tunable)
+        if unknown:
+            raise ValueError(f"{self.name} 不支持参数: {', '.join(sorted(unknown))}")
+        clone = copy.copy(self)
+        for k, v in params.items():
+            setattr(clone, k, v)
+        return clone
+
+    def __getstate__(self):
+        # 送入进程池时不携带数据源 (可能持有连接)
+        state = self.__dict__.copy()
+        state["feed"] = None
+        return state
@@ -0,0 +1,100 @@
+"""策略数据源 — 股票池行情 / 指标 / 日K 的异步接口, 策略运行期间不阻塞事件循环"""
+from __future__ import annotations
+import asyncio
+import sys
+from abc import ABC, abstractmethod
+from pathlib import Path
+import numpy as np
+from services.price_service import (
+    fetch_features_async,
+    fetch_indicators_async,
+    fetch_kline_async,
+    fetch_quote_frame_async,
+    fetch_stock_pool_async,
+    subscribe_quote_frames,
+)
+
+# 把 scripts/ 加入 sys.path 以便 import feature_store
+_scripts_dir = str(Path(__file__).resolve().parent.parent.parent / "scripts")
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+
+import feature_store  # noqa: E402
+
+FEED_CONCURRENCY = 8  # 单次批量获取的并发上限
+
+
+class DataFeed(ABC):
+    """策略读取行情的唯一入口; 实现必须是协程, 不得在事件循环内做同步网络请求"""
+
+    @abstractmethod
+    async def stock_pool(self, codes: list[str] | None = None) -> list[dict]:
+        """股票池行情 dict 列表 (只读)"""
+        ...
+
+    @abstractmethod
+    async def quote_frame(self):
+        """股票池行情快照 (QuoteFrame, 列式, 只读)"""
+        ...
+
+    @abstractmethod
+    async def indicators(self, code: str) -> dict:
+        """当前指标: ma5/10/20/60, volatility, support, resistance (样本不足为 None)"""
+        ...
+
+    @abstractmethod
+    async def kline(self, code: str, count: int = 30) -> list[dict]:
+        """前复权日K (升序)"""
+        ...
+
+    def subscribe(self, callback):
+        """订阅新行情快照 callback(frame) (可能在工作线程中调用), 返回取消订阅函数; 默认不推送"""
+        return lambda: None
+
+    async def _gather(self, fn, codes: list[str]) -> dict:
+        sem = asyncio.Semaphore(FEED_CONCURRENCY)
+
+        async def one(code):
+            async with sem:
+                return await fn(code)
+
+        results = await asyncio.gather(*(one(c) for c in codes), return_exceptions=True)
+        return {c: r for c, r in zip(codes, results) if not isinstance(r, BaseException)}
+
+    async def indicators_many(self, codes: list[str]) -> dict[str, dict]:
+        """并发获取多只股票的指标; 失败的代码不出现在结果中"""
+        return await self._gather(self.indicators, codes)
+
+    async def kline_many(self, codes: list[str], count: int = 30) -> dict[str, list[dict]]:
+        return await self._gather(lambda c: self.kline(c, count), codes)
+
+    async def features(self, names: list[str] | tuple[str, ...], codes: list[str]) -> np.ndarray:
+        """命名因子矩阵 [len(codes), len(names)] (feature_store.FACTORS), 缺失为 NaN
+
+        默认由 quote_frame / indicators_many 直接计算; 实盘数据源走因子特征库缓存。
+        """
+        frame = await self.quote_frame() if feature_store.needs_quotes(names) else None
+        indicators = await self.indicators_many(codes) if feature_store.needs_daily(names) else None
+        return feature_store.build_matrix(names, codes, frame, indicators)
+
+
+class MarketDataFeed(DataFeed):
+    """实盘数据源 — akshare_service 的协程路径 (共享快照缓存 / 本地K线存储 / 流式指标)"""
+
+    async def stock_pool(self, codes: list[str] | None = None) -> list[dict]:
+        return await fetch_stock_pool_async(codes)
+
+    async def quote_frame(self):
+        return await fetch_quote_frame_async()
+
+    def subscribe(self, callback):
+        return subscribe_quote_frames(callback)
+
+    async def indicators(self, code: str) -> dict:
+        return await fetch_indicators_async(code)
+
+    async def kline(self, code: str, count: int = 30) -> list[dict]:
+        return await fetch_kline_async(code, count)
+
+    async def features(self, names: list[str] | tuple[str, ...], codes: list[str]) -> np.ndarray:
+        return await fetch_features_async(list(names), codes)
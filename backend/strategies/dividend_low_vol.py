@@ -1,9 +1,9 @@
 """红利低波策略 — 高股息 + 低波动率"""
 from __future__ import annotations
-import math
 import logging
+import numpy as np
 from strategies.base import BaseStrategy, StrategySignal
-from services.price_service import fetch_kline
+from strategies.data_feed import DataFeed
 
 logger = logging.getLogger(__name__)
 
@@ -18,108 +18,122 @@ DIVIDEND_YIELDS = {
 }
 
 
-def _calc_volatility(klines: list[dict]) -> float:
-    """计算 20 日年化波动率"""
-    closes = [k["close"] for k in klines if k["close"] > 0]
-    if len(closes) < 5:
-        return 999.0  # 数据不足, 给极高波动率
-    returns = []
-    for i in range(1, len(closes)):
-        r = math.log(closes[i] / closes[i - 1])
-        returns.append(r)
-    if not returns:
-        return 999.0
-    mean = sum(returns) / len(returns)
-    var = sum((r - mean) ** 2 for r in returns) / len(returns)
-    daily_vol = math.sqrt(var)
-    return daily_vol * math.sqrt(252)  # 年化
+NO_VOLATILITY = 999.0  # 数据不足时的波动率, 排在最后
+
+
+def rank_scores(
+    div_yield: np.ndarray, volatility: np.ndarray, yield_weight: float = 0.5,
+) -> tuple[np.ndarray, np.ndarray]:
+    """横截面打分: 股息率降序名次 × yield_weight + 波动率升序名次 × (1 - yield_weight), 名次归一化到 [0, 1]
+
+    返回 (order, score): order 为按 score 升序的下标; 同值依次按波动率名次、股息率名次、输入顺序排列。
+    """
+    n = len(div_yield)
+    ranks = np.arange(n) / max(n - 1, 1)
+    div_order = np.argsort(-div_yield, kind="stable")
+    vol_order = div_order[np.argsort(volatility[div_order], kind="stable")]
+    div_rank = np.empty(n)
+    div_rank[div_order] = ranks
+    vol_rank = np.empty(n)
+    vol_rank[vol_order] = ranks
+    score = div_rank * yield_weight + vol_rank * (1 - yield_weight)
+    return vol_order[np.argsort(score[vol_order], kind="stable")], score
 
 
 class DividendLowVolStrategy(BaseStrategy):
     name = "dividend_low_vol"
+    tunable = ("yield_weight", "tail_fraction")
+
+    def __init__(
+        self,
+        feed: DataFeed | None = None,
+        dividend_yields: dict[str, float] | None = None,
+        include_codes: set[str] | None = None,
+        yield_weight: float = 0.5,
+        tail_fraction: float = 0.2,
+    ) -> None:
+        super().__init__(feed)
+        self.dividend_yields = dividend_yields or DIVIDEND_YIELDS
+        self.watch_codes = tuple(self.dividend_yields)
+        self.include_codes = include_codes or set()   # 中间段 (hold) 也输出信号的代码
+        self.yield_weight = yield_weight               # 股息率名次的权重, 其余给波动率名次
+        self.tail_fraction = tail_fraction             # 首 / 尾各取该比例出 buy / sell
 
     async def generate_signals(self, stock_pool: list[dict]) -> list[StrategySignal]:
-        scored = []
-        for stock in stock_pool:
-            code = stock.get("code", "")
-            div_yield = DIVIDEND_YIELDS.get(code)
-            if div_yield is None:
-                continue
-            # 获取 K 线计算波动率
-            try:
-                klines = fetch_kline(code, count=25)
-            except Exception:
-                klines = []
-            vol = _calc_volatility(klines)
-            scored.append({
-                "code": code,
-                "name": stock.get("name", ""),
-                "price": stock.get("price", 0),
-                "div_yield": div_yield,
-                "volatility": vol,
-                "change": stock.get("changePercent", 0),
-            })
-
-        if len(scored) < 3:
-            logger.warning("红利低波: 有效股票不足 %d", len(scored))
+        return self.compute(await self.prepare(stock_pool))
+
+    async def prepare(self, stock_pool: list[dict]) -> dict:
+        candidates = [s for s in stock_pool if s.get("code", "") in self.dividend_yields]
+        codes = [s["code"] for s in candidates]
+        # 近 25 根日K的年化波动率 (因子特征库, 与其他策略共用)
+        vols = (await self.feed.features(("volatility",), codes))[:, 0]
+        return {
+            "codes": codes,
+            "names": [s.get("name", "") for s in candidates],
+            "div_yield": np.array([self.dividend_yields[c] for c in codes], dtype=np.float64),
+            "volatility": np.where(np.isnan(vols), NO_VOLATILITY, vols),
+        }
+
+    def compute(self, data: dict) -> list[StrategySignal]:
+        n = len(data["codes"])
+        if n < 3:
+            logger.warning("红利低波: 有效股票不足 %d", n)
             return []
 
-        # 排名打分
-        scored.sort(key=lambda x: x["div_yield"], reverse=True)
-        for i, s in enumerate(scored):
-            s["div_rank"] = i / max(len(scored) - 1, 1)
-
-        scored.sort(key=lambda x: x["volatility"])
-        for i, s in enumerate(scored):
-            s["vol_rank"] = i / max(len(scored) - 1, 1)
-
-        for s in scored:
-            s["score"] = s["div_rank"] * 0.5 + s["vol_rank"] * 0.5
-
-        scored.sort(key=lambda x: x["score"])
-        return self._build_signals(scored)
-
-    def _build_signals(self, scored: list[dict]) -> list[StrategySignal]:
-        signals = []
-        n = len(scored)
-        top5 = max(1, n // 5)
-
-        for i, s in enumerate(scored):
-            if i < top5:
-                sig = "buy"
-                conf = round(0.7 + 0.2 * (1 - i / top5), 2)
-                exp_ret = round(s["div_yield"] * 0.8, 1)
-                risk = "low"
-                factors = [
-                    f"股息率 {s['div_yield']:.1f}%",
-                    f"波动率 {s['volatility']:.1%}",
-                    "高股息低波动",
-                ]
-            elif i >= n - top5:
-                sig = "sell"
-                conf = round(0.5 + 0.2 * ((i - n + top5) / top5), 2)
-                exp_ret = round(-s["volatility"] * 10, 1)
-                risk = "high"
-                factors = [
-                    f"股息率 {s['div_yield']:.1f}%",
-                    f"波动率 {s['volatility']:.1%}",
-                    "低股息高波动",
-                ]
-            else:
-                sig = "hold"
-                conf = 0.4
-                exp_ret = round(s["div_yield"] * 0.3, 1)
-                risk = "medium"
-                factors = [f"股息率 {s['div_yield']:.1f}%", "中性"]
-
-            signals.append(StrategySignal(
-                stock_code=s["code"],
-                stock_name=s["name"],
-                strategy="dividend_low_vol",
-                signal=sig,
-                confidence=conf,
-                expected_return=exp_ret,
-                risk_level=risk,
-                factors=factors,
-            ))
-        return signals
+        order, _ = rank_scores(data["div_yield"], data["volatility"], self.yield_weight)
+        top5 = max(1, int(n * self.tail_fraction + 1e-9))
+        # 只生成首尾 (buy / sell) 与指定代码的信号
+        picked = np.zeros(n, dtype=bool)
+        picked[:top5] = picked[n - top5:] = True
+        if self.include_codes:
+            picked |= np.isin(np.asarray(data["codes"], dtype=object)[order], list(self.include_codes))
+        positions = np.flatnonzero(picked)
+        rows = order[positions]
+        return [
+            self._signal(i, n, top5, data["codes"][r], data["names"][r], div, vol)
+            for i, r, div, vol in zip(
+                positions.tolist(), rows.tolist(),
+                data["div_yield"][rows].tolist(), data["volatility"][rows].tolist(),
+            )
+        ]
+
+    def _signal(self, i: int, n: int, top5: int, code: str, name: str,
+                div_yield: float, volatility: float) -> StrategySignal:
+        """排名第 i (score 升序) 的股票的信号"""
+        if i < top5:
+            sig = "buy"
+            conf = round(0.7 + 0.2 * (1 - i / top5), 2)
+            exp_ret = round(div_yield * 0.8, 1)
+            risk = "low"
+            factors = [
+                f"股息率 {div_yield:.1f}%",
+                f"波动率 {volatility:.1%}",
+                "高股息低波动",
+            ]
+        elif i >= n - top5:
+            sig = "sell"
+            conf = round(0.5 + 0.2 * ((i - n + top5) / top5), 2)
+            exp_ret = round(-volatility * 10, 1)
+            risk = "high"
+            factors = [
+                f"股息率 {div_yield:.1f}%",
+                f"波动率 {volatility:.1%}",
+                "低股息高波动",
+            ]
+        else:
+            sig = "hold"
+            conf = 0.4
+            exp_ret = round(div_yield * 0.3, 1)
+            risk = "medium"
+            factors = [f"股息率 {div_yield:.1f}%", "中性"]
+
+        return StrategySignal(
+            stock_code=code,
+            stock_name=name,
+            strategy="dividend_low_vol",
+            signal=sig,
+            confidence=conf,
+            expected_return=exp_ret,
+            risk_level=risk,
+            factors=factors,
+        )
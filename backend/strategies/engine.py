@@ -1,56 +1,345 @@
 """策略引擎 — 管理所有策略, 聚合信号"""
 from __future__ import annotations
+import asyncio
 import logging
-import uuid
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import numpy as np
+from config import settings
 from strategies.base import BaseStrategy, StrategySignal
+from strategies.data_feed import DataFeed, MarketDataFeed
 from strategies.dividend_low_vol import DividendLowVolStrategy
-from services.price_service import fetch_stock_pool
+from strategies.signal_book import SignalBook
 
 logger = logging.getLogger(__name__)
 
+RUN_HISTORY = 50  # 每个策略保留的最近运行耗时数
+
+
+class StrategyRunStats:
+    """单个策略的运行记录"""
 
-class StrategyEngine:
     def __init__(self) -> None:
+        self.durations: deque[float] = deque(maxlen=RUN_HISTORY)  # 毫秒
+        self.runs = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.last_status = ""
+        self.last_error: str | None = None
+        self.last_ok = ""      # 最近一次按时完成的时间
+        self.signals = 0       # 当前发布的信号数
+        self.triggered = 0     # 行情事件触发的运行次数
+
+    def record(self, elapsed: float, status: str, error: str | None = None) -> None:
+        self.runs += 1
+        self.durations.append(round(elapsed * 1000, 1))
+        self.last_status = status
+        self.last_error = error
+        if status == "timeout":
+            self.timeouts += 1
+        elif status == "error":
+            self.errors += 1
+        else:
+            self.last_ok = datetime.now().isoformat()
+
+    def snapshot(self) -> dict:
+        data = sorted(self.durations)
+        return {
+            "runs": self.runs,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "lastStatus": self.last_status,
+            "lastError": self.last_error,
+            "lastOk": self.last_ok,
+            "signals": self.signals,
+            "triggered": self.triggered,
+            "lastMs": self.durations[-1] if self.durations else None,
+            "p50Ms": data[len(data) // 2] if data else None,
+            "maxMs": data[-1] if data else None,
+        }
+
+
+class StrategyEngine:
+    def __init__(self, feed: DataFeed | None = None, process_workers: int | None = None,
+                 persist: bool = True) -> None:
+        """persist=False 时信号只保存在内存信号簿中, 不读写 signals 表 (基准测试 / 离线使用)"""
+        self.feed = feed or MarketDataFeed()
         self._strategies: list[BaseStrategy] = [
-            DividendLowVolStrategy(),
+            DividendLowVolStrategy(self.feed),
         ]
+        self.book = SignalBook()                     # 各策略最近一次按时完成的信号 + 变更日志
+        self._listeners: list = []                   # 信号变更回调 (async, 参数为 changes_since 格式)
+        self._persist = persist
+        self._stats: dict[str, StrategyRunStats] = {s.name: StrategyRunStats() for s in self._strategies}
         self._cached_signals: list[dict] = []
         self._last_run: str = ""
+        self._run_lock = asyncio.Lock()
+        self._process_workers = (settings.strategy_process_workers
+                                 if process_workers is None else process_workers)
+        self._pool: ProcessPoolExecutor | None = None
+        # 事件触发状态
+        self._ref_prices: dict[str, tuple[np.ndarray, np.ndarray]] = {}  # 策略 → 上次成功运行时关注的 (代码, 价格)
+        self._ref_index: dict[str, tuple[np.ndarray, np.ndarray]] = {}   # 策略 → (快照代码列, 参考代码在其中的行号)
+        self._dirty: set[str] = set()
+        self._last_started: dict[str, float] = {}            # 策略 → 上次运行开始 (monotonic)
+        self._moved = False        # 上次全量运行后行情是否变化过
+        self._wakeup: asyncio.Event | None = None
+        self._retry: asyncio.TimerHandle | None = None
 
     async def run_all(self) -> list[dict]:
-        """运行所有策略, 返回前端格式信号"""
+        """并发运行所有策略 (共享同一份股票池快照), 返回前端格式信号
+
+        每个策略有独立期限, 超时或异常的策略沿用上一次的信号, 不拖慢其他策略发布。
+        """
+        self._moved = False
+        return await self._run(self._strategies)
+
+    async def run_some(self, names: set[str]) -> list[dict]:
+        """只运行指定策略, 其余策略的信号保持不变"""
+        return await self._run([s for s in self._strategies if s.name in names])
+
+    async def _run(self, strategies: list[BaseStrategy]) -> list[dict]:
+        async with self._run_lock:
+            try:
+                stock_pool = await self.feed.stock_pool()
+            except Exception as e:
+                logger.error("获取股票池失败: %s", e)
+                return self._cached_signals
+
+            now = time.monotonic()
+            for strat in strategies:
+                self._dirty.discard(strat.name)
+                self._last_started[strat.name] = now
+
+            results = await asyncio.gather(*(self._run_one(s, stock_pool) for s in strategies))
+            before = self.book.version
+            for strat, sigs in zip(strategies, results):
+                if sigs is None:
+                    # 超时 / 异常: 保留旧的参考价, 之后的行情变动仍按旧基准重新触发;
+                    # 从未成功过的策略没有参考价, 让兜底运行不被 "行情无变化" 跳过
+                    if strat.name not in self._ref_prices:
+                        self._moved = True
+                    continue
+                self._ref_prices[strat.name] = self._watched_prices(strat, stock_pool)
+                self._ref_index.pop(strat.name, None)
+                self._stats[strat.name].signals = len(sigs)
+                changes = self.book.apply(strat.name, [self._to_frontend(s) for s in sigs])
+                if not self._persist:
+                    continue
+                try:
+                    await self.book.persist(strat.name, changes)
+                except Exception as e:
+                    logger.error("信号写入失败: %s", e)
+
+            self._cached_signals = self.book.signals(self._order())
+            self._last_run = datetime.now().isoformat()
+            logger.info("策略引擎完成, 共 %d 个信号 (版本 %d)", len(self._cached_signals), self.book.version)
+            if self.book.version != before:
+                await self._notify(self.changes_since(before))
+            return self._cached_signals
+
+    async def _run_one(self, strat: BaseStrategy, stock_pool: list[dict]) -> list[StrategySignal] | None:
+        """运行单个策略并记录耗时; 超时 / 异常返回 None"""
+        t0 = time.perf_counter()
         try:
-            stock_pool = fetch_stock_pool()
+            sigs = await asyncio.wait_for(self._execute(strat, stock_pool), timeout=strat.timeout)
+        except asyncio.TimeoutError:
+            self._stats[strat.name].record(time.perf_counter() - t0, "timeout")
+            logger.warning("策略 %s 超过 %gs 期限, 沿用上次信号", strat.name, strat.timeout)
+            return None
         except Exception as e:
-            logger.error("获取股票池失败: %s", e)
-            return self._cached_signals
+            self._stats[strat.name].record(time.perf_counter() - t0, "error", str(e))
+            logger.error("策略 %s 异常: %s", strat.name, e)
+            return None
+        elapsed = time.perf_counter() - t0
+        self._stats[strat.name].record(elapsed, "ok")
+        logger.info("%s 产生 %d 个信号 (%.0f ms)", strat.name, len(sigs), elapsed * 1000)
+        return sigs
+
+    async def _execute(self, strat: BaseStrategy, stock_pool: list[dict]) -> list[StrategySignal]:
+        if not strat.run_in_process:
+            return await strat.generate_signals(stock_pool)
+        data = await strat.prepare(stock_pool)
+        # 超时只放弃结果, 已提交的计算仍会在进程 / 线程中跑完
+        return await asyncio.get_running_loop().run_in_executor(self._get_pool(), strat.compute, data)
+
+    def _get_pool(self) -> ProcessPoolExecutor | None:
+        """进程池 (未配置时返回 None, 即默认线程池)"""
+        if self._process_workers <= 0:
+            return None
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self._process_workers)
+        return self._pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # ── 事件触发: 行情快照变动超过阈值的策略才重算 ──
+    @staticmethod
+    def _watched_prices(strat: BaseStrategy, stock_pool: list[dict]) -> tuple[np.ndarray, np.ndarray]:
+        watch = set(strat.watch_codes) if strat.watch_codes is not None else None
+        rows = [
+            (s["code"], s.get("price", 0))
+            for s in stock_pool
+            if s.get("price", 0) > 0 and (watch is None or s["code"] in watch)
+        ]
+        return (np.array([c for c, _ in rows], dtype=object),
+                np.array([p for _, p in rows], dtype=np.float64))
 
-        all_signals: list[StrategySignal] = []
+    def _frame_rows(self, name: str, codes: np.ndarray, frame) -> np.ndarray:
+        """参考代码在快照中的行号 (缺失为 -1); 快照代码列不变时复用上次的结果"""
+        cached = self._ref_index.get(name)
+        if cached is not None and (cached[0] is frame.codes or np.array_equal(cached[0], frame.codes)):
+            return cached[1]
+        found = [frame.index_of(c) for c in codes.tolist()]
+        rows = np.array([-1 if i is None else i for i in found], dtype=np.int64)
+        self._ref_index[name] = (frame.codes, rows)
+        return rows
+
+    def on_frame(self, frame) -> None:
+        """新行情快照 (事件循环线程内调用): 标记输入变动超过阈值的策略"""
+        changed = False
         for strat in self._strategies:
-            try:
-                sigs = await strat.generate_signals(stock_pool)
-                all_signals.extend(sigs)
-                logger.info("%s 产生 %d 个信号", strat.name, len(sigs))
-            except Exception as e:
-                logger.error("策略 %s 异常: %s", strat.name, e)
+            ref = self._ref_prices.get(strat.name)
+            if ref is None or not len(ref[0]) or strat.name in self._dirty:
+                continue
+            codes, p0 = ref
+            rows = self._frame_rows(strat.name, codes, frame)
+            hit = rows >= 0
+            price = frame.price[rows[hit]]
+            live = price > 0
+            move = float(np.abs(price[live] / p0[hit][live] - 1).max()) * 100 if live.any() else 0.0
+            if move > 0:
+                self._moved = True
+            if move >= strat.trigger_threshold:
+                self._dirty.add(strat.name)
+                changed = True
+        if changed and self._wakeup is not None:
+            self._wakeup.set()
 
-        self._cached_signals = [self._to_frontend(s) for s in all_signals]
-        self._last_run = datetime.now().isoformat()
-        logger.info("策略引擎完成, 共 %d 个信号", len(self._cached_signals))
-        return self._cached_signals
+    def _due(self) -> tuple[set[str], float | None]:
+        """可立即运行的已标记策略, 以及其余被限频策略的最短等待时间"""
+        now = time.monotonic()
+        due, wait = set(), None
+        for name in self._dirty:
+            remain = self._last_started.get(name, 0.0) + settings.strategy_trigger_min_interval - now
+            if remain <= 0:
+                due.add(name)
+            else:
+                wait = remain if wait is None else min(wait, remain)
+        return due, wait
+
+    async def trigger_loop(self) -> None:
+        """事件驱动运行策略, 兜底定时全量运行 (无行情变化时跳过)"""
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        unsubscribe = self.feed.subscribe(lambda frame: loop.call_soon_threadsafe(self.on_frame, frame))
+        next_full = 0.0
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), max(0.0, next_full - time.monotonic()))
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+                if time.monotonic() >= next_full:
+                    if self._moved or not self._last_run:
+                        await self._guarded(self.run_all())
+                    else:
+                        logger.debug("行情无变化, 跳过兜底运行")
+                    next_full = time.monotonic() + settings.strategy_fallback_interval
+                    continue
+
+                # 合并短时间内连续到达的快照
+                await asyncio.sleep(settings.strategy_trigger_debounce)
+                due, wait = self._due()
+                if due:
+                    for name in due:
+                        self._stats[name].triggered += 1
+                    logger.info("行情触发策略: %s", ", ".join(sorted(due)))
+                    await self._guarded(self.run_some(due))
+                if wait is not None:
+                    if self._retry is not None:
+                        self._retry.cancel()
+                    self._retry = loop.call_later(wait, self._wakeup.set)
+        finally:
+            unsubscribe()
+            if self._retry is not None:
+                self._retry.cancel()
+            self._wakeup = None
+
+    async def _guarded(self, run) -> None:
+        try:
+            await run
+        except Exception as e:
+            logger.error("策略引擎异常: %s", e)
+
+    def strategy(self, name: str) -> BaseStrategy | None:
+        return next((s for s in self._strategies if s.name == name), None)
 
     def get_cached_signals(self) -> list[dict]:
         return self._cached_signals
 
+    # ── 信号差异发布 ──
+    def _order(self) -> list[str]:
+        return [s.name for s in self._strategies]
+
+    @property
+    def version(self) -> int:
+        return self.book.version
+
+    def changes_since(self, since: int) -> dict:
+        """游标 since 之后新增 / 变化 / 过期的信号"""
+        return self.book.changes_since(since, self._order())
+
+    def subscribe(self, callback):
+        """注册信号变更回调 (async); 返回取消函数"""
+        self._listeners.append(callback)
+        return lambda: self._listeners.remove(callback) if callback in self._listeners else None
+
+    async def _notify(self, diff: dict) -> None:
+        for callback in list(self._listeners):
+            try:
+                await callback(diff)
+            except Exception as e:
+                logger.error("信号变更回调异常: %s", e)
+
+    async def restore(self) -> None:
+        """启动时从 signals 表恢复当前时间桶内的有效信号与版本号"""
+        if not self._persist:
+            return
+        try:
+            await self.book.load(self._order())
+        except Exception as e:
+            logger.error("恢复信号失败: %s", e)
+        self._cached_signals = self.book.signals(self._order())
+
+    def run_stats(self) -> dict:
+        """各策略运行耗时 / 超时 / 异常统计"""
+        return {
+            s.name: {
+                **self._stats[s.name].snapshot(),
+                "timeoutSec": s.timeout,
+                "inProcess": s.run_in_process,
+                "triggerPct": s.trigger_threshold,
+                "pending": s.name in self._dirty,
+            }
+            for s in self._strategies
+        }
+
     @property
     def last_run(self) -> str:
         return self._last_run
 
     @staticmethod
     def _to_frontend(sig: StrategySignal) -> dict:
+        """id / time (首次出现) / version 由信号簿填充"""
         return {
-            "id": f"sig-{uuid.uuid4().hex[:8]}",
             "stockCode": sig.stock_code,
             "stockName": sig.stock_name,
             "strategy": sig.strategy,
@@ -59,7 +348,6 @@ class StrategyEngine:
             "expectedReturn": sig.expected_return,
             "riskLevel": sig.risk_level,
             "factors": sig.factors,
-            "time": datetime.now().strftime("%H:%M:%S"),
         }
 
 
@@ -0,0 +1,153 @@
+"""策略洞察 — 五类洞察作为策略插件, 由同一份行情快照一次算齐并按类型缓存"""
+from __future__ import annotations
+import asyncio
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from strategies.base import BaseStrategy, StrategySignal
+from strategies.data_feed import DataFeed, MarketDataFeed
+
+# 把 scripts/ 加入 sys.path 以便 import akshare_service
+_scripts_dir = str(Path(__file__).resolve().parent.parent.parent / "scripts")
+if _scripts_dir not in sys.path:
+    sys.path.insert(0, _scripts_dir)
+
+import akshare_service as aks  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+INSIGHT_TTL = 300.0  # 缓存有效期 (秒), 与调度间隔一致
+
+
+class InsightStrategy(BaseStrategy):
+    """洞察类策略: 输出前端洞察卡片 (dict), 不产生交易信号"""
+    insight_type: str = ""
+    data_type: str = ""   # data_history 中的类型名
+
+    async def generate_signals(self, stock_pool: list[dict]) -> list[StrategySignal]:
+        return []
+
+    async def refresh_state(self) -> None:
+        """每次刷新计算前的异步准备 (如更新依赖日K的中间状态), 默认无"""
+
+    def build(self, frame, now: datetime, quotes: list[dict]) -> list[dict]:
+        return aks.build_insights(frame, self.insight_type, now, quotes)
+
+
+class TrendFollowInsights(InsightStrategy):
+    name = "insight_trend_follow"
+    insight_type = "trend_follow"
+    data_type = "insight_trend"
+
+
+class MeanReversionInsights(InsightStrategy):
+    name = "insight_mean_reversion"
+    insight_type = "mean_reversion"
+    data_type = "insight_meanrev"
+
+
+class StatArbInsights(InsightStrategy):
+    name = "insight_stat_arb"
+    insight_type = "stat_arb"
+    data_type = "insight_statarb"
+
+    async def refresh_state(self) -> None:
+        """更新同行业协整配对簿 (日K无变化的行业跳过)"""
+        await aks.refresh_pair_book_async()
+
+
+class HftInsights(InsightStrategy):
+    name = "insight_hft"
+    insight_type = "hft"
+    data_type = "insight_hft"
+
+
+class MultiFactorInsights(InsightStrategy):
+    name = "insight_multi_factor"
+    insight_type = "multi_factor"
+    data_type = "insight_mf"
+
+
+INSIGHT_STRATEGIES: list[type[InsightStrategy]] = [
+    TrendFollowInsights,
+    MeanReversionInsights,
+    StatArbInsights,
+    HftInsights,
+    MultiFactorInsights,
+]
+
+
+class InsightEngine:
+    """一次刷新 = 一次行情快照 + 全部洞察插件; 并发请求共享同一次刷新"""
+
+    def __init__(self, feed: DataFeed | None = None, ttl: float = INSIGHT_TTL) -> None:
+        self.feed = feed or MarketDataFeed()
+        self.ttl = ttl
+        self._strategies = {cls.insight_type: cls(self.feed) for cls in INSIGHT_STRATEGIES}
+        self._cache: dict[str, list[dict]] = {}
+        self._updated = 0.0          # time.monotonic()
+        self._updated_at = ""
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+        self.failures = 0
+
+    @property
+    def types(self) -> list[str]:
+        return list(self._strategies)
+
+    def data_type(self, insight_type: str) -> str | None:
+        """洞察类型 → data_history 类型名"""
+        strat = self._strategies.get(insight_type)
+        return strat.data_type if strat else None
+
+    def _fresh(self) -> bool:
+        return bool(self._cache) and time.monotonic() - self._updated < self.ttl
+
+    async def refresh(self) -> dict[str, list[dict]]:
+        """重新抓取行情快照并计算全部类型"""
+        frame = await self.feed.quote_frame()
+        now = datetime.now()
+        quotes = frame.to_dicts()
+        cache = {}
+        for insight_type, strat in self._strategies.items():
+            try:
+                await strat.refresh_state()
+                cache[insight_type] = strat.build(frame, now, quotes)
+            except Exception as e:
+                logger.error("洞察 %s 计算失败: %s", insight_type, e)
+                cache[insight_type] = self._cache.get(insight_type, [])
+        self._cache = cache
+        self._updated = time.monotonic()
+        self._updated_at = now.isoformat()
+        self.refreshes += 1
+        return cache
+
+    async def get(self, insight_type: str = "trend_follow") -> list[dict] | dict:
+        """某类洞察 (缓存过期时刷新); 刷新失败沿用旧缓存, 无缓存时返回 {'error': ...}"""
+        if insight_type not in self._strategies:
+            return []
+        if not self._fresh():
+            async with self._lock:
+                if not self._fresh():
+                    try:
+                        await self.refresh()
+                    except Exception as e:
+                        self.failures += 1
+                        logger.error("洞察刷新失败: %s", e)
+                        if not self._cache:
+                            return {"error": str(e)}
+        return self._cache.get(insight_type, [])
+
+    def stats(self) -> dict:
+        return {
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "updatedAt": self._updated_at,
+            "ageSec": round(time.monotonic() - self._updated, 1) if self._updated else None,
+            "counts": {t: len(v) for t, v in self._cache.items()},
+        }
+
+
+insight_engine = InsightEngine()
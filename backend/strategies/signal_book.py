@@ -0,0 +1,184 @@
+"""信号簿 — 确定性信号 ID、运行间差异、版本游标与 signals 表生命周期"""
+from __future__ import annotations
+import hashlib
+import json
+import logging
+from collections import deque
+from datetime import datetime
+from config import settings
+from db import get_db
+
+logger = logging.getLogger(__name__)
+
+CHANGE_LOG = 5000   # 保留的变更条数; 游标早于最早一条时返回全量
+# 参与比较的内容字段 (id / time / version 由信号簿维护)
+_CONTENT = ("stockName", "confidence", "expectedReturn", "riskLevel", "factors")
+
+
+def time_bucket(now: datetime | None = None) -> str:
+    """信号时间分桶: signal_bucket_minutes=0 按自然日, 否则按分钟数向下取整"""
+    now = now or datetime.now()
+    minutes = settings.signal_bucket_minutes
+    if minutes <= 0:
+        return now.strftime("%Y%m%d")
+    m = (now.hour * 60 + now.minute) // minutes * minutes
+    return f"{now:%Y%m%d}T{m // 60:02d}{m % 60:02d}"
+
+
+def signal_id(strategy: str, code: str, direction: str, bucket: str) -> str:
+    """同一策略 / 代码 / 方向在同一时间桶内 ID 不变"""
+    key = f"{strategy}|{code}|{direction}|{bucket}"
+    return "sig-" + hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+class SignalBook:
+    """当前有效信号 + 变更日志
+
+    每次 apply() 为一个版本; 变更为 added / changed / expired 三类,
+    changes_since(v) 合并 v 之后的变更, 客户端按 id upsert / 删除即可与服务端一致。
+    """
+
+    def __init__(self) -> None:
+        self.version = 0
+        self._active: dict[str, dict[str, dict]] = {}      # 策略 → {id: 信号} (保持本次输出顺序)
+        self._log: deque[tuple[int, str, str, dict | None]] = deque(maxlen=CHANGE_LOG)  # (版本, 操作, id, 信号)
+
+    def signals(self, order: list[str] | None = None) -> list[dict]:
+        names = order if order is not None else list(self._active)
+        return [sig for name in names for sig in self._active.get(name, {}).values()]
+
+    def apply(self, strategy: str, signals: list[dict], now: datetime | None = None) -> list[tuple[str, dict]]:
+        """用策略本次输出替换其当前信号, 返回 [(操作, 信号)]; 无变化时不增加版本"""
+        now = now or datetime.now()
+        bucket = time_bucket(now)
+        old = self._active.get(strategy, {})
+        new: dict[str, dict] = {}
+        changes: list[tuple[str, dict]] = []
+        version = self.version + 1
+        for sig in signals:
+            sid = signal_id(strategy, sig["stockCode"], sig["signal"], bucket)
+            if sid in new:   # 同一代码同方向重复输出, 保留第一条
+                continue
+            prev = old.get(sid)
+            if prev is None:
+                sig = {"id": sid, **sig, "time": now.strftime("%H:%M:%S"), "version": version}
+                changes.append(("added", sig))
+            elif any(prev.get(k) != sig.get(k) for k in _CONTENT):
+                sig = {**prev, **sig, "id": sid, "time": prev["time"], "version": version}
+                changes.append(("changed", sig))
+            else:
+                sig = prev
+            new[sid] = sig
+        for sid, prev in old.items():
+            if sid not in new:
+                changes.append(("expired", prev))
+        self._active[strategy] = new
+        if changes:
+            self.version = version
+            for op, sig in changes:
+                self._log.append((version, op, sig["id"], None if op == "expired" else sig))
+        return changes
+
+    def changes_since(self, since: int, order: list[str] | None = None) -> dict:
+        """游标 since 之后的合并变更; 游标过旧 (日志已滚出) 或超前时 reset=True 并附全量"""
+        lost = since < self.version and (not self._log or self._log[0][0] > since + 1)
+        if since < 0 or since > self.version or lost:
+            return {"version": self.version, "reset": True, "signals": self.signals(order),
+                    "added": [], "changed": [], "expired": []}
+        merged: dict[str, tuple[str, dict | None]] = {}
+        for version, op, sid, sig in self._log:
+            if version <= since:
+                continue
+            prev = merged.get(sid)
+            if prev is not None and prev[0] == "added" and op == "changed":
+                op = "added"
+            if prev is not None and prev[0] == "added" and op == "expired":
+                del merged[sid]   # 游标之后新增又过期, 客户端无需知道
+                continue
+            if prev is not None and prev[0] == "expired" and op != "expired":
+                op = "added"
+            merged[sid] = (op, sig)
+        return {
+            "version": self.version,
+            "reset": False,
+            "added": [s for op, s in merged.values() if op == "added"],
+            "changed": [s for op, s in merged.values() if op == "changed"],
+            "expired": [sid for sid, (op, _) in merged.items() if op == "expired"],
+        }
+
+    # ── 持久化 ──
+    async def persist(self, strategy: str, changes: list[tuple[str, dict]], now: datetime | None = None) -> None:
+        """把一次 apply() 的变更写入 signals 表"""
+        if not changes:
+            return
+        ts = (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+        bucket = time_bucket(now)
+        db = await get_db()
+        upserts = [
+            (s["id"], strategy, s["stockCode"], s["stockName"], s["signal"], bucket,
+             s["confidence"], s["expectedReturn"], s["riskLevel"], json.dumps(s["factors"], ensure_ascii=False),
+             ts, ts, s["version"], json.dumps(s, ensure_ascii=False))
+            for op, s in changes if op != "expired"
+        ]
+        await db.executemany(
+            """INSERT INTO signals (id, strategy, stock_code, stock_name, signal, bucket, status,
+                                    confidence, expected_return, risk_level, factors_json,
+                                    first_seen, updated_at, version, data_json)
+               VALUES (?, ?, ?, ?, ?, ?, 'active', ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(id) DO UPDATE SET
+                   status = 'active', expired_at = NULL, stock_name = excluded.stock_name,
+                   confidence = excluded.confidence, expected_return = excluded.expected_return,
+                   risk_level = excluded.risk_level, factors_json = excluded.factors_json,
+                   updated_at = excluded.updated_at, version = excluded.version,
+                   data_json = excluded.data_json, updates = updates + 1""",
+            upserts,
+        )
+        await db.executemany(
+            "UPDATE signals SET status = 'expired', expired_at = ?, version = ? WHERE id = ?",
+            [(ts, self.version, s["id"]) for op, s in changes if op == "expired"],
+        )
+        await db.commit()
+
+    async def load(self, order: list[str] | None = None) -> int:
+        """启动时恢复: 当前时间桶内仍有效的信号与最大版本号, 更早时间桶的有效信号标记为过期"""
+        db = await get_db()
+        cur = await db.execute("SELECT COALESCE(MAX(version), 0) FROM signals")
+        self.version = (await cur.fetchone())[0]
+        bucket = time_bucket()
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        await db.execute(
+            "UPDATE signals SET status = 'expired', expired_at = ? WHERE status = 'active' AND bucket != ?",
+            (now, bucket),
+        )
+        await db.commit()
+        cur = await db.execute(
+            "SELECT strategy, data_json FROM signals WHERE status = 'active' AND bucket = ? ORDER BY rowid",
+            (bucket,),
+        )
+        rows = await cur.fetchall()
+        self._active = {}
+        for strategy, data_json in rows:
+            if order is None or strategy in order:
+                sig = json.loads(data_json)
+                self._active.setdefault(strategy, {})[sig["id"]] = sig
+        logger.info("恢复 %d 个有效信号 (版本 %d)", len(rows), self.version)
+        return len(rows)
+
+
+async def signal_history(code: str | None = None, strategy: str | None = None,
+                         status: str | None = None, limit: int = 100) -> list[dict]:
+    """signals 表查询 (按最近更新倒序)"""
+    db = await get_db()
+    where, args = [], []
+    for col, val in (("stock_code", code), ("strategy", strategy), ("status", status)):
+        if val:
+            where.append(f"{col} = ?")
+            args.append(val)
+    sql = """SELECT id, strategy, stock_code, stock_name, signal, status, confidence, expected_return,
+                    risk_level, first_seen, updated_at, expired_at, updates FROM signals"""
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    cur = await db.execute(sql + " ORDER BY updated_at DESC LIMIT ?", args + [limit])
+    keys = ("id", "strategy", "stockCode", "stockName", "signal", "status", "confidence", "expectedReturn",
+            "riskLevel", "firstSeen", "updatedAt", "expiredAt", "updates")
+    return [dict(zip(keys, row)) for row in await cur.fetchall()]
@@ -3,13 +3,37 @@
 多源行情数据服务 — 腾讯财经 + 新浪财经 + AKShare(备用)
 供 Next.js API Route 通过 child_process 调用
 """
+import asyncio
 import json
+import logging
+import operator
+import os
 import re
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from urllib.request import Request, urlopen
 from urllib.parse import quote
 
+import numpy as np
+
+import async_http
+import bar_builder
+import circuit_breaker
+import factor_model
+import feature_store
+import flow_store
+import http_pool
+import indicator_stream
+import kline_store
+import pair_engine
+import source_selector
+import trading_calendar
+from quote_frame import COL, QuoteFrame
+
+logger = logging.getLogger('akshare_service')
+
 # ── 默认股票池 (与前端 mockStocks 对齐) ──
 DEFAULT_CODES = [
     '600519', '000858', '601318', '000001', '600036',
@@ -20,6 +44,50 @@ DEFAULT_CODES = [
     '601225', '002352', '300059', '688111', '002371',
 ]
 
+# ── 股票池 (universe) — 可由文件配置为全市场 ──
+_universe = None
+
+
+def load_universe(path):
+    """读取股票池文件: 每行一个或逗号分隔的 6 位代码, # 开头为注释"""
+    codes = []
+    seen = set()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            for token in re.split(r'[\s,]+', line):
+                m = re.search(r'\d{6}', token)
+                if m and m.group(0) not in seen:
+                    seen.add(m.group(0))
+                    codes.append(m.group(0))
+    return codes
+
+
+def configure_universe(path=None):
+    """设置股票池文件; 为空时回退到 DEFAULT_CODES"""
+    global _universe
+    _universe = load_universe(path) if path else None
+    return universe_codes()
+
+
+def universe_codes():
+    """当前股票池代码"""
+    return _universe or DEFAULT_CODES
+
+
+if os.environ.get('QMT_UNIVERSE_FILE'):
+    configure_universe(os.environ['QMT_UNIVERSE_FILE'])
+
+# ── 本地数据目录 (资金流 / K线存储) ──
+DATA_DIR = os.environ.get('QMT_DATA_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def configure_data_dir(path):
+    """设置本地存储目录, 需在首次读写存储前调用"""
+    global DATA_DIR
+    DATA_DIR = path
+
 HEADERS = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)',
            'Referer': 'https://finance.sina.com.cn'}
 
@@ -31,17 +99,100 @@ def _code_to_tencent(code):
     """600519 → sh600519, 510050 → sh510050"""
     return ('sh' if code.startswith(('5', '6', '9')) else 'sz') + code
 
-def _http_get(url, timeout=10):
-    req = Request(url, headers=HEADERS)
-    with urlopen(req, timeout=timeout) as resp:
-        return resp.read().decode('gbk', errors='replace')
+def _http_get(url, timeout=10, headers=None):
+    return _http_get_bytes(url, timeout, headers).decode('gbk', errors='replace')
+
+def _http_get_bytes(url, timeout=10, headers=None, stale=True):
+    """原始响应体 — 经接口熔断器; 熔断期间 stale=True 时返回该 URL 上次成功的响应"""
+    return circuit_breaker.call(
+        url, lambda: http_pool.get(url, headers={**HEADERS, **(headers or {})}, timeout=timeout).body,
+        stale=stale)
+
+async def _http_get_async(url, timeout=10, headers=None, encoding='gbk', stale=True):
+    """事件循环内的 HTTP GET — 按数据源限流, 经接口熔断器; encoding=None 返回原始 bytes"""
+    async def fetch():
+        resp = await async_http.get(url, headers={**HEADERS, **(headers or {})}, timeout=timeout)
+        return resp.body
+    body = await circuit_breaker.acall(url, fetch, stale=stale)
+    return body.decode(encoding, errors='replace') if encoding else body
 
 
 # ═══════════════════════════════════════════
 # 腾讯财经解析 (主数据源)
 # ═══════════════════════════════════════════
-def _parse_tencent_quote(raw_line):
-    """解析腾讯行情单行: v_sh600519="1~贵州茅台~600519~1504.33~..." """
+# 整包解析: 不做 GBK 全文解码和逐行正则, 只解码名称; 数值字段收集后按列批量转换
+_TENCENT_NUM_FIELDS = (3, 31, 32, 36, 37, 33, 34, 5, 4, 38, 39, 46)  # 顺序同 FIELDS
+_QUOTE_DECIMALS = {'change': 2, 'changePercent': 2, 'amount': 2,
+                   'turnover': 2, 'pe': 1, 'pb': 2}
+
+
+def _columns_to_frame(codes, names, tokens, width):
+    """codes / names 为原始 bytes, tokens 为按行展开的数值字段; 转为 [width, n] 列写入 QuoteFrame"""
+    n = len(codes)
+    frame = QuoteFrame.empty(n)
+    if not n:
+        return frame
+    # 名称与代码各只解码一次 (GBK 尾字节 ≥0x40, 不会与换行符冲突)
+    frame.codes[:] = b'\n'.join(codes).decode('ascii').split('\n')
+    frame.names[:] = b'\n'.join(names).decode('gbk', errors='replace').split('\n')
+    flat = np.fromiter(map(float, [t or b'0' for t in tokens]), np.float64, n * width)
+    frame.values[:width] = flat.reshape(n, width).T
+    return frame
+
+
+def _split_tencent_fields(payload, code):
+    """按 '~' 拆分; 名称 (字段1) 的 GBK 尾字节可能是 '~', 此时以 "~代码~" 重新定位"""
+    fields = payload.split(b'~')
+    if len(fields) > 2 and fields[2] == code:
+        return fields
+    name_start = payload.find(b'~') + 1
+    name_end = payload.find(b'~' + code + b'~', name_start)
+    if not name_start or name_end < 0:
+        return None
+    return [payload[:name_start - 1], payload[name_start:name_end]] + payload[name_end + 1:].split(b'~')
+
+
+def _round_col(col, decimals):
+    """按列舍入, 结果与内置 round 一致
+
+    np.round 先放大再取整, 只在 .5 附近与 round (十进制精确舍入) 结果不同, 这些元素逐个修正
+    """
+    out = np.round(col, decimals)
+    scaled = col * 10.0 ** decimals
+    for i in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6).tolist():
+        out[i] = round(float(col[i]), decimals)
+    return out
+
+
+def _parse_tencent_bulk(body):
+    """整包解析腾讯行情 (bytes) → QuoteFrame"""
+    pick = operator.itemgetter(*_TENCENT_NUM_FIELDS)
+    codes, names, tokens = [], [], []
+    for rec in body.split(b'";'):
+        head, sep, payload = rec.partition(b'="')
+        sym = head.find(b'v_')
+        if not sep or sym < 0:
+            continue
+        code = head[sym + 4:]
+        fields = _split_tencent_fields(payload, code)
+        if fields is None or len(fields) < 50:
+            continue
+        codes.append(code)
+        names.append(fields[1])
+        tokens.extend(pick(fields))
+    frame = _columns_to_frame(codes, names, tokens, len(_TENCENT_NUM_FIELDS))
+    v = frame.values
+    v[COL['volume']] = np.trunc(v[COL['volume']])
+    for field, decimals in _QUOTE_DECIMALS.items():
+        v[COL[field]] = _round_col(v[COL[field]], decimals)
+    return frame
+
+
+def _parse_tencent_row(raw_line):
+    """解析腾讯行情单行: v_sh600519="1~贵州茅台~600519~1504.33~..."
+
+    返回 (code, name, 数值列), 数值列顺序同 quote_frame.FIELDS
+    """
     m = re.match(r'v_(\w+)="(.+)";', raw_line.strip())
     if not m:
         return None
@@ -49,43 +200,71 @@ def _parse_tencent_quote(raw_line):
     if len(fields) < 50:
         return None
     try:
-        return {
-            'code': fields[2],
-            'name': fields[1],
-            'price': float(fields[3] or 0),
-            'change': round(float(fields[31] or 0), 2),
-            'changePercent': round(float(fields[32] or 0), 2),
-            'volume': int(float(fields[36] or 0)),
-            'amount': round(float(fields[37] or 0), 2),
-            'high': float(fields[33] or 0),
-            'low': float(fields[34] or 0),
-            'open': float(fields[5] or 0),
-            'prevClose': float(fields[4] or 0),
-            'turnoverRate': round(float(fields[38] or 0), 2),
-            'pe': round(float(fields[39] or 0), 1),
-            'pb': round(float(fields[46] or 0), 2),
-        }
+        return fields[2], fields[1], (
+            float(fields[3] or 0),                    # price
+            round(float(fields[31] or 0), 2),         # change
+            round(float(fields[32] or 0), 2),         # changePercent
+            int(float(fields[36] or 0)),              # volume
+            round(float(fields[37] or 0), 2),         # amount
+            float(fields[33] or 0),                   # high
+            float(fields[34] or 0),                   # low
+            float(fields[5] or 0),                    # open
+            float(fields[4] or 0),                    # prevClose
+            round(float(fields[38] or 0), 2),         # turnover
+            round(float(fields[39] or 0), 1),         # pe
+            round(float(fields[46] or 0), 2),         # pb
+        )
     except (ValueError, IndexError):
         return None
 
 
+def _fill_frame(raw, parse_row):
+    """逐行解析, 直接写入预分配的 QuoteFrame"""
+    lines = raw.strip().split('\n')
+    frame = QuoteFrame.empty(len(lines))
+    n = 0
+    for line in lines:
+        row = parse_row(line)
+        if row:
+            frame.codes[n], frame.names[n], frame.values[:, n] = row
+            n += 1
+    return frame.truncate(n)
+
+
+def _tencent_quote_url(codes):
+    return 'http://qt.gtimg.cn/q=' + ','.join(_code_to_tencent(c) for c in codes)
+
+
+def _parse_tencent_body(body):
+    try:
+        return _parse_tencent_bulk(body)
+    except ValueError:
+        # 个别字段非数值 — 退回逐行解析, 跳过坏行
+        return _fill_frame(body.decode('gbk', errors='replace'), _parse_tencent_row)
+
+
+def fetch_frame_tencent(codes):
+    """腾讯财经批量行情 (QuoteFrame) — 超过单 URL 容量时分片并发"""
+    return _fetch_chunked(codes, _tencent_quote_url, _parse_tencent_body)
+
+
+async def fetch_frame_tencent_async(codes):
+    return await _fetch_chunked_async(codes, _tencent_quote_url, _parse_tencent_body)
+
+
 def fetch_quotes_tencent(codes):
-    """腾讯财经批量行情"""
-    symbols = ','.join(_code_to_tencent(c) for c in codes)
-    url = f'http://qt.gtimg.cn/q={symbols}'
-    raw = _http_get(url)
-    results = []
-    for line in raw.strip().split('\n'):
-        q = _parse_tencent_quote(line)
-        if q:
-            results.append(q)
-    return results
+    """腾讯财经批量行情 (dict 列表)"""
+    return fetch_frame_tencent(codes).to_dicts()
+
+
+async def fetch_quotes_tencent_async(codes):
+    return (await fetch_frame_tencent_async(codes)).to_dicts()
 
 
 # ═══════════════════════════════════════════
 # 新浪财经解析 (验证源)
 # ═══════════════════════════════════════════
-def _parse_sina_quote(raw_line):
+def _parse_sina_row(raw_line):
     """解析新浪行情: var hq_str_sh600519="贵州茅台,1504.8,..." """
     m = re.match(r'var hq_str_(\w+)="(.*)";', raw_line.strip())
     if not m:
@@ -100,82 +279,676 @@ def _parse_sina_quote(raw_line):
         price = float(fields[3] or 0)
         change = round(price - prev_close, 2)
         pct = round(change / prev_close * 100, 2) if prev_close else 0
-        return {
-            'code': code,
-            'name': fields[0],
-            'price': price,
-            'change': change,
-            'changePercent': pct,
-            'volume': int(float(fields[8] or 0)),
-            'amount': round(float(fields[9] or 0), 2),
-            'high': float(fields[4] or 0),
-            'low': float(fields[5] or 0),
-            'open': float(fields[1] or 0),
-            'prevClose': prev_close,
-            'turnoverRate': 0,
-            'pe': 0,
-            'pb': 0,
-        }
+        # 新浪无换手率 / PE / PB
+        return code, fields[0], (
+            price, change, pct,
+            int(float(fields[8] or 0)),
+            round(float(fields[9] or 0), 2),
+            float(fields[4] or 0),
+            float(fields[5] or 0),
+            float(fields[1] or 0),
+            prev_close,
+            0, 0, 0,
+        )
     except (ValueError, IndexError):
         return None
 
 
+def _sina_quote_url(codes):
+    return 'http://hq.sinajs.cn/list=' + ','.join(_code_to_sina(c) for c in codes)
+
+
+_SINA_NUM_FIELDS = (3, 2, 8, 9, 4, 5, 1)  # price, prevClose, volume, amount, high, low, open
+
+
+def _parse_sina_bulk(body):
+    """整包解析新浪行情 (bytes) → QuoteFrame, 名称为首个字段"""
+    pick = operator.itemgetter(*_SINA_NUM_FIELDS)
+    codes, names, tokens = [], [], []
+    for rec in body.split(b'";'):
+        start = rec.find(b'="')
+        sym = rec.find(b'hq_str_')
+        if start < 0 or sym < 0:
+            continue
+        fields = rec[start + 2:].split(b',')  # 名称不含 ',' (GBK 尾字节 ≥0x40)
+        if len(fields) < 32:
+            continue
+        codes.append(rec[sym + 9:start])
+        names.append(fields[0])
+        tokens.extend(pick(fields))
+    raw = _columns_to_frame(codes, names, tokens, len(_SINA_NUM_FIELDS))
+    price, prev, volume, amount, high, low, open_ = raw.values[:len(_SINA_NUM_FIELDS)].copy()
+    change = _round_col(price - prev, 2)
+    safe_prev = np.where(prev == 0, 1, prev)
+    pct = np.where(prev != 0, _round_col(change / safe_prev * 100, 2), 0)
+    v = raw.values
+    for field, col in (('price', price), ('change', change), ('changePercent', pct),
+                       ('volume', np.trunc(volume)), ('amount', _round_col(amount, 2)),
+                       ('high', high), ('low', low), ('open', open_), ('prevClose', prev)):
+        v[COL[field]] = col
+    # 新浪无换手率 / PE / PB
+    v[COL['turnover']] = v[COL['pe']] = v[COL['pb']] = 0
+    return raw
+
+
+def _parse_sina_body(body):
+    try:
+        return _parse_sina_bulk(body)
+    except ValueError:
+        return _fill_frame(body.decode('gbk', errors='replace'), _parse_sina_row)
+
+
+def fetch_frame_sina(codes):
+    """新浪财经批量行情 (QuoteFrame) — 超过单 URL 容量时分片并发"""
+    return _fetch_chunked(codes, _sina_quote_url, _parse_sina_body)
+
+
+async def fetch_frame_sina_async(codes):
+    return await _fetch_chunked_async(codes, _sina_quote_url, _parse_sina_body)
+
+
 def fetch_quotes_sina(codes):
-    """新浪财经批量行情"""
-    symbols = ','.join(_code_to_sina(c) for c in codes)
-    url = f'http://hq.sinajs.cn/list={symbols}'
-    raw = _http_get(url)
-    results = []
-    for line in raw.strip().split('\n'):
-        q = _parse_sina_quote(line)
-        if q:
-            results.append(q)
-    return results
+    """新浪财经批量行情 (dict 列表)"""
+    return fetch_frame_sina(codes).to_dicts()
+
+
+async def fetch_quotes_sina_async(codes):
+    return (await fetch_frame_sina_async(codes)).to_dicts()
+
+
+# ═══════════════════════════════════════════
+# 分片并发抓取 — 全市场 ~5300 只无法放进单个 URL
+# ═══════════════════════════════════════════
+QUOTE_CHUNK_SIZE = 100       # 每个请求的股票数 (~900 字符 URL)
+QUOTE_FETCH_PARALLELISM = 8  # 同步路径的并发分片数
+
+_chunk_executor = None
+_chunk_executor_lock = threading.Lock()
+
+
+def _chunk_codes(codes, size=None):
+    size = size or QUOTE_CHUNK_SIZE
+    return [codes[i:i + size] for i in range(0, len(codes), size)]
+
+
+def _merge_chunks(codes, results):
+    """按分片顺序合并; 部分分片失败时返回其余结果, 全部失败才抛错"""
+    frames = []
+    errors = []
+    for r in results:
+        if isinstance(r, BaseException):
+            errors.append(r)
+        else:
+            frames.append(r)
+    if errors:
+        if len(errors) == len(results):
+            raise errors[0]
+        logger.warning('quote fetch: %d/%d chunks failed (%d codes): %s',
+                       len(errors), len(results), len(codes), errors[0])
+    return QuoteFrame.concat(frames)
+
+
+def _get_chunk_executor():
+    global _chunk_executor
+    with _chunk_executor_lock:
+        if _chunk_executor is None:
+            _chunk_executor = ThreadPoolExecutor(
+                max_workers=QUOTE_FETCH_PARALLELISM, thread_name_prefix='quote-chunk')
+        return _chunk_executor
+
+
+# 行情抓取不使用旧响应兜底: 熔断时快速失败, 由对冲选择器切换数据源
+def _fetch_chunked(codes, url_fn, parse_fn):
+    chunks = _chunk_codes(list(codes))
+    if len(chunks) <= 1:
+        return parse_fn(_http_get_bytes(url_fn(codes), stale=False))
+
+    def _one(chunk):
+        try:
+            return parse_fn(_http_get_bytes(url_fn(chunk), stale=False))
+        except Exception as e:
+            return e
+
+    results = list(_get_chunk_executor().map(_one, chunks))
+    return _merge_chunks(codes, results)
+
+
+async def _fetch_chunked_async(codes, url_fn, parse_fn):
+    chunks = _chunk_codes(list(codes))
+    if len(chunks) <= 1:
+        return parse_fn(await _http_get_async(url_fn(codes), encoding=None, stale=False))
+
+    async def _one(chunk):
+        return parse_fn(await _http_get_async(url_fn(chunk), encoding=None, stale=False))
+
+    # 并发度由 async_http 的数据源限流控制
+    results = await asyncio.gather(*(_one(c) for c in chunks), return_exceptions=True)
+    return _merge_chunks(codes, results)
+
+
+# ═══════════════════════════════════════════
+# 行情快照缓存 — 进程级共享, 并发请求合并 (single-flight)
+# ═══════════════════════════════════════════
+QUOTE_CACHE_TTL = 5.0  # 秒
+
+
+class _Flight:
+    """一次进行中的上游请求, 供并发调用方等待"""
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SnapshotCache:
+    """TTL 缓存 + single-flight: 同一 key 同时只有一个上游请求, 其余调用方等待共享结果"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}   # key -> (monotonic ts, value)
+        self._inflight = {}  # key -> _Flight
+        self._ainflight = {}  # key -> asyncio.Future (事件循环内的在途请求)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def get(self, key, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = loader()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        else:
+            with self._lock:
+                self._entries[key] = (time.monotonic(), flight.result)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+        return flight.result
+
+    async def aget(self, key, loader):
+        """协程版 get: loader 为无参协程函数, 同一事件循环内的并发调用共享一次请求"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            fut = self._ainflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._ainflight[key] = asyncio.get_running_loop().create_future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return await asyncio.shield(fut)
+
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # 无等待方时避免 "never retrieved" 警告
+            with self._lock:
+                self.errors += 1
+            raise
+        else:
+            with self._lock:
+                self._entries[key] = (time.monotonic(), result)
+            fut.set_result(result)
+        finally:
+            with self._lock:
+                self._ainflight.pop(key, None)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+                'upstreamCalls': self.misses,
+                'hitRatio': round((self.hits + self.coalesced) / lookups, 4) if lookups else 0,
+                'entries': len(self._entries),
+            }
+
+
+_quote_cache = SnapshotCache(QUOTE_CACHE_TTL)
+
+
+def configure_quote_cache(ttl):
+    """调整快照 TTL (秒), 由后端按配置调用"""
+    _quote_cache.ttl = float(ttl)
+
+
+def quote_cache_stats():
+    """快照缓存命中统计"""
+    return _quote_cache.stats()
+
+
+_snapshot_selector = source_selector.HedgedSelector('snapshot', ('tencent', 'sina'))
+
+
+def source_stats():
+    """各数据源滚动延迟 / 错误率 / 对冲次数"""
+    return source_selector.all_stats()
+
+
+def get_quote_frame(codes=None, source='auto'):
+    """共享行情快照 (QuoteFrame) — TTL 内复用, 并发调用合并为一次上游请求; codes 为空时取当前股票池
+
+    source='auto' 时腾讯为主源, 超过延迟截止时间未返回则对冲请求新浪, 取先返回的非空结果。
+    返回的 frame 为共享对象, 调用方只读。
+    """
+    target = tuple(codes or universe_codes())
+    if source == 'auto':
+        def loader():
+            return _observe_frame(*_snapshot_selector.call({
+                'tencent': lambda: fetch_frame_tencent(list(target)),
+                'sina': lambda: fetch_frame_sina(list(target)),
+            }, accept=len))
+    else:
+        fetcher = fetch_frame_sina if source == 'sina' else fetch_frame_tencent
+
+        def loader():
+            return _observe_frame(fetcher(list(target)), source)
+    return _quote_cache.get((source, target), loader)
+
+
+async def get_quote_frame_async(codes=None, source='auto'):
+    """get_quote_frame 的协程版, 与同步调用共享缓存"""
+    target = tuple(codes or universe_codes())
+    if source == 'auto':
+        async def loader():
+            return _observe_frame(*await _snapshot_selector.acall({
+                'tencent': lambda: fetch_frame_tencent_async(list(target)),
+                'sina': lambda: fetch_frame_sina_async(list(target)),
+            }, accept=len))
+    else:
+        fetcher = fetch_frame_sina_async if source == 'sina' else fetch_frame_tencent_async
+
+        async def loader():
+            return _observe_frame(await fetcher(list(target)), source)
+    return await _quote_cache.aget((source, target), loader)
+
+
+def get_quote_snapshot(codes=None, source='auto'):
+    """共享行情快照 (dict 列表)
+
+    返回列表为副本, 但其中的行情 dict 为共享对象, 调用方只读。
+    """
+    return list(get_quote_frame(codes, source).to_dicts())
+
+
+async def get_quote_snapshot_async(codes=None, source='auto'):
+    return list((await get_quote_frame_async(codes, source)).to_dicts())
 
 
 # ═══════════════════════════════════════════
 # K线数据 (腾讯日K)
 # ═══════════════════════════════════════════
-def fetch_kline_tencent(code, count=30):
-    """腾讯财经日K线"""
+def _kline_url(code, count):
+    symbol = _code_to_tencent(code)
+    return f'http://web.ifzq.gtimg.cn/appstock/app/fqkline/get?param={symbol},day,,,{count},qfq'
+
+
+def _parse_kline_columns(raw, code):
+    """腾讯日K响应 → KlineBars 数据数组 (len(COLUMNS), n)"""
     symbol = _code_to_tencent(code)
-    url = f'http://web.ifzq.gtimg.cn/appstock/app/fqkline/get?param={symbol},day,,,{count},qfq'
-    raw = _http_get(url)
     data = json.loads(raw)
     days = data.get('data', {}).get(symbol, {}).get('qfqday', [])
     if not days:
         days = data.get('data', {}).get(symbol, {}).get('day', [])
+    out = np.zeros((len(kline_store.COLUMNS), len(days)), dtype=np.float64)
+    for i, d in enumerate(days):
+        # [date, open, close, high, low, volume, (除权信息)]
+        out[0, i] = kline_store.date_to_int(d[0])
+        out[1:5, i] = [float(v) for v in d[1:5]]
+        out[5, i] = int(float(d[5])) if len(d) > 5 else 0
+    return out
+
+
+def _fetch_kline_columns(code, count):
+    # 失败时由本地存储兜底, 不取熔断器缓存的旧响应
+    raw = _http_get_bytes(_kline_url(code, count), stale=False).decode('gbk', errors='replace')
+    return _parse_kline_columns(raw, code)
+
+
+async def _fetch_kline_columns_async(code, count):
+    return _parse_kline_columns(await _http_get_async(_kline_url(code, count), stale=False), code)
+
+
+# ── 日K本地存储 — 首次回补, 之后只抓缺失K线 ──
+_kline_store = None
+_kline_store_lock = threading.Lock()
+
+
+def _get_kline_store():
+    global _kline_store
+    with _kline_store_lock:
+        if _kline_store is None:
+            _kline_store = kline_store.KlineStore(os.path.join(DATA_DIR, 'kline'))
+        return _kline_store
+
+
+def _kline_failed(store, code, error):
+    if not store.has(code):
+        raise error
+    logger.warning('kline for %s: serving stored bars (%s)', code, error)
+
+
+def get_kline_bars(code, count=30):
+    """最近 count 根前复权日K (KlineBars, 列为 NumPy 数组) — 本地存储, 只向上游抓缺失部分"""
+    store = _get_kline_store()
+    lmt = store.plan(code, count)
+    if lmt:
+        try:
+            if not store.merge(code, _fetch_kline_columns(code, lmt), lmt):
+                # 前复权价格已重算: 按已有深度整段重抓
+                depth = max(lmt, store.depth(code))
+                store.merge(code, _fetch_kline_columns(code, depth), depth, replace=True)
+        except Exception as e:
+            _kline_failed(store, code, e)
+    return store.window(code, count)
+
+
+async def get_kline_bars_async(code, count=30):
+    store = _get_kline_store()
+    lmt = store.plan(code, count)
+    if lmt:
+        try:
+            if not store.merge(code, await _fetch_kline_columns_async(code, lmt), lmt):
+                depth = max(lmt, store.depth(code))
+                store.merge(code, await _fetch_kline_columns_async(code, depth), depth, replace=True)
+        except Exception as e:
+            _kline_failed(store, code, e)
+    return store.window(code, count)
+
+
+def kline_store_stats():
+    return _get_kline_store().stats()
+
+
+def cached_kline_bars(code):
+    """本地日K存储中的全部K线 (不联网, 供回测), 无本地数据时为 None"""
+    return _get_kline_store().window(code)
+
+
+def _kline_dicts(bars):
+    """KlineBars → 接口用的K线 dict 列表 (日期 MM/DD, 附单日收益折算的 sharpeRatio)"""
     results = []
     prev_close = None
-    for d in days:
-        # [date, open, close, high, low, volume]
-        o, c, h, l = float(d[1]), float(d[2]), float(d[3]), float(d[4])
-        vol = int(float(d[5])) if len(d) > 5 else 0
+    for d, o, c, h, l, vol in zip(bars.date_strings(), *bars.data[1:].tolist()):
         daily_ret = (c - prev_close) / prev_close if prev_close else 0
         sharpe = round(daily_ret * 15.87, 2)
         prev_close = c
-        dt = d[0]
         results.append({
-            'date': f'{dt[5:7]}/{dt[8:10]}' if len(dt) >= 10 else dt,
+            'date': f'{d[5:7]}/{d[8:10]}',
             'open': o, 'close': c, 'high': h, 'low': l,
-            'volume': vol,
+            'volume': int(vol),
             'sharpeRatio': sharpe,
         })
     return results
 
 
+def fetch_kline_tencent(code, count=30):
+    """腾讯财经日K线 (经本地存储)"""
+    return _kline_dicts(get_kline_bars(code, count))
+
+
+async def fetch_kline_tencent_async(code, count=30):
+    return _kline_dicts(await get_kline_bars_async(code, count))
+
+
+# ── 流式指标 — 每日首次使用时回放日K, 之后随行情快照 O(1) 更新 ──
+_indicator_stream = indicator_stream.IndicatorStream()
+# ── 分钟K线 — 由行情快照的累计量增量合成 ──
+_bar_builder = bar_builder.BarBuilder()
+# 成交量 / 成交额换算为 股 / 元: 腾讯为 手 / 万元, 新浪为 股 / 元
+_VOLUME_UNITS = {'tencent': (100, 10000), 'sina': (1, 1)}
+# 新行情快照的订阅方 (如策略引擎的事件触发)
+_frame_listeners = []
+
+
+def _today():
+    return int(datetime.now().strftime('%Y%m%d'))
+
+
+def _observe_frame(frame, source):
+    """新抓到的行情快照: 并入流式指标的当日K线, 并合成分钟K线 (开盘前 / 周末的快照仍是上一交易日, 不计入)"""
+    now = datetime.now()
+    if trading_calendar.session_opened(now):
+        _indicator_stream.on_frame(frame, _today())
+        vol_unit, amount_unit = _VOLUME_UNITS[source]
+        _bar_builder.ingest(frame.codes, frame.price, frame.volume * vol_unit, frame.amount * amount_unit, now)
+    for listener in tuple(_frame_listeners):
+        try:
+            listener(frame)
+        except Exception as e:
+            logger.warning('行情快照订阅方异常: %s', e)
+    return frame
+
+
+def add_frame_listener(fn):
+    """订阅新抓到的行情快照: fn(frame) 在抓取所在线程同步调用, 须轻量且只读"""
+    _frame_listeners.append(fn)
+
+
+def remove_frame_listener(fn):
+    if fn in _frame_listeners:
+        _frame_listeners.remove(fn)
+
+
+def _observe_quote(q):
+    if trading_calendar.session_opened(datetime.now()):
+        _indicator_stream.tick(q['code'], _today(), q['open'], q['high'], q['low'], q['price'], q['volume'])
+
+
+def get_indicators(code):
+    """单只股票当前指标: ma5/10/20/60, 年化波动率, 20 日支撑 / 阻力 (样本不足为 None)"""
+    day = _today()
+    if _indicator_stream.get(code, day) is None:
+        _indicator_stream.seed(code, get_kline_bars(code, indicator_stream.SEED_BARS), day)
+    return _indicator_stream.values(code)
+
+
+async def get_indicators_async(code):
+    day = _today()
+    if _indicator_stream.get(code, day) is None:
+        bars = await get_kline_bars_async(code, indicator_stream.SEED_BARS)
+        # 逐根回放为纯 Python 循环, 放到线程中避免阻塞事件循环
+        await asyncio.to_thread(_indicator_stream.seed, code, bars, day)
+    return _indicator_stream.values(code)
+
+
+def indicator_stream_stats():
+    return _indicator_stream.stats()
+
+
+# ═══════════════════════════════════════════
+# 因子特征库 (行情类按时段、日K类按交易日缓存, 策略共享)
+# ═══════════════════════════════════════════
+_feature_store = feature_store.FeatureStore()
+FEATURE_FETCH_CONCURRENCY = 8   # 异步路径补齐指标状态时的并发上限
+
+
+def _refresh_daily_features(codes, day):
+    _feature_store.refresh_daily(
+        codes, day, lambda c: _indicator_stream.stamp(c, day), _indicator_stream.values)
+
+
+def get_features(names, codes=None):
+    """命名因子矩阵 [len(codes), len(names)] (feature_store.FACTORS), 缺失为 NaN; codes 为空时取当前股票池
+
+    行情类因子来自共享行情快照 (股票池外的代码为 NaN), 日K类因子来自流式指标, 均只重算输入有变化的股票。
+    """
+    codes = list(codes or universe_codes())
+    if feature_store.needs_quotes(names):
+        _feature_store.on_frame(get_quote_frame())
+    if feature_store.needs_daily(names):
+        day = _today()
+        for code in codes:
+            if _indicator_stream.get(code, day) is None:
+                try:
+                    get_indicators(code)
+                except Exception as e:
+                    logger.debug('因子: %s 指标回放失败: %s', code, e)
+        _refresh_daily_features(codes, day)
+    return _feature_store.matrix(names, codes)
+
+
+async def get_features_async(names, codes=None):
+    codes = list(codes or universe_codes())
+    if feature_store.needs_quotes(names):
+        _feature_store.on_frame(await get_quote_frame_async())
+    if feature_store.needs_daily(names):
+        day = _today()
+        missing = [c for c in codes if _indicator_stream.get(c, day) is None]
+        sem = asyncio.Semaphore(FEATURE_FETCH_CONCURRENCY)
+
+        async def _seed(code):
+            async with sem:
+                return await get_indicators_async(code)
+
+        results = await asyncio.gather(*(_seed(c) for c in missing), return_exceptions=True)
+        for code, r in zip(missing, results):
+            if isinstance(r, BaseException):
+                logger.debug('因子: %s 指标回放失败: %s', code, r)
+        await asyncio.to_thread(_refresh_daily_features, codes, day)
+    return _feature_store.matrix(names, codes)
+
+
+def feature_store_stats():
+    return _feature_store.stats()
+
+
+# ── 多因子打分配置 (权重 / 行业中性化) ──
+_mf_config = {
+    'weights': factor_model.parse_weights(os.environ.get('QMT_MF_WEIGHTS')),
+    'sector_neutral': os.environ.get('QMT_MF_SECTOR_NEUTRAL', '1').lower() not in ('0', 'false', 'no'),
+}
+
+
+def configure_multi_factor(weights=None, sector_neutral=True):
+    """多因子洞察的因子权重 ({因子: 权重} 或 'momentum:0.3,value:0.3' 字符串, 空=默认) 与是否行业中性化"""
+    _mf_config['weights'] = factor_model.parse_weights(weights) if isinstance(weights, str) else weights or None
+    _mf_config['sector_neutral'] = sector_neutral
+
+
+# ═══════════════════════════════════════════
+# 统计套利配对簿 (同行业协整配对, 日K变化时按行业增量重扫)
+# ═══════════════════════════════════════════
+_pair_book = pair_engine.PairBook()
+
+
+def _pair_codes(codes=None):
+    """参与配对的代码: 股票池中行业已知的股票"""
+    return [c for c in (codes or universe_codes()) if c in STOCK_SECTOR]
+
+
+def refresh_pair_book(codes=None):
+    """用本地日K (只抓缺失部分) 更新配对簿, 返回重扫的行业数"""
+    bars = {}
+    for code in _pair_codes(codes):
+        try:
+            bars[code] = get_kline_bars(code, pair_engine.PAIR_LOOKBACK)
+        except Exception as e:
+            logger.debug('配对: %s 日K获取失败: %s', code, e)
+    return _pair_book.update(bars, STOCK_SECTOR)
+
+
+async def refresh_pair_book_async(codes=None):
+    codes = _pair_codes(codes)
+    results = await asyncio.gather(
+        *(get_kline_bars_async(c, pair_engine.PAIR_LOOKBACK) for c in codes), return_exceptions=True)
+    bars = {}
+    for code, r in zip(codes, results):
+        if isinstance(r, BaseException):
+            logger.debug('配对: %s 日K获取失败: %s', code, r)
+        else:
+            bars[code] = r
+    return await asyncio.to_thread(_pair_book.update, bars, STOCK_SECTOR)
+
+
+def get_pairs(top=20):
+    """配对簿中协整最强的 top 个配对"""
+    return _pair_book.pairs(top)
+
+
+def pair_book_stats():
+    return _pair_book.stats()
+
+
+def drain_intraday_bars():
+    """取走已完成的分钟K线 (供持久化), 同时结束已过时段的K线"""
+    _bar_builder.flush(datetime.now())
+    return _bar_builder.drain()
+
+
+def pending_intraday_bars(code, interval=1):
+    """已完成但尚未持久化的分钟K线 (只读, 不取走)"""
+    return _bar_builder.pending_bars(code, interval)
+
+
+def current_intraday_bar(code, interval=1):
+    """未完成的当前分钟K线, 无则 None"""
+    return _bar_builder.current(code, interval)
+
+
+def intraday_bar_stats():
+    return _bar_builder.stats()
+
+
 # ═══════════════════════════════════════════
 # 业务接口 (对外)
 # ═══════════════════════════════════════════
 def get_quotes(codes=None):
-    """获取实时行情 — 腾讯优先, 新浪备用"""
-    target = codes or DEFAULT_CODES
+    """获取实时行情 — 腾讯为主, 慢或失败时对冲新浪"""
     try:
-        return fetch_quotes_tencent(target)
-    except Exception:
-        pass
+        return get_quote_snapshot(codes)
+    except Exception as e:
+        return {'error': f'all sources failed: {e}'}
+
+
+async def get_quotes_async(codes=None):
     try:
-        return fetch_quotes_sina(target)
+        return await get_quote_snapshot_async(codes)
     except Exception as e:
         return {'error': f'all sources failed: {e}'}
 
@@ -191,106 +964,148 @@ def get_kline(code='688981', count=30):
     return {'error': 'kline fetch failed'}
 
 
+async def get_kline_async(code='688981', count=30):
+    try:
+        result = await fetch_kline_tencent_async(code, count)
+        if result:
+            return result
+    except Exception:
+        pass
+    return {'error': 'kline fetch failed'}
+
+
+def _build_market_overview(frame):
+    pct = frame.changePercent
+    up = int((pct > 0).sum())
+    total = len(frame) or 1
+    sentiment = round(up / total * 100, 1)
+    label = '偏多' if sentiment > 55 else '偏空' if sentiment < 45 else '震荡'
+    # 涨幅最大者为热门 (argmax 取首个最大值, 与稳定降序排序一致)
+    hot = int(pct.argmax()) if len(frame) else None
+    return {
+        'sentimentIndex': sentiment,
+        'sentimentLabel': label,
+        'hotSector': frame.names[hot] if hot is not None else '—',
+        'hotSectorChange': float(pct[hot]) if hot is not None else 0,
+        'avgWinRate': round(sentiment * 0.82, 1),
+        'avgWinRateChange': round((sentiment - 50) * 0.1, 1),
+    }
+
+
 def get_market_overview():
     """市场概览: 涨跌比→情绪, 涨幅最大行业"""
     try:
-        quotes = fetch_quotes_tencent(DEFAULT_CODES)
-        if not quotes:
-            quotes = fetch_quotes_sina(DEFAULT_CODES)
-        up = sum(1 for q in quotes if q['changePercent'] > 0)
-        total = len(quotes) or 1
-        sentiment = round(up / total * 100, 1)
-        label = '偏多' if sentiment > 55 else '偏空' if sentiment < 45 else '震荡'
-        # 按涨幅排序找热门
-        sorted_q = sorted(quotes, key=lambda x: x['changePercent'], reverse=True)
-        hot = sorted_q[0] if sorted_q else None
-        return {
-            'sentimentIndex': sentiment,
-            'sentimentLabel': label,
-            'hotSector': hot['name'] if hot else '—',
-            'hotSectorChange': hot['changePercent'] if hot else 0,
-            'avgWinRate': round(sentiment * 0.82, 1),
-            'avgWinRateChange': round((sentiment - 50) * 0.1, 1),
-        }
+        return _build_market_overview(get_quote_frame())
+    except Exception as e:
+        return {'error': str(e)}
+
+
+async def get_market_overview_async():
+    try:
+        return _build_market_overview(await get_quote_frame_async())
     except Exception as e:
         return {'error': str(e)}
 
 
+def _build_sector_flows(quotes):
+    # 简单按行业聚合 (用 mock 行业映射)
+    return quotes[:6]  # 暂返回 top6 个股作为替代
+
+
 def get_sector_flows():
     """行业资金流向 — 基于个股涨跌聚合"""
     try:
-        quotes = fetch_quotes_tencent(DEFAULT_CODES)
-        # 简单按行业聚合 (用 mock 行业映射)
-        return quotes[:6]  # 暂返回 top6 个股作为替代
+        return _build_sector_flows(get_quote_snapshot())
     except Exception as e:
         return {'error': str(e)}
 
 
+async def get_sector_flows_async():
+    try:
+        return _build_sector_flows(await get_quote_snapshot_async())
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def _build_oracle_events(frame):
+    events = []
+    now = datetime.now()
+    now_str = now.strftime('%Y-%m-%d %H:%M:%S')
+    today_str = now.strftime('%Y-%m-%d')
+    # 向量化预筛: 只有 |涨跌幅|≥1.5 或换手>5 的行可能生成事件 (涨跌停阈值 ≥4.8 已包含在内)
+    candidates = np.flatnonzero((np.abs(frame.changePercent) >= 1.5) | (frame.turnover > 5))
+    quotes = frame.to_dicts()
+    for i in candidates.tolist():
+        q = quotes[i]
+        pct = q.get('changePercent', 0)
+        price = q.get('price', 0)
+        vol = q.get('volume', 0)
+        amount = q.get('amount', 0)  # 万元
+        amount_yi = amount / 1e4  # 转为亿元
+        turnover = q.get('turnoverRate', 0)
+        high = q.get('high', 0)
+        low = q.get('low', 0)
+        prev_close = q.get('prevClose', 0)
+
+        # 涨停/跌停检测 (A股10%限制, ST 5%)
+        limit_pct = 5 if 'ST' in q.get('name', '') else 10
+        is_limit_up = prev_close > 0 and pct >= limit_pct - 0.2
+        is_limit_down = prev_close > 0 and pct <= -(limit_pct - 0.2)
+
+        # 事件类型 + 描述
+        if is_limit_up:
+            etype = 'limit_up_seal'
+            desc = f"涨停封板 {pct:+.2f}%，成交额{amount_yi:.1f}亿"
+            impact = 'positive'
+        elif is_limit_down:
+            etype = 'limit_down_seal'
+            desc = f"跌停封板 {pct:+.2f}%，成交额{amount_yi:.1f}亿"
+            impact = 'negative'
+        elif turnover > 5:
+            etype = 'volume_spike'
+            desc = f"换手率{turnover:.1f}%异常放量，{pct:+.2f}%，成交额{amount_yi:.1f}亿"
+            impact = 'positive' if pct > 0 else 'negative'
+        elif abs(pct) >= 3:
+            etype = 'big_order'
+            direction = '大幅拉升' if pct > 0 else '大幅杀跌'
+            desc = f"{direction} {pct:+.2f}%，振幅{((high-low)/prev_close*100) if prev_close else 0:.1f}%，成交额{amount_yi:.1f}亿"
+            impact = 'positive' if pct > 0 else 'negative'
+        elif abs(pct) >= 1.5:
+            etype = 'big_order'
+            direction = '震荡走高' if pct > 0 else '震荡走低'
+            desc = f"{direction} {pct:+.2f}%，换手{turnover:.1f}%，成交额{amount_yi:.1f}亿"
+            impact = 'positive' if pct > 0 else 'negative'
+        else:
+            continue  # 波动太小，不生成事件
+
+        events.append({
+            'id': f'live_{i}',
+            'time': now.strftime('%H:%M:%S'),
+            'datetime': now_str,
+            'lagDays': 0,
+            'verifiedDate': today_str,
+            'stockCode': q['code'],
+            'stockName': q['name'],
+            'type': etype,
+            'description': desc,
+            'amount': int(amount / 10000) if amount else 0,
+            'impact': impact,
+        })
+    events.sort(key=lambda x: abs(x['amount']), reverse=True)
+    return events[:15]
+
+
 def get_oracle_events():
     """异动事件 — 从实时行情中提取涨幅/量异常，丰富事件描述"""
     try:
-        quotes = fetch_quotes_tencent(DEFAULT_CODES)
-        events = []
-        now = datetime.now()
-        now_str = now.strftime('%Y-%m-%d %H:%M:%S')
-        today_str = now.strftime('%Y-%m-%d')
-        for i, q in enumerate(quotes):
-            pct = q.get('changePercent', 0)
-            price = q.get('price', 0)
-            vol = q.get('volume', 0)
-            amount = q.get('amount', 0)  # 万元
-            amount_yi = amount / 1e4  # 转为亿元
-            turnover = q.get('turnoverRate', 0)
-            high = q.get('high', 0)
-            low = q.get('low', 0)
-            prev_close = q.get('prevClose', 0)
-
-            # 涨停/跌停检测 (A股10%限制, ST 5%)
-            limit_pct = 5 if 'ST' in q.get('name', '') else 10
-            is_limit_up = prev_close > 0 and pct >= limit_pct - 0.2
-            is_limit_down = prev_close > 0 and pct <= -(limit_pct - 0.2)
-
-            # 事件类型 + 描述
-            if is_limit_up:
-                etype = 'limit_up_seal'
-                desc = f"涨停封板 {pct:+.2f}%，成交额{amount_yi:.1f}亿"
-                impact = 'positive'
-            elif is_limit_down:
-                etype = 'limit_down_seal'
-                desc = f"跌停封板 {pct:+.2f}%，成交额{amount_yi:.1f}亿"
-                impact = 'negative'
-            elif turnover > 5:
-                etype = 'volume_spike'
-                desc = f"换手率{turnover:.1f}%异常放量，{pct:+.2f}%，成交额{amount_yi:.1f}亿"
-                impact = 'positive' if pct > 0 else 'negative'
-            elif abs(pct) >= 3:
-                etype = 'big_order'
-                direction = '大幅拉升' if pct > 0 else '大幅杀跌'
-                desc = f"{direction} {pct:+.2f}%，振幅{((high-low)/prev_close*100) if prev_close else 0:.1f}%，成交额{amount_yi:.1f}亿"
-                impact = 'positive' if pct > 0 else 'negative'
-            elif abs(pct) >= 1.5:
-                etype = 'big_order'
-                direction = '震荡走高' if pct > 0 else '震荡走低'
-                desc = f"{direction} {pct:+.2f}%，换手{turnover:.1f}%，成交额{amount_yi:.1f}亿"
-                impact = 'positive' if pct > 0 else 'negative'
-            else:
-                continue  # 波动太小，不生成事件
-
-            events.append({
-                'id': f'live_{i}',
-                'time': now.strftime('%H:%M:%S'),
-                'datetime': now_str,
-                'lagDays': 0,
-                'verifiedDate': today_str,
-                'stockCode': q['code'],
-                'stockName': q['name'],
-                'type': etype,
-                'description': desc,
-                'amount': int(amount / 10000) if amount else 0,
-                'impact': impact,
-            })
-        events.sort(key=lambda x: abs(x['amount']), reverse=True)
-        return events[:15]
+        return _build_oracle_events(get_quote_frame())
+    except Exception as e:
+        return {'error': str(e)}
+
+
+async def get_oracle_events_async():
+    try:
+        return _build_oracle_events(await get_quote_frame_async())
     except Exception as e:
         return {'error': str(e)}
 
@@ -330,109 +1145,125 @@ SW_SECTOR_META = {
 }
 
 
+def _build_scanner_stocks(quotes):
+
+    trigger_reasons = [
+        '突破年线', '机构抢筹', '放量突破', '底部反转',
+        '北向扫货', '涨停板', '均线多头', '资金异动',
+        'MACD金叉', '超跌反弹', '板块龙头', '缩量企稳',
+    ]
+
+    results = []
+    for i, q in enumerate(quotes):
+        pct = abs(q.get('changePercent', 0))
+        vol_score = min(q.get('turnoverRate', 0) * 5, 20)
+        value_score = round(40 + pct * 8 + vol_score, 1)
+        # 涨幅大 + 换手高 → 触发原因偏强势
+        if q.get('changePercent', 0) > 3:
+            reason = '放量突破' if q.get('turnoverRate', 0) > 3 else '均线多头'
+        elif q.get('changePercent', 0) > 1:
+            reason = '机构抢筹' if vol_score > 10 else '北向扫货'
+        elif q.get('changePercent', 0) < -2:
+            reason = '超跌反弹' if pct > 3 else '缩量企稳'
+        else:
+            reason = trigger_reasons[i % len(trigger_reasons)]
+
+        results.append({
+            'code': q['code'],
+            'name': q['name'],
+            'valueScore': value_score,
+            'triggerReason': reason,
+            'price': q['price'],
+            'changePercent': q.get('changePercent', 0),
+            'sector': STOCK_SECTOR.get(q['code'], '其他'),
+            'rank': 0,
+            'prevRank': None,
+        })
+
+    results.sort(key=lambda x: x['valueScore'], reverse=True)
+    for i, r in enumerate(results):
+        r['rank'] = i + 1
+    return results
+
+
 def get_scanner_stocks():
     """扫描排行榜 — 基于实时行情计算价值评分"""
     try:
-        quotes = fetch_quotes_tencent(DEFAULT_CODES)
-        if not quotes:
-            quotes = fetch_quotes_sina(DEFAULT_CODES)
-
-        trigger_reasons = [
-            '突破年线', '机构抢筹', '放量突破', '底部反转',
-            '北向扫货', '涨停板', '均线多头', '资金异动',
-            'MACD金叉', '超跌反弹', '板块龙头', '缩量企稳',
-        ]
-
-        results = []
-        for i, q in enumerate(quotes):
-            pct = abs(q.get('changePercent', 0))
-            vol_score = min(q.get('turnoverRate', 0) * 5, 20)
-            value_score = round(40 + pct * 8 + vol_score, 1)
-            # 涨幅大 + 换手高 → 触发原因偏强势
-            if q.get('changePercent', 0) > 3:
-                reason = '放量突破' if q.get('turnoverRate', 0) > 3 else '均线多头'
-            elif q.get('changePercent', 0) > 1:
-                reason = '机构抢筹' if vol_score > 10 else '北向扫货'
-            elif q.get('changePercent', 0) < -2:
-                reason = '超跌反弹' if pct > 3 else '缩量企稳'
-            else:
-                reason = trigger_reasons[i % len(trigger_reasons)]
+        return _build_scanner_stocks(get_quote_frame().to_dicts())
+    except Exception as e:
+        return {'error': str(e)}
 
-            results.append({
-                'code': q['code'],
-                'name': q['name'],
-                'valueScore': value_score,
-                'triggerReason': reason,
-                'price': q['price'],
-                'changePercent': q.get('changePercent', 0),
-                'sector': STOCK_SECTOR.get(q['code'], '其他'),
-                'rank': 0,
-                'prevRank': None,
-            })
 
-        results.sort(key=lambda x: x['valueScore'], reverse=True)
-        for i, r in enumerate(results):
-            r['rank'] = i + 1
-        return results
+async def get_scanner_stocks_async():
+    try:
+        return _build_scanner_stocks((await get_quote_frame_async()).to_dicts())
     except Exception as e:
         return {'error': str(e)}
 
 
+def _build_sw_sectors(quotes):
+
+    # 按行业聚合
+    sector_data = {}
+    for q in quotes:
+        sector = STOCK_SECTOR.get(q['code'])
+        if not sector:
+            continue
+        if sector not in sector_data:
+            sector_data[sector] = {
+                'stocks': [],
+                'total_amount': 0,
+                'total_change': 0,
+                'count': 0,
+                'best_stock': None,
+                'best_change': -999,
+            }
+        sd = sector_data[sector]
+        sd['stocks'].append(q)
+        sd['total_amount'] += q.get('amount', 0)
+        sd['total_change'] += q.get('changePercent', 0)
+        sd['count'] += 1
+        if q.get('changePercent', 0) > sd['best_change']:
+            sd['best_change'] = q['changePercent']
+            sd['best_stock'] = q['name']
+
+    # 构建结果 — 有实时数据的行业用真实值，其余用 0
+    results = []
+    for name, stock_count in SW_SECTOR_META.items():
+        sd = sector_data.get(name)
+        if sd:
+            avg_change = round(sd['total_change'] / sd['count'], 2)
+            # 用成交额变化近似资金流向 (正涨幅=净流入)
+            net_inflow = round(sd['total_amount'] / 1e8 * (1 if avg_change > 0 else -1), 1)
+            leading = sd['best_stock'] or '—'
+        else:
+            avg_change = 0
+            net_inflow = 0
+            leading = '—'
+
+        results.append({
+            'name': name,
+            'netInflow': net_inflow,
+            'changePercent': avg_change,
+            'leadingStock': leading,
+            'stockCount': stock_count,
+        })
+
+    results.sort(key=lambda x: x['changePercent'], reverse=True)
+    return results
+
+
 def get_sw_sectors():
     """申万行业热力图 — 基于个股行情聚合"""
     try:
-        quotes = fetch_quotes_tencent(DEFAULT_CODES)
-        if not quotes:
-            quotes = fetch_quotes_sina(DEFAULT_CODES)
-
-        # 按行业聚合
-        sector_data = {}
-        for q in quotes:
-            sector = STOCK_SECTOR.get(q['code'])
-            if not sector:
-                continue
-            if sector not in sector_data:
-                sector_data[sector] = {
-                    'stocks': [],
-                    'total_amount': 0,
-                    'total_change': 0,
-                    'count': 0,
-                    'best_stock': None,
-                    'best_change': -999,
-                }
-            sd = sector_data[sector]
-            sd['stocks'].append(q)
-            sd['total_amount'] += q.get('amount', 0)
-            sd['total_change'] += q.get('changePercent', 0)
-            sd['count'] += 1
-            if q.get('changePercent', 0) > sd['best_change']:
-                sd['best_change'] = q['changePercent']
-                sd['best_stock'] = q['name']
-
-        # 构建结果 — 有实时数据的行业用真实值，其余用 0
-        results = []
-        for name, stock_count in SW_SECTOR_META.items():
-            sd = sector_data.get(name)
-            if sd:
-                avg_change = round(sd['total_change'] / sd['count'], 2)
-                # 用成交额变化近似资金流向 (正涨幅=净流入)
-                net_inflow = round(sd['total_amount'] / 1e8 * (1 if avg_change > 0 else -1), 1)
-                leading = sd['best_stock'] or '—'
-            else:
-                avg_change = 0
-                net_inflow = 0
-                leading = '—'
+        return _build_sw_sectors(get_quote_frame().to_dicts())
+    except Exception as e:
+        return {'error': str(e)}
 
-            results.append({
-                'name': name,
-                'netInflow': net_inflow,
-                'changePercent': avg_change,
-                'leadingStock': leading,
-                'stockCount': stock_count,
-            })
 
-        results.sort(key=lambda x: x['changePercent'], reverse=True)
-        return results
+async def get_sw_sectors_async():
+    try:
+        return _build_sw_sectors((await get_quote_frame_async()).to_dicts())
     except Exception as e:
         return {'error': str(e)}
 
@@ -440,20 +1271,16 @@ def get_sw_sectors():
 # ═══════════════════════════════════════════
 # 事件驱动 — 财经新闻 + 研报机构分析
 # ═══════════════════════════════════════════
-def _http_get_utf8(url, timeout=10):
+def _http_get_utf8(url, timeout=10, headers=None):
     """UTF-8 编码的 HTTP GET"""
-    req = Request(url, headers=HEADERS)
-    with urlopen(req, timeout=timeout) as resp:
-        return resp.read().decode('utf-8', errors='replace')
+    return _http_get_bytes(url, timeout, headers).decode('utf-8', errors='replace')
 
 
-def _fetch_eastmoney_news():
-    """东方财富 7x24 财经快讯"""
-    url = 'https://newsapi.eastmoney.com/kuaixun/v1/getlist_102_ajaxResult_50_1_.html'
-    headers_extra = {'Referer': 'https://kuaixun.eastmoney.com/'}
-    req = Request(url, headers={**HEADERS, **headers_extra})
-    with urlopen(req, timeout=10) as resp:
-        raw = resp.read().decode('utf-8', errors='replace')
+_NEWS_URL = 'https://newsapi.eastmoney.com/kuaixun/v1/getlist_102_ajaxResult_50_1_.html'
+_NEWS_HEADERS = {'Referer': 'https://kuaixun.eastmoney.com/'}
+
+
+def _parse_eastmoney_news(raw):
     # 去掉 JSONP 包装: var xxx = {...};
     if raw.startswith('var '):
         raw = raw[raw.index('=') + 1:].strip().rstrip(';')
@@ -471,14 +1298,24 @@ def _fetch_eastmoney_news():
     return results
 
 
-def _fetch_eastmoney_reports():
-    """东方财富研报列表 — 获取机构分析"""
-    url = ('https://reportapi.eastmoney.com/report/list'
-           '?industryCode=*&pageSize=15&industry=*'
-           '&rating=&ratingChange=&beginTime=&endTime='
-           '&pageNo=1&fields=&qType=0&orgCode=&rcode='
-           '&p=1&pageNum=1&_=1')
-    raw = _http_get_utf8(url)
+def _fetch_eastmoney_news():
+    """东方财富 7x24 财经快讯"""
+    return _parse_eastmoney_news(_http_get_utf8(_NEWS_URL, headers=_NEWS_HEADERS))
+
+
+async def _fetch_eastmoney_news_async():
+    return _parse_eastmoney_news(
+        await _http_get_async(_NEWS_URL, headers=_NEWS_HEADERS, encoding='utf-8'))
+
+
+_REPORTS_URL = ('https://reportapi.eastmoney.com/report/list'
+                '?industryCode=*&pageSize=15&industry=*'
+                '&rating=&ratingChange=&beginTime=&endTime='
+                '&pageNo=1&fields=&qType=0&orgCode=&rcode='
+                '&p=1&pageNum=1&_=1')
+
+
+def _parse_eastmoney_reports(raw):
     data = json.loads(raw)
     items = data.get('data', [])
     results = []
@@ -504,6 +1341,15 @@ def _fetch_eastmoney_reports():
     return results
 
 
+def _fetch_eastmoney_reports():
+    """东方财富研报列表 — 获取机构分析"""
+    return _parse_eastmoney_reports(_http_get_utf8(_REPORTS_URL))
+
+
+async def _fetch_eastmoney_reports_async():
+    return _parse_eastmoney_reports(await _http_get_async(_REPORTS_URL, encoding='utf-8'))
+
+
 def _classify_event(title):
     """根据标题关键词分类事件"""
     kw_map = {
@@ -539,23 +1385,7 @@ def _impact_from_title(title):
     return 'neutral'
 
 
-def get_event_news():
-    """获取事件驱动新闻 + 机构分析"""
-    news_list = []
-    reports = []
-
-    # 1. 抓新闻
-    try:
-        news_list = _fetch_eastmoney_news()
-    except Exception:
-        pass
-
-    # 2. 抓研报
-    try:
-        reports = _fetch_eastmoney_reports()
-    except Exception:
-        pass
-
+def _build_event_news(news_list, reports):
     # 3. 构建 report 索引 (按股票名 + 按机构名)
     report_map = {}
     report_by_industry = {}
@@ -647,46 +1477,95 @@ def get_event_news():
     return results
 
 
+def get_event_news():
+    """获取事件驱动新闻 + 机构分析"""
+    news_list = []
+    reports = []
+
+    # 1. 抓新闻
+    try:
+        news_list = _fetch_eastmoney_news()
+    except Exception:
+        pass
+
+    # 2. 抓研报
+    try:
+        reports = _fetch_eastmoney_reports()
+    except Exception:
+        pass
+
+    return _build_event_news(news_list, reports)
+
+
+async def get_event_news_async():
+    # 新闻与研报并发抓取
+    news_list, reports = await asyncio.gather(
+        _fetch_eastmoney_news_async(), _fetch_eastmoney_reports_async(),
+        return_exceptions=True,
+    )
+    if isinstance(news_list, BaseException):
+        news_list = []
+    if isinstance(reports, BaseException):
+        reports = []
+    return _build_event_news(news_list, reports)
+
+
 # ═══════════════════════════════════════════
 # 策略洞察 — 基于实时行情计算
 # ═══════════════════════════════════════════
 
+INSIGHT_TYPES = ('trend_follow', 'mean_reversion', 'stat_arb', 'hft', 'multi_factor')
+
+
+def build_insights(frame, insight_type, now=None, quotes=None):
+    """由一份行情快照计算某类策略洞察; quotes 为 frame.to_dicts() 的复用结果 (可省略)"""
+    if not len(frame):
+        return []
+
+    now = now or datetime.now()
+    now_str = now.strftime('%Y-%m-%d %H:%M:%S')
+    today_str = now.strftime('%Y-%m-%d')
+
+    if quotes is None:
+        quotes = frame.to_dicts()
+    if insight_type == 'trend_follow':
+        return _trend_insights(frame, quotes, now_str, today_str)
+    if insight_type == 'mean_reversion':
+        return _mean_rev_insights(frame, quotes, now_str, today_str)
+    if insight_type == 'stat_arb':
+        return _stat_arb_insights(frame, quotes, now_str, today_str)
+    if insight_type == 'hft':
+        return _hft_insights(quotes, now_str, today_str)
+    if insight_type == 'multi_factor':
+        return _multi_factor_insights(frame, quotes, now_str, today_str)
+    return []
+
+
 def get_strategy_insights(insight_type='trend_follow'):
     """基于实时行情数据计算策略洞察"""
     try:
-        quotes = fetch_quotes_tencent(DEFAULT_CODES)
-        if not quotes:
-            quotes = fetch_quotes_sina(DEFAULT_CODES)
-        if not quotes:
-            return []
-
-        now = datetime.now()
-        now_str = now.strftime('%Y-%m-%d %H:%M:%S')
-        today_str = now.strftime('%Y-%m-%d')
-        results = []
-
-        if insight_type == 'trend_follow':
-            results = _trend_insights(quotes, now_str, today_str)
-        elif insight_type == 'mean_reversion':
-            results = _mean_rev_insights(quotes, now_str, today_str)
-        elif insight_type == 'stat_arb':
-            results = _stat_arb_insights(quotes, now_str, today_str)
-        elif insight_type == 'hft':
-            results = _hft_insights(quotes, now_str, today_str)
-        elif insight_type == 'multi_factor':
-            results = _multi_factor_insights(quotes, now_str, today_str)
-
-        return results
+        if insight_type == 'stat_arb':
+            refresh_pair_book()
+        return build_insights(get_quote_frame(), insight_type)
+    except Exception as e:
+        return {'error': str(e)}
+
+
+async def get_strategy_insights_async(insight_type='trend_follow'):
+    try:
+        if insight_type == 'stat_arb':
+            await refresh_pair_book_async()
+        return build_insights(await get_quote_frame_async(), insight_type)
     except Exception as e:
         return {'error': str(e)}
 
 
-def _trend_insights(quotes, now_str, today_str):
+def _trend_insights(frame, quotes, now_str, today_str):
     """趋势跟踪洞察"""
     insights = []
-    sorted_q = sorted(quotes, key=lambda x: x.get('changePercent', 0), reverse=True)
-    bulls = [q for q in sorted_q if q.get('changePercent', 0) > 1]
-    for i, q in enumerate(bulls[:3]):
+    pcts = frame.changePercent
+    bulls = _ranked(pcts, pcts > 1, descending=True)
+    for i, q in enumerate(quotes[j] for j in bulls[:3]):
         pct = q['changePercent']
         turnover = q.get('turnoverRate', 0)
         amount_yi = q.get('amount', 0) / 1e4
@@ -705,8 +1584,8 @@ def _trend_insights(quotes, now_str, today_str):
             'relatedStocks': [q['name']], 'insightType': 'trend_follow',
             'signal': 'bullish', 'keyMetrics': metrics, 'analystViews': [],
         })
-    bears = [q for q in sorted_q if q.get('changePercent', 0) < -2]
-    for i, q in enumerate(bears[:2]):
+    bears = _ranked(pcts, pcts < -2, descending=True)
+    for i, q in enumerate(quotes[j] for j in bears[:2]):
         pct = q['changePercent']
         amount_yi = q.get('amount', 0) / 1e4
         insights.append({
@@ -723,12 +1602,12 @@ def _trend_insights(quotes, now_str, today_str):
     return insights
 
 
-def _mean_rev_insights(quotes, now_str, today_str):
+def _mean_rev_insights(frame, quotes, now_str, today_str):
     """均值回归洞察"""
     insights = []
-    sorted_q = sorted(quotes, key=lambda x: x.get('changePercent', 0))
-    oversold = [q for q in sorted_q if q.get('changePercent', 0) < -1]
-    for i, q in enumerate(oversold[:3]):
+    pcts = frame.changePercent
+    oversold = _ranked(pcts, pcts < -1)
+    for i, q in enumerate(quotes[j] for j in oversold[:3]):
         pct = q['changePercent']
         pe = q.get('pe', 0)
         amount_yi = q.get('amount', 0) / 1e4
@@ -744,8 +1623,9 @@ def _mean_rev_insights(quotes, now_str, today_str):
             'relatedStocks': [q['name']], 'insightType': 'mean_reversion',
             'signal': 'bullish', 'keyMetrics': metrics, 'analystViews': [],
         })
-    overbought = [q for q in sorted_q[::-1] if q.get('changePercent', 0) > 2]
-    for i, q in enumerate(overbought[:2]):
+    # 升序结果整体反转 (同值时原顺序也反转, 与旧实现一致)
+    overbought = _ranked(pcts, pcts > 2)[::-1]
+    for i, q in enumerate(quotes[j] for j in overbought[:2]):
         pct = q['changePercent']
         amount_yi = q.get('amount', 0) / 1e4
         insights.append({
@@ -762,39 +1642,38 @@ def _mean_rev_insights(quotes, now_str, today_str):
     return insights
 
 
-def _stat_arb_insights(quotes, now_str, today_str):
-    """统计套利洞察: 同行业配对价差"""
+def _ranked(values, mask, descending=False):
+    """mask 命中的行号, 按 values 稳定排序 (降序时同值保持原顺序)"""
+    idx = np.flatnonzero(mask)
+    key = -values[idx] if descending else values[idx]
+    return idx[np.argsort(key, kind='stable')].tolist()
+
+
+def _stat_arb_insights(frame, quotes, now_str, today_str, min_z=1.0, top=5):
+    """统计套利洞察: 配对簿中实时价差偏离最大的同行业协整配对"""
     insights = []
-    pairs = [
-        (['600519', '000858'], '食品饮料'),
-        (['601318', '600030'], '非银金融'),
-        (['300750', '601012'], '电力设备'),
-        (['688981', '002371'], '半导体'),
-        (['000001', '600036'], '银行'),
-    ]
-    qmap = {q['code']: q for q in quotes}
-    for idx, (codes, sector) in enumerate(pairs):
-        if codes[0] not in qmap or codes[1] not in qmap:
-            continue
-        q1, q2 = qmap[codes[0]], qmap[codes[1]]
-        spread = q1.get('changePercent', 0) - q2.get('changePercent', 0)
-        if abs(spread) < 0.5:
-            continue
-        leader = q1 if spread > 0 else q2
-        lagger = q2 if spread > 0 else q1
-        signal = 'bullish' if abs(spread) > 2 else 'neutral'
+    for idx, p in enumerate(_pair_book.live(frame, min_z)[:top]):
+        q1, q2 = quotes[p['ia']], quotes[p['ib']]
+        z = p['z']
+        rich, cheap = (q1, q2) if z > 0 else (q2, q1)
+        signal = 'bullish' if abs(z) >= 2 else 'neutral'
         insights.append({
             'id': f'sa_live_{idx}', 'time': now_str.split(' ')[1],
             'datetime': now_str, 'lagDays': 0, 'verifiedDate': today_str,
-            'title': f"{sector}配对: {q1['name']}vs{q2['name']}价差{spread:+.2f}%",
-            'summary': f"{leader['name']}({leader['changePercent']:+.2f}%)跑赢{lagger['name']}({lagger['changePercent']:+.2f}%)，价差{abs(spread):.2f}%，存在收敛套利机会。",
-            'source': '腾讯财经(实时)', 'sourceUrl': _stock_url(q['code']),
+            'title': f"{p['sector']}配对: {q1['name']}vs{q2['name']}价差偏离{z:+.2f}σ",
+            'summary': f"{q1['name']}/{q2['name']}近{pair_engine.PAIR_LOOKBACK}日协整(t={p['adf_t']:.2f})，"
+                       f"对冲比{p['beta']:.2f}，价差偏离均值{abs(z):.2f}倍标准差；"
+                       f"{rich['name']}相对偏贵、{cheap['name']}相对偏便宜，半衰期约{p['half_life']:.1f}日，存在收敛套利机会。",
+            'source': '腾讯财经(实时)', 'sourceUrl': _stock_url(q1['code']),
             'relatedStocks': [q1['name'], q2['name']],
             'insightType': 'stat_arb', 'signal': signal,
             'keyMetrics': {
                 q1['name']: f"{q1['changePercent']:+.2f}%",
                 q2['name']: f"{q2['changePercent']:+.2f}%",
-                '价差': f"{spread:+.2f}%",
+                '价差Z': f"{z:+.2f}",
+                '对冲比': f"{p['beta']:.2f}",
+                '半衰期': f"{p['half_life']:.1f}日",
+                '相关系数': f"{p['corr']:.2f}",
             },
             'analystViews': [],
         })
@@ -839,79 +1718,47 @@ def _hft_insights(quotes, now_str, today_str):
                 'relatedStocks': [name], 'insightType': 'hft', 'signal': signal,
                 'keyMetrics': {'成交额': f'{amount_yi:.0f}亿', '涨跌': f'{chg:+.2f}%', '换手': f'{turnover:.1f}%'},
                 'analystViews': [],
-            })
-    return insights[:5]
-
-
-def _multi_factor_insights(quotes, now_str, today_str):
-    """多因子模型洞察: 动量+估值+成交量多维评分"""
-    insights = []
-    for idx, q in enumerate(quotes):
-        name = q.get('name', '')
-        chg = q.get('changePercent', 0)
-        pe = q.get('pe', 0)
-        pb = q.get('pb', 0)
-        turnover = q.get('turnoverRate', 0)
-        amount = q.get('amount', 0)
-        amount_yi = amount / 1e4 if amount > 0 else 0
+            })
+    return insights[:5]
 
-        # 多因子评分
-        score = 0
-        factors = []
-        # 动量因子
-        if chg > 2:
-            score += 30
-            factors.append(f'动量+{chg:.1f}%')
-        elif chg < -2:
-            score += 15
-            factors.append(f'反转{chg:.1f}%')
-        else:
-            score += 20
-            factors.append(f'动量{chg:+.1f}%')
-        # 估值因子
-        if 0 < pe < 20:
-            score += 30
-            factors.append(f'低估PE{pe:.0f}x')
-        elif 0 < pe < 40:
-            score += 20
-            factors.append(f'PE{pe:.0f}x')
-        else:
-            score += 10
-            factors.append(f'PE{pe:.0f}x')
-        # 流动性因子
-        if turnover > 3:
-            score += 25
-            factors.append(f'高换手{turnover:.1f}%')
-        elif turnover > 1:
-            score += 20
-            factors.append(f'换手{turnover:.1f}%')
-        else:
-            score += 10
-            factors.append(f'低换手{turnover:.1f}%')
-        # PB因子
-        if 0 < pb < 1.5:
-            score += 15
-            factors.append(f'破净PB{pb:.2f}')
-        elif 0 < pb < 3:
-            score += 10
-            factors.append(f'PB{pb:.2f}')
-
-        if score < 60:
-            continue
 
-        signal = 'bullish' if score >= 75 else 'neutral'
+def _multi_factor_insights(frame, quotes, now_str, today_str):
+    """多因子模型洞察: 动量 / 估值 / 流动性 / 市净率横截面打分 (缩尾 + 行业中性 + z-score), 取综合分前 5"""
+    weights = _mf_config['weights'] or factor_model.DEFAULT_WEIGHTS
+    codes = frame.codes.tolist()
+    _feature_store.on_frame(frame)
+    features = _feature_store.matrix(factor_model.feature_names(weights), codes)
+    groups = [STOCK_SECTOR.get(c, '其他') for c in codes] if _mf_config['sector_neutral'] else None
+    scores = factor_model.score(features, weights, groups)
+
+    insights = []
+    for rank, i in enumerate(scores.top(5).tolist(), 1):
+        total = float(scores.score[i])
+        if total <= 0:
+            break
+        q = quotes[i]
+        name = q.get('name', '')
+        chg, pe, turnover = q.get('changePercent', 0), q.get('pe', 0), q.get('turnoverRate', 0)
+        points = round(float(scores.percentile[i]) * 100)
+        breakdown = scores.breakdown(i)
+        parts = [f'{factor_model.FACTOR_LABELS[f]}{c:+.2f}' for f, _, c in breakdown]
         insights.append({
-            'id': f'mf_live_{idx}', 'time': now_str.split(' ')[1],
+            'id': f'mf_live_{i}', 'time': now_str.split(' ')[1],
             'datetime': now_str, 'lagDays': 0, 'verifiedDate': today_str,
-            'title': f'{name}多因子评分{score}分，{"强烈看多" if score >= 85 else "综合偏多" if score >= 75 else "中性偏多"}',
-            'summary': f'{name}因子分解: {", ".join(factors)}。综合评分{score}/100。',
+            'title': f'{name}多因子评分{points}分，{"强烈看多" if total >= 1 else "综合偏多" if total >= 0.5 else "中性偏多"}',
+            'summary': f'{name}因子贡献 (z×权重): {", ".join(parts)}。综合 {total:+.2f}，全池 {len(scores)} 只中排名第 {rank}。',
             'source': '腾讯财经(实时)', 'sourceUrl': _stock_url(q['code']),
-            'relatedStocks': [name], 'insightType': 'multi_factor', 'signal': signal,
-            'keyMetrics': {'评分': f'{score}', '涨跌': f'{chg:+.2f}%', 'PE': f'{pe:.0f}x', '换手': f'{turnover:.1f}%'},
+            'relatedStocks': [name], 'insightType': 'multi_factor',
+            'signal': 'bullish' if total >= 0.5 else 'neutral',
+            'keyMetrics': {'评分': f'{points}', '综合': f'{total:+.2f}', '涨跌': f'{chg:+.2f}%',
+                           'PE': f'{pe:.0f}x', '换手': f'{turnover:.1f}%'},
+            'factorContributions': [
+                {'factor': f, 'label': factor_model.FACTOR_LABELS[f], 'z': round(z, 3), 'contribution': round(c, 4)}
+                for f, z, c in breakdown
+            ],
             'analystViews': [],
         })
-    insights.sort(key=lambda x: int(x['keyMetrics']['评分']), reverse=True)
-    return insights[:5]
+    return insights
 
 
 def _stock_url(code):
@@ -923,26 +1770,20 @@ def _stock_url(code):
 # ═══════════════════════════════════════════
 # 实时行情 — 双源交叉验证
 # ═══════════════════════════════════════════
-def get_price_ticks():
-    """腾讯+新浪双源行情，比对价格差异"""
-    tencent = []
-    sina = []
-    try:
-        tencent = fetch_quotes_tencent(DEFAULT_CODES)
-    except Exception:
-        pass
-    try:
-        sina = fetch_quotes_sina(DEFAULT_CODES)
-    except Exception:
-        pass
+# 双源比对只覆盖固定的核心股票 (与股票池规模无关): 每 10 秒双源抓取并逐只写入 data_history
+PRICE_TICK_CODES = tuple(DEFAULT_CODES)
+
+
+def _build_price_ticks(tencent, sina):
     sina_map = {q['code']: q for q in sina}
+    tencent_codes = {q['code'] for q in tencent}
     ts = int(datetime.now().timestamp() * 1000)
     results = []
     for tq in (tencent or sina):
         sq = sina_map.get(tq['code'])
         sources = []
         divergence = None
-        if tq in tencent:
+        if tq['code'] in tencent_codes:
             sources.append('akshare')
         if sq:
             sources.append('sina')
@@ -960,18 +1801,46 @@ def get_price_ticks():
     return results
 
 
+def get_price_ticks():
+    """腾讯+新浪双源行情，比对价格差异"""
+    tencent = []
+    sina = []
+    try:
+        tencent = get_quote_snapshot(PRICE_TICK_CODES, source='tencent')
+    except Exception:
+        pass
+    try:
+        sina = get_quote_snapshot(PRICE_TICK_CODES, source='sina')
+    except Exception:
+        pass
+    return _build_price_ticks(tencent, sina)
+
+
+async def get_price_ticks_async():
+    tencent, sina = await asyncio.gather(
+        get_quote_snapshot_async(PRICE_TICK_CODES, source='tencent'),
+        get_quote_snapshot_async(PRICE_TICK_CODES, source='sina'),
+        return_exceptions=True,
+    )
+    if isinstance(tencent, BaseException):
+        tencent = []
+    if isinstance(sina, BaseException):
+        sina = []
+    return _build_price_ticks(tencent, sina)
+
+
 # ═══════════════════════════════════════════
 # 资金流向 — 东方财富 push2 API
 # ═══════════════════════════════════════════
-def _fetch_eastmoney_fund_flow():
-    """东方财富个股资金流排行"""
-    url = ('https://push2.eastmoney.com/api/qt/clist/get?'
-           'fid=f62&po=1&pz=50&pn=1&np=1&'
-           'fltt=2&invt=2&'
-           'fields=f12,f14,f62,f66,f69,f72,f75,f78,f81,f84,f87,f124,f184,f204,f205,f206'
-           '&fs=m:0+t:6+f:!2,m:0+t:13+f:!2,m:0+t:80+f:!2,'
-           'm:1+t:2+f:!2,m:1+t:23+f:!2,m:0+t:7+f:!2,m:1+t:3+f:!2')
-    raw = _http_get_utf8(url)
+_FUND_FLOW_URL = ('https://push2.eastmoney.com/api/qt/clist/get?'
+                 'fid=f62&po=1&pz=50&pn=1&np=1&'
+                 'fltt=2&invt=2&'
+                 'fields=f12,f14,f62,f66,f69,f72,f75,f78,f81,f84,f87,f124,f184,f204,f205,f206'
+                 '&fs=m:0+t:6+f:!2,m:0+t:13+f:!2,m:0+t:80+f:!2,'
+                 'm:1+t:2+f:!2,m:1+t:23+f:!2,m:0+t:7+f:!2,m:1+t:3+f:!2')
+
+
+def _parse_eastmoney_fund_flow(raw):
     data = json.loads(raw)
     items = data.get('data', {}).get('diff', [])
     results = []
@@ -994,12 +1863,16 @@ def _fetch_eastmoney_fund_flow():
     return results
 
 
-def get_fund_flow():
-    """资金流向监控 — 聚合 Top5 流入/流出"""
-    try:
-        items = _fetch_eastmoney_fund_flow()
-    except Exception:
-        return None
+def _fetch_eastmoney_fund_flow():
+    """东方财富个股资金流排行"""
+    return _parse_eastmoney_fund_flow(_http_get_utf8(_FUND_FLOW_URL))
+
+
+async def _fetch_eastmoney_fund_flow_async():
+    return _parse_eastmoney_fund_flow(await _http_get_async(_FUND_FLOW_URL, encoding='utf-8'))
+
+
+def _build_fund_flow(items):
     if not items:
         return None
     total_main = sum(it['mainNetInflow'] for it in items)
@@ -1020,16 +1893,115 @@ def get_fund_flow():
     }
 
 
+def get_fund_flow():
+    """资金流向监控 — 聚合 Top5 流入/流出"""
+    try:
+        items = _fetch_eastmoney_fund_flow()
+    except Exception:
+        return None
+    return _build_fund_flow(items)
+
+
+async def get_fund_flow_async():
+    try:
+        items = await _fetch_eastmoney_fund_flow_async()
+    except Exception:
+        return None
+    return _build_fund_flow(items)
+
+
 # ═══════════════════════════════════════════
 # K线 + 资金流叠加
 # ═══════════════════════════════════════════
-def _fetch_eastmoney_stock_flow_history(code, days=30):
-    """东方财富个股资金流历史 (日K级别)"""
+def _code_to_eastmoney(code):
+    """600519 → 1.600519, 000001 → 0.000001"""
+    return ('1.' if code.startswith(('5', '6', '9')) else '0.') + code
+
+
+# ── 批量个股资金流 — 有界并发, 一轮往返取回整批 ──
+FLOW_FETCH_CONCURRENCY = 16
+
+_flow_executor = None
+_flow_executor_lock = threading.Lock()
+
+
+def _get_flow_executor():
+    global _flow_executor
+    with _flow_executor_lock:
+        if _flow_executor is None:
+            _flow_executor = ThreadPoolExecutor(
+                max_workers=FLOW_FETCH_CONCURRENCY, thread_name_prefix='flow-fetch')
+        return _flow_executor
+
+
+def fetch_flows_batch(codes, fetch_one, label='flow'):
+    """并发抓取一批股票的资金流 → {code: 结果}, 保持 codes 顺序; 单只失败记日志后跳过"""
+    def _one(code):
+        try:
+            return fetch_one(code)
+        except Exception as e:
+            logger.warning('%s flow for %s error: %s', label, code, e)
+            return e
+
+    results = _get_flow_executor().map(_one, codes)
+    return {c: r for c, r in zip(codes, results) if not isinstance(r, Exception)}
+
+
+async def fetch_flows_batch_async(codes, fetch_one, label='flow'):
+    """fetch_flows_batch 的协程版, fetch_one 为协程函数"""
+    sem = asyncio.Semaphore(FLOW_FETCH_CONCURRENCY)
+
+    async def _one(code):
+        async with sem:
+            try:
+                return await fetch_one(code)
+            except Exception as e:
+                logger.warning('%s flow for %s error: %s', label, code, e)
+                return e
+
+    results = await asyncio.gather(*(_one(c) for c in codes))
+    return {c: r for c, r in zip(codes, results) if not isinstance(r, Exception)}
+
+
+def _frame_names(frame, codes):
+    """从行情快照查名称 → {code: name}; 不在快照中的代码省略"""
+    rows = ((c, frame.index_of(c)) for c in codes)
+    return {c: str(frame.names[i]) for c, i in rows if i is not None}
+
+
+def _quote_names(codes):
+    """名称 → {code: name}: 先查共享的股票池快照, 股票池外的代码再单独取一次快照; 失败的省略"""
+    names = {}
+    try:
+        names = _frame_names(get_quote_frame(), codes)
+        missing = [c for c in codes if c not in names]
+        if missing:
+            names.update(_frame_names(get_quote_frame(missing), missing))
+    except Exception:
+        pass
+    return names
+
+
+async def _quote_names_async(codes):
+    names = {}
+    try:
+        names = _frame_names(await get_quote_frame_async(), codes)
+        missing = [c for c in codes if c not in names]
+        if missing:
+            names.update(_frame_names(await get_quote_frame_async(missing), missing))
+    except Exception:
+        pass
+    return names
+
+
+def _flow_history_url(code, days):
     secid = _code_to_eastmoney(code)
-    url = (f'https://push2his.eastmoney.com/api/qt/stock/fflow/daykline/get?'
-           f'secid={secid}&lmt={days}&klt=101&fields1=f1,f2,f3,f7'
-           f'&fields2=f51,f52,f53,f54,f55,f56,f57,f58,f59,f60,f61,f62,f63')
-    raw = _http_get_utf8(url)
+    return (f'https://push2his.eastmoney.com/api/qt/stock/fflow/daykline/get?'
+            f'secid={secid}&lmt={days}&klt=101&fields1=f1,f2,f3,f7'
+            f'&fields2=f51,f52,f53,f54,f55,f56,f57,f58,f59,f60,f61,f62,f63')
+
+
+def _parse_flow_history(raw):
     data = json.loads(raw)
     klines = data.get('data', {}).get('klines', [])
     results = []
@@ -1047,13 +2019,70 @@ def _fetch_eastmoney_stock_flow_history(code, days=30):
     return results
 
 
-def get_kline_flow(code='688981'):
-    """K线 + 资金流叠加数据"""
-    kline = fetch_kline_tencent(code, 30)
+def _fetch_eastmoney_stock_flow_history(code, days=30):
+    """东方财富个股资金流历史 (日K级别)"""
+    return _parse_flow_history(_http_get_utf8(_flow_history_url(code, days)))
+
+
+async def _fetch_eastmoney_stock_flow_history_async(code, days=30):
+    return _parse_flow_history(
+        await _http_get_async(_flow_history_url(code, days), encoding='utf-8'))
+
+
+# ── 日级资金流本地存储 — 只抓缺失日期 / 当日一根 ──
+_flow_store = None
+_flow_store_lock = threading.Lock()
+
+
+def _get_flow_store():
+    global _flow_store
+    with _flow_store_lock:
+        if _flow_store is None:
+            _flow_store = flow_store.FlowStore(os.path.join(DATA_DIR, 'flow_daily.db'))
+        return _flow_store
+
+
+def _store_flows(store, code, days, lmt, fetched):
+    """写入增量抓取结果并读盘; fetched 为异常时退回已有数据"""
+    if isinstance(fetched, Exception):
+        if not store.has(code):
+            raise fetched
+        logger.warning('flow history for %s: serving stored bars (%s)', code, fetched)
+    else:
+        store.upsert(code, fetched, lmt)
+    return store.read(code, days)
+
+
+def get_daily_flows(code, days=30):
+    """个股日级资金流 (升序) — 本地存储, 只向上游抓缺失部分"""
+    store = _get_flow_store()
+    lmt = store.plan(code, days)
+    if not lmt:
+        return store.read(code, days)
     try:
-        flows = _fetch_eastmoney_stock_flow_history(code, 30)
-    except Exception:
-        flows = []
+        fetched = _fetch_eastmoney_stock_flow_history(code, lmt)
+    except Exception as e:
+        fetched = e
+    return _store_flows(store, code, days, lmt, fetched)
+
+
+async def get_daily_flows_async(code, days=30):
+    store = _get_flow_store()
+    lmt = store.plan(code, days)
+    if not lmt:
+        return store.read(code, days)
+    try:
+        fetched = await _fetch_eastmoney_stock_flow_history_async(code, lmt)
+    except Exception as e:
+        fetched = e
+    return _store_flows(store, code, days, lmt, fetched)
+
+
+def flow_store_stats():
+    return _get_flow_store().stats()
+
+
+def _build_kline_flow(kline, flows):
     flow_map = {}
     for f in flows:
         d = f['date']
@@ -1070,30 +2099,41 @@ def get_kline_flow(code='688981'):
     return results
 
 
+def get_kline_flow(code='688981'):
+    """K线 + 资金流叠加数据"""
+    kline = fetch_kline_tencent(code, 30)
+    try:
+        flows = get_daily_flows(code, 30)
+    except Exception:
+        flows = []
+    return _build_kline_flow(kline, flows)
+
+
+async def get_kline_flow_async(code='688981'):
+    kline, flows = await asyncio.gather(
+        fetch_kline_tencent_async(code, 30),
+        get_daily_flows_async(code, 30),
+        return_exceptions=True,
+    )
+    if isinstance(kline, BaseException):
+        raise kline
+    if isinstance(flows, BaseException):
+        flows = []
+    return _build_kline_flow(kline, flows)
+
+
 # ═══════════════════════════════════════════
 # 大资金建仓减仓预警
 # ═══════════════════════════════════════════
-def get_capital_alerts():
-    """分析资金流历史，检测建仓/减仓/异动"""
+def _build_capital_alerts(flows_by_code, names):
     now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     today_str = now_str[:10]
     alerts = []
     alert_id = 0
-    for code in DEFAULT_CODES[:15]:
-        try:
-            flows = _fetch_eastmoney_stock_flow_history(code, 10)
-        except Exception:
-            continue
+    for code, flows in flows_by_code.items():
         if len(flows) < 3:
             continue
-        name = STOCK_SECTOR.get(code, code)
-        # 查找股票名
-        try:
-            q = fetch_quotes_tencent([code])
-            if q:
-                name = q[0]['name']
-        except Exception:
-            pass
+        name = names.get(code) or code
         recent = flows[-5:]
         main_flows = [f['mainInflow'] for f in recent]
         consecutive_in = sum(1 for m in main_flows if m > 0)
@@ -1142,36 +2182,38 @@ def get_capital_alerts():
     return alerts
 
 
+def get_capital_alerts():
+    """分析资金流历史，检测建仓/减仓/异动"""
+    codes = DEFAULT_CODES[:15]
+    flows_by_code = fetch_flows_batch(
+        codes, lambda c: get_daily_flows(c, 10), 'capital')
+    # 股票名取自共享的股票池行情快照
+    return _build_capital_alerts(flows_by_code, _quote_names(codes))
+
+
+async def get_capital_alerts_async():
+    codes = DEFAULT_CODES[:15]
+    flows_by_code, names = await asyncio.gather(
+        fetch_flows_batch_async(
+            codes, lambda c: get_daily_flows_async(c, 10), 'capital'),
+        _quote_names_async(codes),
+    )
+    return _build_capital_alerts(flows_by_code, names)
+
+
 # ═══════════════════════════════════════════
 # 多周期趋势预测 — 均线系统
 # ═══════════════════════════════════════════
-def _calc_ma(prices, period):
-    if len(prices) < period:
-        return None
-    return sum(prices[-period:]) / period
-
-
-def get_trend(code='688981'):
-    """基于120日K线计算日/周/月趋势"""
-    kline = fetch_kline_tencent(code, 120)
-    if not kline or len(kline) < 20:
+def _build_trend(code, ind, live_quote):
+    """ind 为 IndicatorStream 的当前指标值"""
+    if ind['bars'] < 20:
         return None
-    closes = [k['close'] for k in kline]
-    highs = [k['high'] for k in kline]
-    lows = [k['low'] for k in kline]
-    current = closes[-1]
+    current = ind['close']
     name_str = code
-    try:
-        q = fetch_quotes_tencent([code])
-        if q:
-            name_str = q[0]['name']
-            current = q[0]['price']
-    except Exception:
-        pass
-    ma5 = _calc_ma(closes, 5)
-    ma10 = _calc_ma(closes, 10)
-    ma20 = _calc_ma(closes, 20)
-    ma60 = _calc_ma(closes, 60)
+    if live_quote:
+        name_str = live_quote['name']
+        current = live_quote['price']
+    ma5, ma10, ma20, ma60 = ind['ma5'], ind['ma10'], ind['ma20'], ind['ma60']
     daily_dir = 'up' if (ma5 and current > ma5 and ma5 > (ma10 or 0)) else \
                 'down' if (ma5 and current < ma5 and ma5 < (ma10 or float('inf'))) else 'sideways'
     daily_conf = 0.7 if daily_dir != 'sideways' else 0.4
@@ -1181,10 +2223,8 @@ def get_trend(code='688981'):
     monthly_dir = 'up' if (ma60 and current > ma60) else \
                   'down' if (ma60 and current < ma60) else 'sideways'
     monthly_conf = 0.6 if monthly_dir != 'sideways' else 0.3
-    recent_lows = lows[-20:]
-    recent_highs = highs[-20:]
-    support = min(recent_lows) if recent_lows else current * 0.95
-    resistance = max(recent_highs) if recent_highs else current * 1.05
+    support = ind['support']
+    resistance = ind['resistance']
 
     def _factors(direction, ma_short, ma_long):
         f = []
@@ -1227,19 +2267,55 @@ def get_trend(code='688981'):
     }
 
 
+def get_trend(code='688981'):
+    """基于120日K线计算日/周/月趋势 (流式指标状态, 实时价并入当日K线)"""
+    ind = get_indicators(code)
+    if ind['bars'] < 20:
+        return None
+    live_quote = None
+    try:
+        q = fetch_quotes_tencent([code])
+        if q:
+            live_quote = q[0]
+    except Exception:
+        pass
+    if live_quote:
+        _observe_quote(live_quote)
+        ind = _indicator_stream.values(code)
+    return _build_trend(code, ind, live_quote)
+
+
+async def get_trend_async(code='688981'):
+    ind, q = await asyncio.gather(
+        get_indicators_async(code), fetch_quotes_tencent_async([code]),
+        return_exceptions=True,
+    )
+    if isinstance(ind, BaseException):
+        raise ind
+    live_quote = q[0] if q and not isinstance(q, BaseException) else None
+    if live_quote:
+        _observe_quote(live_quote)
+        ind = _indicator_stream.values(code)
+    return _build_trend(code, ind, live_quote)
+
+
 # ═══════════════════════════════════════════
 # 实时交易预警
 # ═══════════════════════════════════════════
-def get_trading_alerts():
-    """从实时行情中提取异常预警"""
+def _build_trading_alerts(frame):
     now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     alerts = []
     aid = 0
-    try:
-        quotes = fetch_quotes_tencent(DEFAULT_CODES)
-    except Exception:
-        return []
-    for q in quotes:
+    # 向量化预筛: 任一预警条件命中的行
+    pcts = frame.changePercent
+    turns = frame.turnover
+    amps = (frame.high - frame.low) / np.where(frame.prevClose == 0, 1, frame.prevClose) * 100
+    hit = ((np.abs(pcts) >= 2) | (turns >= 3) | (amps >= 3)
+           | ((pcts > 1) & (frame.volume > 0) & (turns < 1))
+           | ((pcts < -1) & (turns >= 5)))
+    quotes = frame.to_dicts()
+    for i in np.flatnonzero(hit).tolist():
+        q = quotes[i]
         pct = q.get('changePercent', 0)
         turnover = q.get('turnoverRate', 0)
         high = q.get('high', 0)
@@ -1321,6 +2397,86 @@ def get_trading_alerts():
     return alerts
 
 
+def get_trading_alerts():
+    """从实时行情中提取异常预警"""
+    try:
+        frame = get_quote_frame()
+    except Exception:
+        return []
+    return _build_trading_alerts(frame)
+
+
+async def get_trading_alerts_async():
+    try:
+        frame = await get_quote_frame_async()
+    except Exception:
+        return []
+    return _build_trading_alerts(frame)
+
+
+# ── 个股资金流 (东方财富 fflow) — 机构监控共用 ──
+def _minute_flow_url(code):
+    return (
+        f'https://push2.eastmoney.com/api/qt/stock/fflow/kline/get?'
+        f'secid={_code_to_eastmoney(code)}&fields1=f1,f2,f3&fields2=f51,f52,f53,f54,f55,f56'
+        f'&klt=1&lmt=1'
+    )
+
+
+def _parse_minute_flow(raw):
+    """最新一根分钟资金流, 无数据返回 None"""
+    if not raw:
+        return None
+    obj = json.loads(raw)
+    klines = (obj.get('data', {}) or {}).get('klines', [])
+    if not klines:
+        return None
+    parts = klines[-1].split(',')
+    if len(parts) < 5:
+        return None
+    return {
+        'mainNetInflow': float(parts[1]),
+        'superLargeInflow': float(parts[2]),
+        'largeInflow': float(parts[3]),
+        'mediumInflow': float(parts[4]),
+        'smallInflow': float(parts[5]) if len(parts) > 5 else 0,
+    }
+
+
+def _fetch_minute_flows(codes, label):
+    """并发查询个股当日分钟资金流 → {code: flow}"""
+    flows = fetch_flows_batch(
+        codes, lambda c: _parse_minute_flow(_http_get(_minute_flow_url(c))), label)
+    return {c: f for c, f in flows.items() if f}
+
+
+async def _fetch_minute_flows_async(codes, label):
+    async def _one(code):
+        return _parse_minute_flow(await _http_get_async(_minute_flow_url(code)))
+
+    flows = await fetch_flows_batch_async(codes, _one, label)
+    return {c: f for c, f in flows.items() if f}
+
+
+def _to_broker_day_flows(flows):
+    return [{
+        'date': f['date'],
+        'main': f['mainInflow'],
+        'super': f['superLargeInflow'],
+        'large': f['largeInflow'],
+        'medium': f['mediumInflow'],
+    } for f in flows]
+
+
+def _fetch_broker_day_flows(code):
+    """近 10 日主力资金流 (读日级资金流存储)"""
+    return _to_broker_day_flows(get_daily_flows(code, 10))
+
+
+async def _fetch_broker_day_flows_async(code):
+    return _to_broker_day_flows(await get_daily_flows_async(code, 10))
+
+
 # ── 中央汇金动向监控 ──
 
 # 汇金重仓股 (四大行 + 主要金融股)
@@ -1345,45 +2501,10 @@ HUIJIN_ETFS = {
 }
 
 
-def get_huijin_monitor():
-    """监控中央汇金重仓股 + ETF 实时行情与资金流向"""
+def _build_huijin_monitor(quotes, flow_map):
     now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-    # 1) 获取重仓股实时行情
-    stock_codes = list(HUIJIN_HOLDINGS.keys())
-    etf_codes = list(HUIJIN_ETFS.keys())
-    all_codes = stock_codes + etf_codes
-
-    quotes = get_quotes(all_codes)
     quote_map = {q['code']: q for q in quotes}
 
-    # 2) 获取重仓股资金流 (东方财富 — 逐个查询个股资金流)
-    flow_map = {}
-    for code in stock_codes:
-        try:
-            secid = f'1.{code}' if code.startswith('6') else f'0.{code}'
-            url = (
-                f'https://push2.eastmoney.com/api/qt/stock/fflow/kline/get?'
-                f'secid={secid}&fields1=f1,f2,f3&fields2=f51,f52,f53,f54,f55,f56'
-                f'&klt=1&lmt=1'
-            )
-            resp = _http_get(url)
-            if resp:
-                obj = json.loads(resp)
-                klines = (obj.get('data', {}) or {}).get('klines', [])
-                if klines:
-                    parts = klines[-1].split(',')
-                    if len(parts) >= 5:
-                        flow_map[code] = {
-                            'mainNetInflow': float(parts[1]),
-                            'superLargeInflow': float(parts[2]),
-                            'largeInflow': float(parts[3]),
-                            'mediumInflow': float(parts[4]),
-                            'smallInflow': float(parts[5]) if len(parts) > 5 else 0,
-                        }
-        except Exception as e:
-            logger.warning('huijin flow for %s error: %s', code, e)
-
     # 3) 组装重仓股数据
     holdings = []
     for code, meta in HUIJIN_HOLDINGS.items():
@@ -1458,6 +2579,25 @@ def get_huijin_monitor():
     }
 
 
+def get_huijin_monitor():
+    """监控中央汇金重仓股 + ETF 实时行情与资金流向"""
+    # 1) 获取重仓股 + ETF 实时行情
+    stock_codes = list(HUIJIN_HOLDINGS.keys())
+    quotes = get_quotes(stock_codes + list(HUIJIN_ETFS.keys()))
+    # 2) 获取重仓股资金流 (东方财富 — 个股资金流并发查询)
+    flow_map = _fetch_minute_flows(stock_codes, 'huijin')
+    return _build_huijin_monitor(quotes, flow_map)
+
+
+async def get_huijin_monitor_async():
+    stock_codes = list(HUIJIN_HOLDINGS.keys())
+    quotes, flow_map = await asyncio.gather(
+        get_quotes_async(stock_codes + list(HUIJIN_ETFS.keys())),
+        _fetch_minute_flows_async(stock_codes, 'huijin'),
+    )
+    return _build_huijin_monitor(quotes, flow_map)
+
+
 # ── 社保基金动向监控 ──
 
 # 社保基金重仓股 (根据公开季报披露)
@@ -1488,39 +2628,10 @@ SSF_CAT_LABELS = {
 }
 
 
-def get_ssf_monitor():
-    """监控社保基金重仓股实时行情与资金流向"""
+def _build_ssf_monitor(quotes, flow_map):
     now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    stock_codes = list(SSF_HOLDINGS.keys())
-
-    quotes = get_quotes(stock_codes)
     quote_map = {q['code']: q for q in quotes}
 
-    # 逐个查询资金流
-    flow_map = {}
-    for code in stock_codes:
-        try:
-            secid = f'1.{code}' if code.startswith('6') else f'0.{code}'
-            url = (
-                f'https://push2.eastmoney.com/api/qt/stock/fflow/kline/get?'
-                f'secid={secid}&fields1=f1,f2,f3&fields2=f51,f52,f53,f54,f55,f56'
-                f'&klt=1&lmt=1'
-            )
-            resp = _http_get(url)
-            if resp:
-                obj = json.loads(resp)
-                klines = (obj.get('data', {}) or {}).get('klines', [])
-                if klines:
-                    parts = klines[-1].split(',')
-                    if len(parts) >= 5:
-                        flow_map[code] = {
-                            'mainNetInflow': float(parts[1]),
-                            'superLargeInflow': float(parts[2]),
-                            'largeInflow': float(parts[3]),
-                        }
-        except Exception as e:
-            logger.warning('ssf flow for %s error: %s', code, e)
-
     # 组装持仓数据
     holdings = []
     for code, meta in SSF_HOLDINGS.items():
@@ -1599,6 +2710,23 @@ def get_ssf_monitor():
     }
 
 
+def get_ssf_monitor():
+    """监控社保基金重仓股实时行情与资金流向"""
+    stock_codes = list(SSF_HOLDINGS.keys())
+    quotes = get_quotes(stock_codes)
+    flow_map = _fetch_minute_flows(stock_codes, 'ssf')
+    return _build_ssf_monitor(quotes, flow_map)
+
+
+async def get_ssf_monitor_async():
+    stock_codes = list(SSF_HOLDINGS.keys())
+    quotes, flow_map = await asyncio.gather(
+        get_quotes_async(stock_codes),
+        _fetch_minute_flows_async(stock_codes, 'ssf'),
+    )
+    return _build_ssf_monitor(quotes, flow_map)
+
+
 # ── 头部券商建仓减仓监控 ──
 
 BROKER_STOCKS = {
@@ -1609,13 +2737,8 @@ BROKER_STOCKS = {
 }
 
 
-def get_broker_monitor():
-    """监控头部券商实时行情 + 多日资金流 → 建仓/减仓判断"""
+def _build_broker_monitor(quotes, day_flow_map):
     now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    codes = list(BROKER_STOCKS.keys())
-
-    # 实时行情
-    quotes = get_quotes(codes)
     quote_map = {q['code']: q for q in quotes}
 
     results = []
@@ -1626,29 +2749,7 @@ def get_broker_monitor():
         pct = ((price - prev) / prev * 100) if prev else 0
 
         # 多日资金流 (近10天)
-        day_flows = []
-        try:
-            secid = f'1.{code}' if code.startswith('6') else f'0.{code}'
-            url = (
-                f'https://push2his.eastmoney.com/api/qt/stock/fflow/daykline/get?'
-                f'secid={secid}&fields1=f1,f2,f3&fields2=f51,f52,f53,f54,f55'
-                f'&lmt=10'
-            )
-            resp = _http_get(url)
-            if resp:
-                obj = json.loads(resp)
-                for line in (obj.get('data', {}) or {}).get('klines', []):
-                    parts = line.split(',')
-                    if len(parts) >= 5:
-                        day_flows.append({
-                            'date': parts[0],
-                            'main': float(parts[1]),
-                            'super': float(parts[2]),
-                            'large': float(parts[3]),
-                            'medium': float(parts[4]),
-                        })
-        except Exception as e:
-            logger.warning('broker flow for %s error: %s', code, e)
+        day_flows = day_flow_map.get(code, [])
 
         # 今日资金流
         today_main = day_flows[-1]['main'] if day_flows else 0
@@ -1744,6 +2845,23 @@ def get_broker_monitor():
     }
 
 
+def get_broker_monitor():
+    """监控头部券商实时行情 + 多日资金流 → 建仓/减仓判断"""
+    codes = list(BROKER_STOCKS.keys())
+    quotes = get_quotes(codes)
+    day_flow_map = fetch_flows_batch(codes, _fetch_broker_day_flows, 'broker')
+    return _build_broker_monitor(quotes, day_flow_map)
+
+
+async def get_broker_monitor_async():
+    codes = list(BROKER_STOCKS.keys())
+    quotes, day_flow_map = await asyncio.gather(
+        get_quotes_async(codes),
+        fetch_flows_batch_async(codes, _fetch_broker_day_flows_async, 'broker'),
+    )
+    return _build_broker_monitor(quotes, day_flow_map)
+
+
 if __name__ == '__main__':
     cmd = sys.argv[1] if len(sys.argv) > 1 else 'overview'
     args = sys.argv[2:]
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+原生 asyncio 上游客户端 — 基于 asyncio 流的 HTTP/1.1 GET
+在事件循环内直接抓取, 不占用线程池; 按数据源限制并发, 按 host 复用 keep-alive 连接
+响应对象与耗时统计复用 http_pool
+"""
+import asyncio
+import ssl
+import time
+import weakref
+from urllib.parse import urljoin, urlsplit
+
+from http_pool import (
+    MAX_REDIRECTS, IDLE_TIMEOUT, HttpResponse, HttpStatusError, decode_body,
+)
+
+# 每个数据源同时在途的请求上限 — 慢的东方财富接口不会挤占腾讯行情
+SOURCE_LIMITS = {
+    'tencent': 8,
+    'sina': 4,
+    'eastmoney': 16,
+    'default': 4,
+}
+
+_HOST_SOURCES = {
+    'qt.gtimg.cn': 'tencent',
+    'web.ifzq.gtimg.cn': 'tencent',
+    'hq.sinajs.cn': 'sina',
+}
+
+
+def source_of(url):
+    """根据 host 推断数据源"""
+    host = urlsplit(url).hostname or ''
+    if host in _HOST_SOURCES:
+        return _HOST_SOURCES[host]
+    if host.endswith('eastmoney.com'):
+        return 'eastmoney'
+    return 'default'
+
+
+class _Conn:
+    __slots__ = ('reader', 'writer', 'last_used')
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+
+    def close(self):
+        self.writer.close()
+
+
+class _StaleConnection(Exception):
+    """复用的连接已被对端关闭"""
+
+
+class AsyncHttpPool:
+    """单个事件循环内的连接池 (非线程安全, 只在所属 loop 中使用)"""
+
+    def __init__(self, limits=None, headers=None):
+        self.limits = {**SOURCE_LIMITS, **(limits or {})}
+        self.headers = dict(headers or {})
+        self._sems = {}
+        self._idle = {}   # (scheme, host, port) -> [_Conn]
+        self._stats = {}  # source -> counters
+
+    def _sem(self, source):
+        sem = self._sems.get(source)
+        if sem is None:
+            limit = self.limits.get(source, self.limits['default'])
+            sem = self._sems[source] = asyncio.Semaphore(limit)
+        return sem
+
+    def _counter(self, source):
+        st = self._stats.get(source)
+        if st is None:
+            st = self._stats[source] = {
+                'requests': 0, 'reused': 0, 'errors': 0, 'inflight': 0,
+                'queuedMs': 0.0, 'connectMs': 0.0, 'waitMs': 0.0, 'transferMs': 0.0,
+            }
+        return st
+
+    async def get(self, url, headers=None, timeout=10, source=None):
+        """GET 请求, 整体超时 timeout 秒; 非 2xx 抛 HttpStatusError"""
+        source = source or source_of(url)
+        st = self._counter(source)
+        t_queue = time.perf_counter()
+        async with self._sem(source):
+            st['queuedMs'] += (time.perf_counter() - t_queue) * 1000
+            st['inflight'] += 1
+            try:
+                resp = await asyncio.wait_for(self._get(url, headers), timeout)
+            except BaseException:
+                st['errors'] += 1
+                raise
+            finally:
+                st['inflight'] -= 1
+        st['requests'] += 1
+        st['reused'] += int(resp.reused)
+        st['connectMs'] += resp.connect_ms
+        st['waitMs'] += resp.wait_ms
+        st['transferMs'] += resp.transfer_ms
+        return resp
+
+    async def _get(self, url, headers):
+        for _ in range(MAX_REDIRECTS + 1):
+            resp = await self._request(url, headers)
+            location = resp.headers.get('location')
+            if resp.status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            if not 200 <= resp.status < 300:
+                raise HttpStatusError(url, resp.status)
+            return resp
+        raise HttpStatusError(url, resp.status, 'too many redirects')
+
+    async def _request(self, url, headers):
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'http'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        head = [f'GET {path} HTTP/1.1', f'Host: {parts.netloc}']
+        merged = {**self.headers, **(headers or {}),
+                  'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'}
+        head.extend(f'{k}: {v}' for k, v in merged.items())
+        payload = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1')
+
+        conn = self._pop_idle(key)
+        if conn is not None:
+            try:
+                return await self._exchange(key, conn, True, url, payload, 0.0)
+            except (_StaleConnection, ConnectionResetError, BrokenPipeError):
+                conn.close()
+        t0 = time.perf_counter()
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port,
+            ssl=ssl.create_default_context() if scheme == 'https' else None,
+        )
+        connect_ms = (time.perf_counter() - t0) * 1000
+        return await self._exchange(key, _Conn(reader, writer), False, url, payload, connect_ms)
+
+    def _pop_idle(self, key):
+        idle = self._idle.get(key)
+        now = time.monotonic()
+        while idle:
+            conn = idle.pop()
+            if now - conn.last_used < IDLE_TIMEOUT and not conn.reader.at_eof():
+                return conn
+            conn.close()
+        return None
+
+    async def _exchange(self, key, conn, reused, url, payload, connect_ms):
+        t1 = time.perf_counter()
+        try:
+            conn.writer.write(payload)
+            await conn.writer.drain()
+            status_line = await conn.reader.readline()
+            if not status_line:
+                raise _StaleConnection(url)
+            t2 = time.perf_counter()
+            version, status = _parse_status(status_line)
+            resp_headers = await _read_headers(conn.reader)
+            body, keep = await _read_body(conn.reader, status, resp_headers)
+            t3 = time.perf_counter()
+        except BaseException:
+            conn.close()
+            raise
+        conn_hdr = resp_headers.get('connection', '').lower()
+        if version == 'HTTP/1.0':
+            keep = keep and conn_hdr == 'keep-alive'
+        keep = keep and conn_hdr != 'close'
+        if keep:
+            conn.last_used = time.monotonic()
+            self._idle.setdefault(key, []).append(conn)
+        else:
+            conn.close()
+        body = decode_body(body, resp_headers.get('content-encoding'))
+        return HttpResponse(
+            url, status, resp_headers, body, reused,
+            connect_ms=connect_ms, wait_ms=(t2 - t1) * 1000,
+            transfer_ms=(t3 - t2) * 1000, total_ms=connect_ms + (t3 - t1) * 1000,
+        )
+
+    def stats(self):
+        out = {}
+        for source, st in self._stats.items():
+            n = st['requests'] or 1
+            out[source] = {
+                'limit': self.limits.get(source, self.limits['default']),
+                'inflight': st['inflight'],
+                'requests': st['requests'],
+                'reused': st['reused'],
+                'errors': st['errors'],
+                'avgQueuedMs': round(st['queuedMs'] / n, 2),
+                'avgConnectMs': round(st['connectMs'] / n, 2),
+                'avgWaitMs': round(st['waitMs'] / n, 2),
+                'avgTransferMs': round(st['transferMs'] / n, 2),
+            }
+        return out
+
+    def close(self):
+        for conns in self._idle.values():
+            for conn in conns:
+                conn.close()
+        self._idle.clear()
+
+
+def _parse_status(line):
+    parts = line.decode('latin-1').split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+        raise _StaleConnection(f'bad status line: {line!r}')
+    return parts[0], int(parts[1])
+
+
+async def _read_headers(reader):
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            return headers
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+
+async def _read_body(reader, status, headers):
+    """读取响应体, 返回 (body, 连接是否可复用)"""
+    if status in (204, 304) or 100 <= status < 200:
+        return b'', True
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b';', 1)[0].strip() or b'0', 16)
+            if size == 0:
+                # trailer 直到空行
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks), True
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+    length = headers.get('content-length')
+    if length is not None:
+        return await reader.readexactly(int(length)), True
+    return await reader.read(), False
+
+
+_pools = weakref.WeakKeyDictionary()
+
+
+def get_pool():
+    """当前事件循环的连接池"""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = AsyncHttpPool()
+    return pool
+
+
+async def get(url, headers=None, timeout=10, source=None):
+    """当前事件循环连接池 GET"""
+    return await get_pool().get(url, headers=headers, timeout=timeout, source=source)
+
+
+def pool_stats():
+    """各事件循环连接池按数据源的统计"""
+    merged = {}
+    for pool in list(_pools.values()):
+        merged.update(pool.stats())
+    return merged
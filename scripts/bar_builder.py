@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+分钟K线合成 — 由轮询到的行情快照聚合出 1 / 5 分钟 OHLCV
+成交量 / 成交额取累计值的增量; 按 A 股交易时段划分K线 (集合竞价并入首根, 午休与收盘后不出K线)
+K线以结束时刻标记: 09:31 表示 09:30:00-09:31:00, 5 分钟K线 09:35 表示 09:30-09:35
+"""
+import threading
+from collections import deque
+
+import numpy as np
+
+INTERVALS = (1, 5)        # 分钟
+GRACE_SECONDS = 60        # 11:30 / 15:00 之后该时长内的快照仍计入最后一根
+MAX_PENDING = 500_000     # 未被取走的已完成K线上限, 超出丢弃最旧的
+
+_OPEN_AUCTION = 9 * 3600 + 25 * 60
+_AM_OPEN, _AM_CLOSE = 9 * 3600 + 30 * 60, 11 * 3600 + 30 * 60
+_PM_OPEN, _PM_CLOSE = 13 * 3600, 15 * 3600
+_FIRST_BAR = 9 * 60 + 31  # 分钟 (自零点)
+
+# 已完成K线的列: code, interval, bar (yyyymmddHHMM), open, high, low, close, volume, amount
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'amount')
+
+
+def bar_minute(ts):
+    """快照时刻 → 所属 1 分钟K线的结束分钟 (自零点), 非交易时段为 None"""
+    sec = ts.hour * 3600 + ts.minute * 60 + ts.second
+    if _OPEN_AUCTION <= sec < _AM_OPEN:
+        return _FIRST_BAR
+    if _AM_OPEN <= sec < _AM_CLOSE or _PM_OPEN <= sec < _PM_CLOSE:
+        return sec // 60 + 1
+    if _AM_CLOSE <= sec < _AM_CLOSE + GRACE_SECONDS:
+        return _AM_CLOSE // 60
+    if _PM_CLOSE <= sec < _PM_CLOSE + GRACE_SECONDS:
+        return _PM_CLOSE // 60
+    return None
+
+
+def bar_id(day, minute, interval):
+    """K线编号 yyyymmddHHMM; 分钟向上取整到 interval (交易时段两端均为 5 的倍数)"""
+    end = -(-minute // interval) * interval
+    return day * 10000 + (end // 60) * 100 + end % 60
+
+
+def bar_time(bid):
+    """yyyymmddHHMM → 'YYYY-MM-DD HH:MM'"""
+    s = str(int(bid))
+    return f'{s[:4]}-{s[4:6]}-{s[6:8]} {s[8:10]}:{s[10:12]}'
+
+
+class _Bars:
+    """某一周期下每个代码的当前 (未完成) K线, 按槽位存放"""
+
+    def __init__(self, n):
+        self.id = np.zeros(n, dtype=np.int64)   # 0 表示无
+        self.values = np.zeros((len(BAR_FIELDS), n))
+
+    def grow(self, n):
+        pad = n - len(self.id)
+        self.id = np.concatenate([self.id, np.zeros(pad, dtype=np.int64)])
+        self.values = np.concatenate([self.values, np.zeros((len(BAR_FIELDS), pad))], axis=1)
+
+
+class BarBuilder:
+    """行情快照 → 分钟K线 (线程安全); 已完成的K线缓存在队列中, 由 drain() 取走持久化"""
+
+    def __init__(self, intervals=INTERVALS):
+        self.intervals = tuple(intervals)
+        self._lock = threading.Lock()
+        self._slots = {}                              # code → 槽位
+        self._codes = np.empty(0, dtype=object)
+        self._day = np.zeros(0, dtype=np.int64)       # 累计量基线所属交易日
+        self._base = np.zeros((2, 0))                 # 累计成交量 / 成交额基线
+        self._bars = {iv: _Bars(0) for iv in self.intervals}
+        self._pending = deque()                       # 已完成K线块 (codes, interval, ids, values)
+        self._pending_rows = 0
+        self.snapshots = 0
+        self.completed = 0
+        self.dropped = 0
+
+    def _slots_for(self, codes):
+        new = [c for c in dict.fromkeys(codes) if c not in self._slots]
+        if new:
+            start = len(self._codes)
+            for i, c in enumerate(new):
+                self._slots[c] = start + i
+            n = start + len(new)
+            self._codes = np.concatenate([self._codes, np.array(new, dtype=object)])
+            self._day = np.concatenate([self._day, np.zeros(len(new), dtype=np.int64)])
+            self._base = np.concatenate([self._base, np.zeros((2, len(new)))], axis=1)
+            for bars in self._bars.values():
+                bars.grow(n)
+        return np.fromiter((self._slots[c] for c in codes), dtype=np.int64, count=len(codes))
+
+    def ingest(self, codes, price, volume, amount, ts):
+        """一次快照: codes 与 price / 累计成交量 (股) / 累计成交额 (元) 数组对齐"""
+        day = ts.year * 10000 + ts.month * 100 + ts.day
+        minute = bar_minute(ts)
+        with self._lock:
+            self.snapshots += 1
+            self._flush(ts)
+            slots = self._slots_for(list(codes))
+            cum = np.stack([np.asarray(volume, dtype=np.float64), np.asarray(amount, dtype=np.float64)])
+            # 当日首个快照: 开盘前 (含集合竞价) 以 0 为基线, 盘中才启动则以当前累计量为基线
+            new_day = self._day[slots] != day
+            if new_day.any():
+                at_open = minute is not None and minute <= _FIRST_BAR
+                base = self._base[:, slots]
+                base[:, new_day] = 0.0 if at_open else cum[:, new_day]
+                self._base[:, slots] = base
+                self._day[slots[new_day]] = day
+            # 两个数据源交替时累计量可能小幅回退, 基线只增不减
+            delta = np.maximum(cum - self._base[:, slots], 0.0)
+            self._base[:, slots] = np.maximum(self._base[:, slots], cum)
+            if minute is None:
+                return
+            price = np.asarray(price, dtype=np.float64)
+            live = price > 0
+            slots, price, delta = slots[live], price[live], delta[:, live]
+            for iv, bars in self._bars.items():
+                bid = bar_id(day, minute, iv)
+                cur = bars.id[slots]
+                roll = cur < bid
+                done = roll & (cur != 0)
+                if done.any():
+                    self._emit(iv, slots[done], cur[done], bars.values[:, slots[done]])
+                vals = bars.values[:, slots]
+                o, h, l, c, v, a = vals
+                vals[:, roll] = [price[roll], price[roll], price[roll], price[roll], delta[0, roll], delta[1, roll]]
+                keep = ~roll
+                vals[1, keep] = np.maximum(h[keep], price[keep])
+                vals[2, keep] = np.minimum(l[keep], price[keep])
+                vals[3, keep] = price[keep]
+                vals[4, keep] = v[keep] + delta[0, keep]
+                vals[5, keep] = a[keep] + delta[1, keep]
+                bars.values[:, slots] = vals
+                bars.id[slots[roll]] = bid
+
+    def _flush(self, ts):
+        """结束时刻已过 GRACE_SECONDS 的当前K线 (午休 / 收盘 / 停止推送) 转为已完成"""
+        sec = ts.hour * 3600 + ts.minute * 60 + ts.second - GRACE_SECONDS
+        cutoff = (ts.year * 10000 + ts.month * 100 + ts.day) * 10000 + (sec // 3600) * 100 + sec % 3600 // 60
+        for iv, bars in self._bars.items():
+            done = np.flatnonzero((bars.id != 0) & (bars.id <= cutoff))
+            if len(done):
+                self._emit(iv, done, bars.id[done], bars.values[:, done])
+                bars.id[done] = 0
+
+    def _emit(self, interval, slots, ids, values):
+        self._pending.append((self._codes[slots], interval, ids.copy(), values.copy()))
+        self._pending_rows += len(slots)
+        self.completed += len(slots)
+        while self._pending_rows > MAX_PENDING:
+            dropped = self._pending.popleft()
+            self._pending_rows -= len(dropped[2])
+            self.dropped += len(dropped[2])
+
+    def flush(self, ts):
+        with self._lock:
+            self._flush(ts)
+
+    def drain(self):
+        """取走全部已完成K线: [(code, interval, 'YYYY-MM-DD HH:MM', open, high, low, close, volume, amount)]"""
+        with self._lock:
+            chunks, self._pending = self._pending, deque()
+            self._pending_rows = 0
+        rows = []
+        for codes, interval, ids, values in chunks:
+            times = [bar_time(b) for b in ids]
+            rows.extend(zip(codes.tolist(), [interval] * len(ids), times, *values.tolist()))
+        return rows
+
+    def pending_bars(self, code, interval):
+        """某代码已完成但尚未被取走的K线 (升序 dict 列表), 不修改待写队列"""
+        with self._lock:
+            chunks = list(self._pending)
+        bars = []
+        for codes, iv, ids, values in chunks:
+            if iv != interval:
+                continue
+            for k in np.flatnonzero(codes == code).tolist():
+                bars.append({'time': bar_time(ids[k]), **dict(zip(BAR_FIELDS, values[:, k].tolist()))})
+        return bars
+
+    def current(self, code, interval):
+        """未完成的当前K线 dict, 无则 None"""
+        with self._lock:
+            slot = self._slots.get(code)
+            bars = self._bars.get(interval)
+            if slot is None or bars is None or not bars.id[slot]:
+                return None
+            return {'time': bar_time(bars.id[slot]),
+                    **dict(zip(BAR_FIELDS, bars.values[:, slot].tolist()))}
+
+    def stats(self):
+        with self._lock:
+            return {'codes': len(self._slots), 'snapshots': self.snapshots,
+                    'completed': self.completed, 'pending': self._pending_rows,
+                    'dropped': self.dropped}
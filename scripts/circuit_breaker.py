@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+上游熔断器 — 按 host + 接口路径 (不含查询参数) 分别熔断
+closed: 正常放行, 连续失败 (含超慢请求) 达到阈值 → open
+open: 直接失败, 有上次成功的响应体时返回它; 冷却期过后 → half-open
+half-open: 只放行一个探测请求, 成功 → closed, 失败 → open
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+FAILURE_THRESHOLD = 5     # 连续失败次数
+OPEN_SECONDS = 30.0       # open 状态冷却时间
+SLOW_CALL_SECONDS = 5.0   # 成功但耗时超过该值也计为失败
+LAST_GOOD_MAX = 2048      # 保留上次成功响应的 URL 数
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(IOError):
+    """熔断器打开且无可用的旧响应"""
+
+    def __init__(self, key):
+        super().__init__(f'circuit open: {key}')
+        self.key = key
+
+
+class CircuitBreaker:
+    """单个上游接口的熔断状态 (线程安全)"""
+
+    def __init__(self, key):
+        self.key = key
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self.calls = 0
+        self.rejected = 0
+        self.stale_served = 0
+        self.trips = 0
+        self.last_error = None
+
+    def allow(self):
+        """本次调用是否放行上游"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= OPEN_SECONDS:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == CLOSED:
+                self.calls += 1
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                self.calls += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok, error=None):
+        with self._lock:
+            self._probing = False
+            if ok:
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            self.last_error = str(error) if error else None
+            if self.state == HALF_OPEN or self.failures >= FAILURE_THRESHOLD:
+                if self.state != OPEN:
+                    self.trips += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        with self._lock:
+            self._probing = False
+
+    def served_stale(self):
+        with self._lock:
+            self.stale_served += 1
+
+    def stats(self):
+        with self._lock:
+            retry_in = max(0.0, OPEN_SECONDS - (time.monotonic() - self.opened_at)) if self.state == OPEN else 0
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'calls': self.calls,
+                'rejected': self.rejected,
+                'staleServed': self.stale_served,
+                'trips': self.trips,
+                'retryInSec': round(retry_in, 1),
+                'lastError': self.last_error,
+            }
+
+
+class BreakerRegistry:
+    """按接口管理熔断器, 并保存每个 URL 上次成功的响应体"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._last_good = OrderedDict()
+
+    def breaker(self, url):
+        parts = urlsplit(url)
+        # 腾讯 /q=sh600519,... 与新浪 /list=... 把代码放在路径里, 截到 '=' 为止
+        key = f"{parts.hostname}{parts.path.split('=', 1)[0]}"
+        with self._lock:
+            br = self._breakers.get(key)
+            if br is None:
+                br = self._breakers[key] = CircuitBreaker(key)
+            return br
+
+    def _remember(self, url, body):
+        with self._lock:
+            self._last_good[url] = body
+            self._last_good.move_to_end(url)
+            while len(self._last_good) > LAST_GOOD_MAX:
+                self._last_good.popitem(last=False)
+
+    def _reject(self, br, url, stale):
+        if stale:
+            with self._lock:
+                body = self._last_good.get(url)
+            if body is not None:
+                br.served_stale()
+                return body
+        raise CircuitOpenError(br.key)
+
+    def _finish(self, br, url, body, elapsed, stale):
+        slow = elapsed >= SLOW_CALL_SECONDS
+        br.record(not slow, f'slow call {elapsed:.1f}s' if slow else None)
+        if stale:
+            self._remember(url, body)
+        return body
+
+    def call(self, url, fetch, stale=True):
+        """经熔断器调用 fetch() (返回响应体); 熔断时 stale=True 返回上次成功的响应体"""
+        br = self.breaker(url)
+        if not br.allow():
+            return self._reject(br, url, stale)
+        t0 = time.monotonic()
+        try:
+            body = fetch()
+        except Exception as e:
+            br.record(False, e)
+            raise
+        return self._finish(br, url, body, time.monotonic() - t0, stale)
+
+    async def acall(self, url, fetch, stale=True):
+        """call 的协程版, fetch 为无参协程函数"""
+        br = self.breaker(url)
+        if not br.allow():
+            return self._reject(br, url, stale)
+        t0 = time.monotonic()
+        try:
+            body = await fetch()
+        except asyncio.CancelledError:
+            br.release()  # 取消不代表上游故障, 只释放探测名额
+            raise
+        except Exception as e:
+            br.record(False, e)
+            raise
+        return self._finish(br, url, body, time.monotonic() - t0, stale)
+
+    def stats(self):
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {br.key: br.stats() for br in breakers}
+
+
+default_registry = BreakerRegistry()
+
+
+def call(url, fetch, stale=True):
+    return default_registry.call(url, fetch, stale)
+
+
+async def acall(url, fetch, stale=True):
+    return await default_registry.acall(url, fetch, stale)
+
+
+def stats():
+    """各上游接口熔断状态"""
+    return default_registry.stats()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+横截面多因子打分 — 整个股票池一次向量化计算
+每个因子: 原始值 → 分位数缩尾 → (可选) 行业内去均值 → 全池 z-score; 综合分为各因子 z 的加权和
+输出排名与每只股票各因子的贡献 (z × 权重), 供洞察卡片展示因子分解
+"""
+import warnings
+
+import numpy as np
+
+
+def _inverse(x):
+    """正值取倒数 (PE → 盈利收益率, PB → 账面市值比), 亏损 / 缺失为 NaN"""
+    with np.errstate(divide='ignore'):
+        return np.where(x > 0, 1.0 / x, np.nan)
+
+
+def _log_turnover(x):
+    return np.where(x > 0, np.log1p(np.maximum(x, 0.0)), np.nan)
+
+
+# 因子 → (所需的 feature_store 因子, 原始值变换); 变换后数值越大越好, 无效值为 NaN
+FACTORS = {
+    'momentum': ('momentum', np.asarray),    # 当日涨跌幅
+    'value': ('pe', _inverse),
+    'liquidity': ('turnover', _log_turnover),
+    'book': ('pb', _inverse),
+}
+FACTOR_LABELS = {'momentum': '动量', 'value': '估值', 'liquidity': '流动性', 'book': '市净率'}
+# 与旧版手工打分的满分分配 (30 / 30 / 25 / 15) 一致
+DEFAULT_WEIGHTS = {'momentum': 0.30, 'value': 0.30, 'liquidity': 0.25, 'book': 0.15}
+WINSOR_LIMITS = (0.025, 0.975)
+MIN_GROUP = 3        # 成员少于该数的行业并入 "其他" 后再去均值
+
+
+def feature_names(weights=None):
+    """打分所需的 feature_store 因子名 (与 raw_factors 的输入列顺序一致)"""
+    return [FACTORS[f][0] for f in (weights or DEFAULT_WEIGHTS)]
+
+
+def parse_weights(text):
+    """'momentum:0.3,value:0.3' → dict; 为空返回 None"""
+    if not text:
+        return None
+    weights = {}
+    for part in text.split(','):
+        name, _, value = part.partition(':')
+        name = name.strip()
+        if name not in FACTORS:
+            raise ValueError(f'未知因子: {name}')
+        weights[name] = float(value)
+    return weights
+
+
+def raw_factors(features, weights=None):
+    """feature_store 因子矩阵 [n, len(feature_names)] → 变换后的原始因子 [n, k]"""
+    names = list(weights or DEFAULT_WEIGHTS)
+    out = np.empty((len(features), len(names)))
+    for j, f in enumerate(names):
+        out[:, j] = FACTORS[f][1](features[:, j])
+    return out
+
+
+def winsorize(x, limits=WINSOR_LIMITS):
+    """按列把超出分位数区间的值截到边界, NaN 保持不变"""
+    if not len(x):
+        return x
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)   # 全 NaN 的列
+        lo, hi = np.nanquantile(x, limits, axis=0)
+    return np.clip(x, lo, hi)
+
+
+def group_ids(groups, min_group=MIN_GROUP):
+    """行业标签 → 整数组号; 小行业合并为一组"""
+    labels, inverse, counts = np.unique(np.asarray(groups, dtype=object), return_inverse=True, return_counts=True)
+    small = counts[inverse] < min_group
+    inverse = inverse.copy()
+    inverse[small] = len(labels)
+    return inverse
+
+
+def neutralize(x, ids):
+    """按列减去所在组的均值 (只统计非 NaN)"""
+    valid = ~np.isnan(x)
+    size = ids.max() + 1 if len(ids) else 0
+    out = x.copy()
+    for j in range(x.shape[1]):
+        v = valid[:, j]
+        total = np.bincount(ids[v], weights=x[v, j], minlength=size)
+        count = np.bincount(ids[v], minlength=size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[:, j] -= (total / count)[ids]
+    return out
+
+
+def zscore(x):
+    """按列全池标准化; NaN 与零方差列记为 0 (中性)"""
+    with warnings.catch_warnings(), np.errstate(all='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(x, axis=0)
+        std = np.nanstd(x, axis=0)
+        z = (x - mean) / np.where(std > 0, std, np.inf)
+    return np.nan_to_num(z, nan=0.0)
+
+
+class FactorScores:
+    """打分结果: order 为综合分降序 (同分保持输入顺序), contributions[i, j] 为第 i 只在因子 j 上的贡献"""
+    __slots__ = ('factors', 'weights', 'raw', 'z', 'contributions', 'score', 'order', 'percentile')
+
+    def __init__(self, factors, weights, raw, z):
+        self.factors = factors
+        self.weights = weights
+        self.raw = raw
+        self.z = z
+        self.contributions = z * weights
+        self.score = self.contributions.sum(axis=1)
+        self.order = np.argsort(-self.score, kind='stable')
+        n = len(self.score)
+        self.percentile = np.empty(n)
+        self.percentile[self.order] = 1.0 - np.arange(n) / max(n - 1, 1)   # 第一名为 1, 最后一名为 0
+
+    def __len__(self):
+        return len(self.score)
+
+    def top(self, k):
+        return self.order[:k]
+
+    def breakdown(self, i):
+        """第 i 只股票的因子分解 [(因子, z, 贡献)], 按贡献绝对值降序"""
+        rows = [(f, float(self.z[i, j]), float(self.contributions[i, j])) for j, f in enumerate(self.factors)]
+        return sorted(rows, key=lambda r: -abs(r[2]))
+
+
+def score(features, weights=None, groups=None, limits=WINSOR_LIMITS, min_group=MIN_GROUP):
+    """feature_store 因子矩阵 (列为 feature_names(weights)) → FactorScores
+
+    groups 为每只股票的行业标签, 给出时做行业中性化 (因子值减去行业均值后再全池标准化)。
+    """
+    weights = dict(weights or DEFAULT_WEIGHTS)
+    factors = list(weights)
+    raw = raw_factors(np.asarray(features, dtype=np.float64), weights)
+    x = winsorize(raw, limits)
+    if groups is not None and len(x):
+        x = neutralize(x, group_ids(groups, min_group))
+    w = np.array([weights[f] for f in factors], dtype=np.float64)
+    total = np.abs(w).sum()
+    return FactorScores(factors, w / total if total > 0 else w, raw, zscore(x))
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+因子特征库 — 命名因子按 (代码, 盘中时段) / (代码, 交易日) 只算一次, 以列式 float64 数组缓存
+行情类因子 (动量 / 估值 / 换手 / 振幅) 取自行情快照: 新快照只重算输入有变化的行
+日K类因子 (均线位置 / 波动率 / 支撑阻力距离) 取自流式指标: 按指标状态戳失效
+策略按名称取因子矩阵 matrix(names, codes), 不再各自从原始行情 / K线推导
+"""
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from indicator_stream import MA_WINDOWS
+from quote_frame import COL
+
+# ── 因子定义 ──
+QUOTE_FACTORS = (
+    'momentum',         # 当日涨跌幅 (%)
+    'pe', 'pb',
+    'turnover',         # 换手率 (%)
+    'amount_yi',        # 成交额 (亿)
+    'amplitude',        # 振幅 (%), 无前收时按 |涨跌幅| × 1.2 估计
+    'pe_bucket',        # 0=无效 (≤0), 1=(0, 20), 2=[20, 40), 3=≥40
+    'pb_bucket',        # 0=无效 (≤0), 1=(0, 1.5), 2=[1.5, 3), 3=≥3
+    'turnover_bucket',  # 0=≤1, 1=(1, 3], 2=>3
+)
+DAILY_INPUTS = ('close',) + tuple(f'ma{w}' for w in MA_WINDOWS) + ('volatility', 'support', 'resistance', 'bars')
+DAILY_FACTORS = (
+    ('close', 'volatility', 'bars')
+    + tuple(f'ma{w}' for w in MA_WINDOWS)
+    + tuple(f'ma_pos{w}' for w in MA_WINDOWS)    # 收盘相对均线的偏离 (close / ma - 1)
+    + ('support_gap', 'resistance_gap')          # 收盘相对 20 日支撑 / 阻力的距离 (比例)
+)
+_QUOTE_COL = {f: i for i, f in enumerate(QUOTE_FACTORS)}
+_DAILY_COL = {f: i for i, f in enumerate(DAILY_FACTORS)}
+FACTORS = QUOTE_FACTORS + DAILY_FACTORS
+DEFAULT_BUCKET_MINUTES = 5
+
+
+def needs_quotes(names):
+    return any(n in _QUOTE_COL for n in names)
+
+
+def needs_daily(names):
+    return any(n in _DAILY_COL for n in names)
+
+
+def _check(names):
+    unknown = [n for n in names if n not in _QUOTE_COL and n not in _DAILY_COL]
+    if unknown:
+        raise KeyError(f'未知因子: {", ".join(unknown)}')
+
+
+def _ratio(a, b):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(b > 0, a / b - 1, np.nan)
+
+
+def quote_factors(values):
+    """QuoteFrame.values 的若干列 [len(FIELDS), m] → [m, len(QUOTE_FACTORS)]"""
+    chg = values[COL['changePercent']]
+    pe, pb, turnover = values[COL['pe']], values[COL['pb']], values[COL['turnover']]
+    amount = values[COL['amount']]
+    high, low, prev = values[COL['high']], values[COL['low']], values[COL['prevClose']]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        amplitude = np.where((prev > 0) & (high > 0) & (low > 0), (high - low) / prev * 100, np.abs(chg) * 1.2)
+    out = np.empty((values.shape[1], len(QUOTE_FACTORS)))
+    out[:, _QUOTE_COL['momentum']] = chg
+    out[:, _QUOTE_COL['pe']] = pe
+    out[:, _QUOTE_COL['pb']] = pb
+    out[:, _QUOTE_COL['turnover']] = turnover
+    out[:, _QUOTE_COL['amount_yi']] = np.where(amount > 0, amount / 1e4, 0.0)
+    out[:, _QUOTE_COL['amplitude']] = amplitude
+    out[:, _QUOTE_COL['pe_bucket']] = np.where(pe > 0, np.digitize(pe, (20, 40)) + 1, 0)
+    out[:, _QUOTE_COL['pb_bucket']] = np.where(pb > 0, np.digitize(pb, (1.5, 3)) + 1, 0)
+    out[:, _QUOTE_COL['turnover_bucket']] = np.digitize(turnover, (1, 3), right=True)
+    return out
+
+
+def daily_inputs(rows):
+    """流式指标 dict 列表 → [m, len(DAILY_INPUTS)], None 为 NaN"""
+    out = np.array([[row.get(k) for k in DAILY_INPUTS] for row in rows], dtype=np.float64)
+    return out.reshape(-1, len(DAILY_INPUTS))
+
+
+def daily_factors(inputs):
+    """[m, len(DAILY_INPUTS)] → [m, len(DAILY_FACTORS)]"""
+    x = {k: inputs[:, i] for i, k in enumerate(DAILY_INPUTS)}
+    close = x['close']
+    out = np.empty((inputs.shape[0], len(DAILY_FACTORS)))
+    for k in ('close', 'volatility', 'bars') + tuple(f'ma{w}' for w in MA_WINDOWS):
+        out[:, _DAILY_COL[k]] = x[k]
+    for w in MA_WINDOWS:
+        out[:, _DAILY_COL[f'ma_pos{w}']] = _ratio(close, x[f'ma{w}'])
+    out[:, _DAILY_COL['support_gap']] = _ratio(close, x['support'])
+    out[:, _DAILY_COL['resistance_gap']] = -_ratio(close, x['resistance'])
+    return out
+
+
+def build_matrix(names, codes, frame=None, indicators=None):
+    """不经缓存直接计算因子矩阵 [len(codes), len(names)] (回测等一次性场景); 缺失为 NaN"""
+    _check(names)
+    out = np.full((len(codes), len(names)), np.nan)
+    if frame is not None and len(frame) and needs_quotes(names):
+        rows = [frame.index_of(c) for c in codes]
+        hit = np.array([r is not None for r in rows], dtype=bool)
+        if hit.any():
+            q = quote_factors(frame.values[:, [r for r in rows if r is not None]])
+            for j, n in enumerate(names):
+                if n in _QUOTE_COL:
+                    out[hit, j] = q[:, _QUOTE_COL[n]]
+    if indicators and needs_daily(names):
+        hit = np.array([indicators.get(c) is not None for c in codes], dtype=bool)
+        if hit.any():
+            d = daily_factors(daily_inputs([indicators[c] for c in codes if indicators.get(c) is not None]))
+            for j, n in enumerate(names):
+                if n in _DAILY_COL:
+                    out[hit, j] = d[:, _DAILY_COL[n]]
+    return out
+
+
+class _Table:
+    """一个时段 (key) 内按代码分行的因子表; 行按需扩容
+
+    inputs 为各行上次计算时的输入 (行情类), stamps 为各行的指标状态戳 (日K类), 用于判断是否需要重算。
+    """
+
+    def __init__(self, width, key=None, input_width=0):
+        self.key = key
+        self.rows = {}
+        self.values = np.full((64, width), np.nan)
+        self.inputs = np.full((64, input_width), np.nan)
+        self.stamps = []
+
+    def row_ids(self, codes):
+        ids = np.empty(len(codes), dtype=np.int64)
+        for i, code in enumerate(codes):
+            r = self.rows.get(code)
+            if r is None:
+                r = self.rows[code] = len(self.stamps)
+                self.stamps.append(None)
+            ids[i] = r
+        if len(self.stamps) > len(self.values):
+            size = max(len(self.stamps), 2 * len(self.values))
+            self.values = self._grow(self.values, size)
+            self.inputs = self._grow(self.inputs, size)
+        return ids
+
+    @staticmethod
+    def _grow(x, size):
+        grown = np.full((size, x.shape[1]), np.nan)
+        grown[:len(x)] = x
+        return grown
+
+    def lookup(self, codes):
+        """代码 → 行号, 不在表中为 -1"""
+        return np.array([self.rows.get(c, -1) for c in codes], dtype=np.int64)
+
+
+class FeatureStore:
+    """命名因子缓存 (线程安全)
+
+    行情类因子按 (代码, bucket_minutes 分钟时段) 缓存, 跨时段整表失效; 同一时段内新快照只重算价量有变化的行。
+    日K类因子按 (代码, 交易日) 缓存, 指标状态戳 (流式指标更新次数) 变化时重算该行。
+    """
+
+    def __init__(self, bucket_minutes=DEFAULT_BUCKET_MINUTES):
+        self.bucket_minutes = bucket_minutes
+        self._lock = threading.Lock()
+        self._quote = _Table(len(QUOTE_FACTORS), input_width=len(COL))
+        self._daily = _Table(len(DAILY_FACTORS))
+        self._frame = None
+        self.computed = {'quote': 0, 'daily': 0}
+        self.reused = {'quote': 0, 'daily': 0}
+
+    def bucket(self, now=None):
+        now = now or datetime.now()
+        return int(now.strftime('%Y%m%d')) * 10000 + (now.hour * 60 + now.minute) // self.bucket_minutes
+
+    def on_frame(self, frame, now=None):
+        """并入一份行情快照; 同一对象重复传入时直接返回"""
+        key = self.bucket(now)
+        with self._lock:
+            if frame is self._frame and self._quote.key == key:
+                return
+            self._frame = frame
+            if self._quote.key != key:
+                self._quote = _Table(len(QUOTE_FACTORS), key, input_width=len(COL))
+            table = self._quote
+            if not len(frame):
+                return
+            ids = table.row_ids(frame.codes.tolist())
+            inputs = frame.values.T
+            changed = np.flatnonzero((table.inputs[ids] != inputs).any(axis=1))
+            if len(changed):
+                table.values[ids[changed]] = quote_factors(frame.values[:, changed])
+                table.inputs[ids[changed]] = inputs[changed]
+            self.computed['quote'] += len(changed)
+            self.reused['quote'] += len(ids) - len(changed)
+
+    def refresh_daily(self, codes, day, stamp, values):
+        """日K类因子: stamp(code) 为指标状态戳 (None=未跟踪), 变化时才调用 values(code) 重算"""
+        with self._lock:
+            if self._daily.key != day:
+                self._daily = _Table(len(DAILY_FACTORS), day)
+            table = self._daily
+            stamps = [stamp(c) for c in codes]
+            tracked = [(c, s) for c, s in zip(codes, stamps) if s is not None]
+            ids = table.row_ids([c for c, _ in tracked])
+            stale = [(r, c, s) for r, (c, s) in zip(ids.tolist(), tracked) if table.stamps[r] != s]
+            rows = [values(c) for _, c, _ in stale]
+            ok = [(r, s, row) for (r, _, s), row in zip(stale, rows) if row is not None]
+            if ok:
+                table.values[[r for r, _, _ in ok]] = daily_factors(daily_inputs([row for _, _, row in ok]))
+                for r, s, _ in ok:
+                    table.stamps[r] = s
+            self.computed['daily'] += len(ok)
+            self.reused['daily'] += len(tracked) - len(stale)
+
+    def matrix(self, names, codes):
+        """因子矩阵 [len(codes), len(names)]; 不在缓存中的为 NaN"""
+        _check(names)
+        out = np.full((len(codes), len(names)), np.nan)
+        with self._lock:
+            for table, cols in ((self._quote, _QUOTE_COL), (self._daily, _DAILY_COL)):
+                picked = [(j, cols[n]) for j, n in enumerate(names) if n in cols]
+                if not picked:
+                    continue
+                rows = table.lookup(codes)
+                hit = rows >= 0
+                out[np.ix_(hit, [j for j, _ in picked])] = table.values[np.ix_(rows[hit], [k for _, k in picked])]
+        return out
+
+    def stats(self):
+        with self._lock:
+            return {
+                'quoteBucket': self._quote.key, 'quoteRows': len(self._quote.rows),
+                'day': self._daily.key, 'dailyRows': len(self._daily.rows),
+                'computed': dict(self.computed), 'reused': dict(self.reused),
+            }
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+个股日级资金流本地存储 — SQLite, 按 (code, date) 存储
+只抓缺失的日期; 交易时段内只刷新当日一根, 其余从磁盘读取
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+from trading_calendar import in_session, is_settled, weekdays_between
+
+INTRADAY_REFRESH = 60.0   # 交易时段内当日资金流的刷新间隔 (秒)
+
+_FIELDS = ('mainInflow', 'superLargeInflow', 'largeInflow', 'mediumInflow', 'smallInflow')
+
+
+class FlowStore:
+    """日级资金流存储 (线程安全)"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS flow_daily (
+                code TEXT NOT NULL,
+                date TEXT NOT NULL,
+                main REAL, super_large REAL, large REAL, medium REAL, small REAL,
+                PRIMARY KEY (code, date)
+            );
+            CREATE TABLE IF NOT EXISTS flow_sync (
+                code TEXT PRIMARY KEY,
+                depth INTEGER NOT NULL,      -- 曾回补的最大天数
+                synced_at REAL NOT NULL,     -- 上次抓取时间戳
+                synced_day TEXT NOT NULL,    -- 上次抓取日期
+                settled INTEGER NOT NULL     -- 上次抓取时当日数据是否已定稿
+            );
+        """)
+        self.fetches = 0
+        self.disk_hits = 0
+
+    def plan(self, code, days, now=None):
+        """需要从上游抓取的最近 K 根数, 0 表示直接读盘"""
+        now = now or datetime.now()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT depth, synced_at, synced_day, settled FROM flow_sync WHERE code=?',
+                (code,)).fetchone()
+        if row is None or row[0] < days:
+            return days
+        depth, synced_at, synced_day, settled = row
+        today = now.date()
+        if synced_day != today.isoformat():
+            # 补齐缺失交易日, 并重取上次同步日 (当时可能未收盘)
+            gap = weekdays_between(date.fromisoformat(synced_day), today)
+            if gap == 0 and settled:
+                return 0
+            return min(days, gap + 1)
+        if in_session(now):
+            return 1 if time.time() - synced_at >= INTRADAY_REFRESH else 0
+        if not settled and is_settled(now):
+            return 1
+        return 0
+
+    def upsert(self, code, flows, lmt, now=None):
+        """写入抓取结果 (_parse_flow_history 格式) 并更新同步状态"""
+        now = now or datetime.now()
+        rows = [(code, f['date'], *(f[k] for k in _FIELDS)) for f in flows]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO flow_daily VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            self._conn.execute(
+                """INSERT INTO flow_sync VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(code) DO UPDATE SET
+                     depth=MAX(depth, excluded.depth), synced_at=excluded.synced_at,
+                     synced_day=excluded.synced_day, settled=excluded.settled""",
+                (code, lmt, time.time(), now.date().isoformat(), int(is_settled(now))))
+            self.fetches += 1
+
+    def read(self, code, days):
+        """最近 days 根, 按日期升序"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT date, main, super_large, large, medium, small FROM flow_daily '
+                'WHERE code=? ORDER BY date DESC LIMIT ?', (code, days)).fetchall()
+            self.disk_hits += 1
+        return [dict(zip(('date',) + _FIELDS, r)) for r in reversed(rows)]
+
+    def has(self, code):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT 1 FROM flow_sync WHERE code=?', (code,)).fetchone() is not None
+
+    def stats(self):
+        with self._lock:
+            codes, bars = self._conn.execute(
+                'SELECT COUNT(DISTINCT code), COUNT(*) FROM flow_daily').fetchone()
+        return {'path': self.path, 'codes': codes, 'bars': bars,
+                'fetches': self.fetches, 'reads': self.disk_hits}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+上游 HTTP 连接池 — 按 host 复用 keep-alive 连接
+腾讯 / 新浪 / 东方财富所有抓取都经由这里: 每 host 限制连接数, 支持 gzip,
+每次响应记录建连 / 等待首字节 / 传输耗时
+"""
+import gzip
+import http.client
+import threading
+import time
+import zlib
+from urllib.parse import urljoin, urlsplit
+
+MAX_CONN_PER_HOST = 8     # 每 host 最大并发连接
+IDLE_TIMEOUT = 30.0       # 空闲连接超过该秒数不再复用
+MAX_REDIRECTS = 3
+
+# 复用的连接可能已被服务端关闭, 遇到这些异常换新连接重试一次
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class HttpStatusError(IOError):
+    """非 2xx 响应"""
+
+    def __init__(self, url, status, reason=''):
+        super().__init__(f'HTTP {status} {reason}: {url}')
+        self.url = url
+        self.status = status
+
+
+class HttpResponse:
+    """一次请求的结果 + 耗时分解 (毫秒)"""
+    __slots__ = ('url', 'status', 'headers', 'body', 'reused',
+                 'connect_ms', 'wait_ms', 'transfer_ms', 'total_ms')
+
+    def __init__(self, url, status, headers, body, reused,
+                 connect_ms, wait_ms, transfer_ms, total_ms):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.reused = reused
+        self.connect_ms = connect_ms
+        self.wait_ms = wait_ms
+        self.transfer_ms = transfer_ms
+        self.total_ms = total_ms
+
+    def text(self, encoding='utf-8'):
+        return self.body.decode(encoding, errors='replace')
+
+    def timing(self):
+        return {
+            'reused': self.reused,
+            'connectMs': round(self.connect_ms, 2),
+            'waitMs': round(self.wait_ms, 2),
+            'transferMs': round(self.transfer_ms, 2),
+            'totalMs': round(self.total_ms, 2),
+        }
+
+
+def decode_body(body, encoding):
+    """按 Content-Encoding 解压"""
+    encoding = (encoding or '').lower()
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    if encoding == 'deflate':
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+class _HostPool:
+    """单个 (scheme, host, port) 的空闲连接栈 + 并发上限"""
+
+    def __init__(self, scheme, host, port, max_conn):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self._slots = threading.BoundedSemaphore(max_conn)
+        self._lock = threading.Lock()
+        self._idle = []  # [(conn, last_used)]
+        self.requests = 0
+        self.reused = 0
+        self.connects = 0
+        self.errors = 0
+        self.bytes = 0
+        self.connect_ms = 0.0
+        self.wait_ms = 0.0
+        self.transfer_ms = 0.0
+        self.last = None
+
+    def acquire(self, timeout):
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f'{self.host}: 等待连接池超时')
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                conn, last_used = self._idle.pop()
+                if now - last_used < IDLE_TIMEOUT:
+                    return conn, True
+                conn.close()
+        return self._new_conn(timeout), False
+
+    def release(self, conn, reusable):
+        if reusable:
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        else:
+            conn.close()
+        self._slots.release()
+
+    def _new_conn(self, timeout):
+        cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=timeout)
+
+    def record(self, resp):
+        with self._lock:
+            self.requests += 1
+            self.reused += int(resp.reused)
+            self.connects += int(not resp.reused)
+            self.bytes += len(resp.body)
+            self.connect_ms += resp.connect_ms
+            self.wait_ms += resp.wait_ms
+            self.transfer_ms += resp.transfer_ms
+            self.last = resp.timing()
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def stats(self):
+        with self._lock:
+            n = self.requests or 1
+            return {
+                'requests': self.requests,
+                'reused': self.reused,
+                'connects': self.connects,
+                'errors': self.errors,
+                'idle': len(self._idle),
+                'bytes': self.bytes,
+                'avgConnectMs': round(self.connect_ms / (self.connects or 1), 2),
+                'avgWaitMs': round(self.wait_ms / n, 2),
+                'avgTransferMs': round(self.transfer_ms / n, 2),
+                'last': self.last,
+            }
+
+    def close(self):
+        with self._lock:
+            for conn, _ in self._idle:
+                conn.close()
+            self._idle.clear()
+
+
+class HttpPool:
+    """按 host 管理 keep-alive 连接的同步 HTTP 客户端 (线程安全)"""
+
+    def __init__(self, max_per_host=MAX_CONN_PER_HOST, headers=None):
+        self.max_per_host = max_per_host
+        self.headers = dict(headers or {})
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host_pool(self, scheme, host, port):
+        key = (scheme, host, port)
+        with self._lock:
+            pool = self._hosts.get(key)
+            if pool is None:
+                pool = self._hosts[key] = _HostPool(scheme, host, port, self.max_per_host)
+            return pool
+
+    def get(self, url, headers=None, timeout=10):
+        """GET 请求, 返回 HttpResponse; 非 2xx 抛 HttpStatusError"""
+        for _ in range(MAX_REDIRECTS + 1):
+            resp = self._request(url, headers, timeout)
+            location = resp.headers.get('location')
+            if resp.status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            if not 200 <= resp.status < 300:
+                raise HttpStatusError(url, resp.status)
+            return resp
+        raise HttpStatusError(url, resp.status, 'too many redirects')
+
+    def _request(self, url, headers, timeout):
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'http'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        pool = self._host_pool(scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        req_headers = {**self.headers, **(headers or {}),
+                       'Accept-Encoding': 'gzip, deflate',
+                       'Connection': 'keep-alive'}
+
+        conn, reused = pool.acquire(timeout)
+        try:
+            try:
+                return self._send(pool, conn, reused, url, path, req_headers, timeout)
+            except _STALE_ERRORS:
+                if not reused:
+                    raise
+                conn.close()
+                conn, reused = pool._new_conn(timeout), False
+                return self._send(pool, conn, reused, url, path, req_headers, timeout)
+        except BaseException:
+            pool.record_error()
+            pool.release(conn, False)
+            raise
+
+    def _send(self, pool, conn, reused, url, path, headers, timeout):
+        t0 = time.perf_counter()
+        conn.timeout = timeout
+        if conn.sock is None:
+            conn.connect()
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+        else:
+            conn.sock.settimeout(timeout)
+        t1 = time.perf_counter()
+        conn.request('GET', path, headers=headers)
+        raw = conn.getresponse()
+        t2 = time.perf_counter()
+        body = raw.read()
+        t3 = time.perf_counter()
+        resp_headers = {k.lower(): v for k, v in raw.getheaders()}
+        body = decode_body(body, resp_headers.get('content-encoding'))
+        resp = HttpResponse(
+            url, raw.status, resp_headers, body, reused,
+            connect_ms=(t1 - t0) * 1000, wait_ms=(t2 - t1) * 1000,
+            transfer_ms=(t3 - t2) * 1000, total_ms=(t3 - t0) * 1000,
+        )
+        pool.record(resp)
+        pool.release(conn, not raw.will_close)
+        return resp
+
+    def stats(self):
+        with self._lock:
+            pools = list(self._hosts.values())
+        return {f'{p.scheme}://{p.host}': p.stats() for p in pools}
+
+    def close(self):
+        with self._lock:
+            pools = list(self._hosts.values())
+        for p in pools:
+            p.close()
+
+
+default_pool = HttpPool()
+
+
+def get(url, headers=None, timeout=10):
+    """默认连接池 GET"""
+    return default_pool.get(url, headers=headers, timeout=timeout)
+
+
+def pool_stats():
+    """各 host 连接复用与耗时统计"""
+    return default_pool.stats()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+流式指标状态 — 每只股票保存滚动窗口状态, 新行情 / 新K线到达时 O(1) 更新
+均线用滑动和, 波动率用可删除的 Welford 方差, 支撑 / 阻力用单调队列维护窗口极值
+最后一根K线视为"当前K线": 同日行情覆盖它, 日期更新时先把它并入已定稿窗口
+"""
+import math
+import threading
+from collections import deque
+
+MA_WINDOWS = (5, 10, 20, 60)
+VOL_WINDOW = 24         # 对数收益个数 (25 根K线, 与红利低波口径一致)
+VOL_MIN_RETURNS = 4     # 少于该收益数时波动率为 None (即少于 5 个有效价格)
+EXTREMUM_WINDOW = 20    # 支撑 / 阻力窗口
+TRADING_DAYS = 252
+SEED_BARS = 120         # 每日首次使用时从日K存储回放的根数
+
+
+class _SumWindow:
+    """定长滑动和"""
+    __slots__ = ('size', 'values', 'total')
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+
+    def push(self, x):
+        self.values.append(x)
+        self.total += x
+        if len(self.values) > self.size:
+            self.total -= self.values.popleft()
+
+
+class _MomentsWindow:
+    """定长滑动 Welford 均值 / 二阶矩; None 表示缺失的样本 (占位但不计入)"""
+    __slots__ = ('size', 'values', 'n', 'mean', 'm2')
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x):
+        self.values.append(x)
+        if x is not None:
+            self.n += 1
+            d = x - self.mean
+            self.mean += d / self.n
+            self.m2 += d * (x - self.mean)
+        if len(self.values) > self.size:
+            self._remove(self.values.popleft())
+
+    def _remove(self, x):
+        if x is None:
+            return
+        self.n -= 1
+        if self.n == 0:
+            self.mean = self.m2 = 0.0
+            return
+        d = x - self.mean
+        self.mean -= d / self.n
+        self.m2 = max(0.0, self.m2 - d * (x - self.mean))
+
+    def variance_with(self, x):
+        """加入一个临时样本 x (可为 None) 后的 (样本数, 总体方差), 不修改状态"""
+        if x is None:
+            return self.n, (self.m2 / self.n if self.n else 0.0)
+        n = self.n + 1
+        d = x - self.mean
+        mean = self.mean + d / n
+        return n, (self.m2 + d * (x - mean)) / n
+
+
+class _ExtremumWindow:
+    """定长窗口最大值 (sign=-1 时为最小值), 单调队列, 均摊 O(1)"""
+    __slots__ = ('size', 'sign', 'queue', 'seq')
+
+    def __init__(self, size, sign=1):
+        self.size = size
+        self.sign = sign
+        self.queue = deque()   # (序号, sign * 值), 值单调递减
+        self.seq = 0
+
+    def push(self, x):
+        v = self.sign * x
+        while self.queue and self.queue[-1][1] <= v:
+            self.queue.pop()
+        self.queue.append((self.seq, v))
+        self.seq += 1
+        while self.queue[0][0] <= self.seq - 1 - self.size:
+            self.queue.popleft()
+
+    def peek(self):
+        return self.sign * self.queue[0][1] if self.queue else None
+
+
+def _log_return(prev, cur):
+    return math.log(cur / prev) if prev and prev > 0 and cur > 0 else None
+
+
+class RollingState:
+    """单只股票的滚动指标状态; 已定稿窗口比指标窗口少一格, 留给当前K线"""
+
+    def __init__(self, day):
+        self.day = day   # 回放K线的日期 (yyyymmdd), 跨日后需重新回放
+        self.ma = {w: _SumWindow(w - 1) for w in MA_WINDOWS}
+        self.returns = _MomentsWindow(VOL_WINDOW - 1)
+        self.highs = _ExtremumWindow(EXTREMUM_WINDOW - 1)
+        self.lows = _ExtremumWindow(EXTREMUM_WINDOW - 1, sign=-1)
+        self.settled = 0
+        self.last_close = None   # 最后一根已定稿K线的收盘价
+        self.bar = None          # 当前K线 (date, open, high, low, close, volume)
+        self.updates = 0
+
+    def _settle(self):
+        _, _, high, low, close, _ = self.bar
+        for win in self.ma.values():
+            win.push(close)
+        if self.settled:
+            self.returns.push(_log_return(self.last_close, close))
+        self.highs.push(high)
+        self.lows.push(low)
+        self.last_close = close
+        self.settled += 1
+
+    def update(self, date, open_, high, low, close, volume=0):
+        """同日覆盖当前K线, 新日期先定稿当前K线; 早于当前K线的数据忽略"""
+        if self.bar is not None:
+            if date < self.bar[0]:
+                return False
+            if date > self.bar[0]:
+                self._settle()
+        self.bar = (date, open_, high, low, close, volume)
+        self.updates += 1
+        return True
+
+    def __len__(self):
+        return self.settled + (self.bar is not None)
+
+    def ma_value(self, window):
+        if self.bar is None or len(self) < window:
+            return None
+        return (self.ma[window].total + self.bar[4]) / window
+
+    def volatility(self):
+        """最近 VOL_WINDOW 个对数收益的年化波动率"""
+        if self.bar is None:
+            return None
+        r = _log_return(self.last_close, self.bar[4]) if self.settled else None
+        n, var = self.returns.variance_with(r)
+        if n < VOL_MIN_RETURNS:
+            return None
+        return math.sqrt(var) * math.sqrt(TRADING_DAYS)
+
+    def support(self):
+        if self.bar is None or len(self) < EXTREMUM_WINDOW:
+            return None
+        low = self.lows.peek()
+        return self.bar[3] if low is None else min(low, self.bar[3])
+
+    def resistance(self):
+        if self.bar is None or len(self) < EXTREMUM_WINDOW:
+            return None
+        high = self.highs.peek()
+        return self.bar[2] if high is None else max(high, self.bar[2])
+
+    def values(self):
+        """当前指标值; 样本不足的为 None"""
+        values = {f'ma{w}': self.ma_value(w) for w in MA_WINDOWS}
+        values.update({
+            'close': self.bar[4] if self.bar else None,
+            'date': self.bar[0] if self.bar else None,
+            'bars': len(self),
+            'volatility': self.volatility(),
+            'support': self.support(),
+            'resistance': self.resistance(),
+        })
+        return values
+
+
+class IndicatorStream:
+    """按代码维护 RollingState (线程安全); 行情快照到达时只更新已跟踪的代码"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = {}
+        self.seeds = 0
+        self.ticks = 0
+
+    def seed(self, code, bars, day):
+        """用日K (KlineBars) 回放出当日状态"""
+        state = RollingState(day)
+        for date, o, c, h, l, v in zip(*bars.data.tolist()):
+            state.update(int(date), o, h, l, c, v)
+        with self._lock:
+            self._states[code] = state
+            self.seeds += 1
+        return state
+
+    def get(self, code, day):
+        """当日已回放的状态, 否则 None"""
+        with self._lock:
+            state = self._states.get(code)
+        return state if state is not None and state.day == day else None
+
+    def stamp(self, code, day):
+        """当日状态的版本戳 (更新次数), 未回放时为 None; 戳不变则 values() 不变"""
+        with self._lock:
+            state = self._states.get(code)
+            return state.updates if state is not None and state.day == day else None
+
+    def values(self, code):
+        """当前指标值 (RollingState.values), 未跟踪时为 None"""
+        with self._lock:
+            state = self._states.get(code)
+            return state.values() if state is not None else None
+
+    def tick(self, code, day, open_, high, low, price, volume):
+        with self._lock:
+            state = self._states.get(code)
+            if state is None or state.day != day or price <= 0 or volume <= 0:
+                return False
+            self.ticks += 1
+            return state.update(day, open_, high, low, price, volume)
+
+    def on_frame(self, frame, day):
+        """行情快照 (QuoteFrame) → 已跟踪代码的当日K线; 停牌 (成交量为 0) 的跳过"""
+        with self._lock:
+            tracked = [(code, state) for code, state in self._states.items() if state.day == day]
+            for code, state in tracked:
+                i = frame.index_of(code)
+                if i is None:
+                    continue
+                price, volume = frame.price[i], frame.volume[i]
+                if price <= 0 or volume <= 0:
+                    continue
+                state.update(day, float(frame.open[i]), float(frame.high[i]), float(frame.low[i]),
+                             float(price), float(volume))
+                self.ticks += 1
+
+    def stats(self):
+        with self._lock:
+            return {'codes': len(self._states), 'seeds': self.seeds, 'ticks': self.ticks}
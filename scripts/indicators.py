@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+向量化技术指标 — 输入为 (股票 × 交易日) 的二维数组 (一维视为单只股票), 时间沿最后一轴升序
+整个股票池一次计算; 数据不足的位置为 NaN, 历史长短不一的股票用 panel() 左侧补 NaN 对齐
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+TRADING_DAYS = 252
+
+
+def panel(series, length=None):
+    """一维序列列表 → (n, length) 数组, 右端对齐最近交易日, 左侧补 NaN"""
+    length = length or max((len(s) for s in series), default=0)
+    out = np.full((len(series), length), np.nan)
+    for i, s in enumerate(series):
+        s = np.asarray(s, dtype=np.float64)[-length:]
+        if len(s):
+            out[i, length - len(s):] = s
+    return out
+
+
+def last(x):
+    """最后一个交易日的值 (标量或每只股票一个)"""
+    return np.asarray(x)[..., -1]
+
+
+def _rolling(x, window, reduce):
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= window:
+        out[..., window - 1:] = reduce(sliding_window_view(x, window, axis=-1), axis=-1)
+    return out
+
+
+def sma(x, window):
+    """简单移动平均"""
+    return _rolling(x, window, np.mean)
+
+
+def rolling_max(x, window):
+    """滚动最高 (阻力位)"""
+    return _rolling(x, window, np.max)
+
+
+def rolling_min(x, window):
+    """滚动最低 (支撑位)"""
+    return _rolling(x, window, np.min)
+
+
+def ema(x, span):
+    """指数移动平均 (alpha = 2 / (span + 1)), 以每只股票第一个有效值起算; 逐日递推, 全池向量化"""
+    x = np.asarray(x, dtype=np.float64)
+    alpha = 2.0 / (span + 1)
+    out = np.empty_like(x)
+    prev = np.full(x.shape[:-1], np.nan)
+    for t in range(x.shape[-1]):
+        cur = x[..., t]
+        prev = np.where(np.isnan(prev), cur, np.where(np.isnan(cur), prev, alpha * cur + (1 - alpha) * prev))
+        out[..., t] = prev
+    return out
+
+
+def rma(x, period):
+    """Wilder 平滑: 前 period 个有效值取均值作种子, 之后 prev + (x - prev) / period"""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    shape = x.shape[:-1]
+    count = np.zeros(shape, dtype=np.int64)
+    acc = np.zeros(shape)
+    prev = np.full(shape, np.nan)
+    for t in range(x.shape[-1]):
+        cur = x[..., t]
+        valid = ~np.isnan(cur)
+        seeding = valid & (count < period)
+        count = count + valid
+        acc = np.where(seeding, acc + np.where(valid, cur, 0.0), acc)
+        seeded = seeding & (count == period)
+        prev = np.where(seeded, acc / period, prev)
+        smooth = valid & ~seeding
+        prev = np.where(smooth, prev + (cur - prev) / period, prev)
+        out[..., t] = np.where(valid & (count >= period), prev, np.nan)
+    return out
+
+
+def log_returns(close):
+    """对数收益, 长度比 close 少 1; 非正价格视为缺失, 收益相对上一个有效价格计算"""
+    c = np.asarray(close, dtype=np.float64)
+    c = np.where(c > 0, c, np.nan)
+    valid = ~np.isnan(c)
+    idx = np.where(valid, np.arange(c.shape[-1]), 0)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    filled = np.take_along_axis(c, idx, axis=-1)   # 向前填充的最近有效价格
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.log(c[..., 1:] / filled[..., :-1])
+
+
+def volatility(close, annualize=TRADING_DAYS, min_obs=5):
+    """整段对数收益的总体标准差 × sqrt(annualize); 有效价格少于 min_obs 个时为 NaN"""
+    c = np.asarray(close, dtype=np.float64)
+    r = log_returns(c)
+    n = (~np.isnan(r)).sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nansum(r, axis=-1) / n
+        var = np.nansum((r - mean[..., None]) ** 2, axis=-1) / n
+    vol = np.sqrt(var) * np.sqrt(annualize)
+    enough = ((c > 0).sum(axis=-1) >= min_obs) & (n > 0)
+    return np.where(enough, vol, np.nan)
+
+
+def rolling_volatility(close, window, annualize=TRADING_DAYS, min_returns=4):
+    """每个交易日最近 window 个对数收益的年化总体标准差 (含当日), 有效收益少于 min_returns 个时为 NaN"""
+    c = np.asarray(close, dtype=np.float64)
+    r = log_returns(c)
+    pad = np.full(r.shape[:-1] + (window,), np.nan)
+    win = sliding_window_view(np.concatenate([pad, r], axis=-1), window, axis=-1)
+    n = (~np.isnan(win)).sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nansum(win, axis=-1) / n
+        var = np.nansum((win - mean[..., None]) ** 2, axis=-1) / n
+    return np.where(n >= min_returns, np.sqrt(var) * np.sqrt(annualize), np.nan)
+
+
+def true_range(high, low, close):
+    """真实波幅; 首日为 high - low"""
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    prev = np.concatenate([close[..., :1] * np.nan, close[..., :-1]], axis=-1)
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+    return tr
+
+
+def atr(high, low, close, period=14):
+    """平均真实波幅 (Wilder 平滑)"""
+    return rma(true_range(high, low, close), period)
+
+
+def rsi(close, period=14):
+    """相对强弱指数 (Wilder 平滑); 首日及样本不足处为 NaN, 期间无下跌为 100"""
+    c = np.asarray(close, dtype=np.float64)
+    delta = np.diff(c, axis=-1)
+    pad = np.full(c.shape[:-1] + (1,), np.nan)
+    gain = rma(np.concatenate([pad, np.where(np.isnan(delta), np.nan, np.fmax(delta, 0.0))], axis=-1), period)
+    loss = rma(np.concatenate([pad, np.where(np.isnan(delta), np.nan, np.fmax(-delta, 0.0))], axis=-1), period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = 100.0 - 100.0 / (1.0 + gain / loss)
+    return np.where((loss == 0) & ~np.isnan(gain), 100.0, out)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """(DIF, DEA, MACD 柱); 柱按 A 股惯例为 2 × (DIF - DEA)"""
+    dif = ema(close, fast) - ema(close, slow)
+    dea = ema(dif, signal)
+    return dif, dea, 2.0 * (dif - dea)
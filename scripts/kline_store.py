@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+日K线本地存储 — 每只股票一个列式 .npy 文件, 以 mmap 方式读取
+首次回补一段历史, 之后只抓缺失的K线追加; 前复权 (qfq) 价格整体重算时整段重建
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+import numpy as np
+
+from trading_calendar import in_session, is_settled, weekdays_between
+
+# 行 = 列: date 为 yyyymmdd 整数, 其余为前复权价格与成交量
+COLUMNS = ('date', 'open', 'close', 'high', 'low', 'volume')
+COL = {c: i for i, c in enumerate(COLUMNS)}
+
+INTRADAY_REFRESH = 60.0   # 交易时段内当日K线的刷新间隔 (秒)
+BACKFILL_BARS = 320       # 首次回补根数 (请求更多时按请求数)
+REBASE_RTOL = 1e-6        # 重叠K线收盘价的相对误差, 超过即视为除权重算
+MAX_OPEN = 256            # 同时保持 mmap 的文件数 (每个 mmap 占一个文件描述符)
+
+
+def date_to_int(s):
+    """'YYYY-MM-DD' → yyyymmdd"""
+    return int(s[:4]) * 10000 + int(s[5:7]) * 100 + int(s[8:10])
+
+
+def int_to_date(d):
+    d = int(d)
+    return f'{d // 10000:04d}-{d // 100 % 100:02d}-{d % 100:02d}'
+
+
+class KlineBars:
+    """一段日K: data[len(COLUMNS), n], 按日期升序; bars.close 等为列视图 (只读)"""
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((len(COLUMNS), 0), dtype=np.float64))
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    def __getattr__(self, name):
+        try:
+            return self.data[COL[name]]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def tail(self, n):
+        return KlineBars(self.data[:, -n:]) if n < len(self) else self
+
+    def date_strings(self):
+        return [int_to_date(d) for d in self.data[0]]
+
+
+class KlineStore:
+    """日K存储 (线程安全): <root>/<code>.npy 为数据, <code>.json 为同步状态"""
+
+    def __init__(self, root):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self._lock = threading.Lock()
+        self._open = OrderedDict()   # code → (mmap 数组, 同步状态)
+        self.fetches = 0
+        self.appends = 0
+        self.rebases = 0
+        self.disk_hits = 0
+
+    def _paths(self, code):
+        base = os.path.join(self.root, code)
+        return base + '.npy', base + '.json'
+
+    def _load(self, code):
+        """(数据, 同步状态), 无本地数据时为 (None, None); 调用方持有锁"""
+        entry = self._open.get(code)
+        if entry is not None:
+            self._open.move_to_end(code)
+            return entry
+        data_path, meta_path = self._paths(code)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            data = np.load(data_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None, None
+        self._remember(code, data, meta)
+        return data, meta
+
+    def _remember(self, code, data, meta):
+        self._open[code] = (data, meta)
+        self._open.move_to_end(code)
+        while len(self._open) > MAX_OPEN:
+            self._open.popitem(last=False)
+
+    def plan(self, code, count, now=None):
+        """需要从上游抓取的最近K线根数, 0 表示直接读盘
+
+        增量抓取时多取上次同步日之前的一根已定稿K线, 用来检测前复权是否重算。
+        """
+        now = now or datetime.now()
+        with self._lock:
+            _, meta = self._load(code)
+        if meta is None or meta['depth'] < count:
+            return max(count, BACKFILL_BARS)
+        today = now.date()
+        if meta['synced_day'] != today.isoformat():
+            gap = weekdays_between(date.fromisoformat(meta['synced_day']), today)
+            if gap == 0 and meta['settled']:
+                return 0
+            return min(meta['depth'], gap + 2)
+        if in_session(now):
+            return 2 if time.time() - meta['synced_at'] >= INTRADAY_REFRESH else 0
+        if not meta['settled'] and is_settled(now):
+            return 2
+        return 0
+
+    def depth(self, code):
+        with self._lock:
+            _, meta = self._load(code)
+        return meta['depth'] if meta else 0
+
+    def merge(self, code, fetched, lmt, now=None, replace=False):
+        """写入抓取到的最近 lmt 根 (fetched[len(COLUMNS), m], 升序)
+
+        返回 False 表示与已存K线的收盘价不一致 (前复权已重算), 调用方需整段重抓后以 replace=True 写入。
+        """
+        now = now or datetime.now()
+        with self._lock:
+            stored, meta = (None, None) if replace else self._load(code)
+            if stored is not None and len(fetched[0]):
+                first = fetched[0, 0]
+                # 已存的最后一根可能是未收盘的当日K线, 只比较它之前的已定稿K线
+                settled = stored[:, stored[0] < stored[0, -1]] if stored.shape[1] else stored
+                common, si, fi = np.intersect1d(settled[0], fetched[0], return_indices=True)
+                if not len(common) and first > stored[0, -1]:
+                    return False   # 缺口超出抓取范围
+                if not np.allclose(settled[2, si], fetched[2, fi], rtol=REBASE_RTOL, atol=0):
+                    self.rebases += 1
+                    return False
+                data = np.concatenate([stored[:, stored[0] < first], fetched], axis=1)
+                self.appends += 1
+            elif stored is not None:
+                data = stored
+            else:
+                data = fetched
+            depth = max(meta['depth'] if meta else 0, lmt)
+            meta = {'depth': depth, 'synced_at': time.time(),
+                    'synced_day': now.date().isoformat(), 'settled': is_settled(now)}
+            self._write(code, np.ascontiguousarray(data, dtype=np.float64), meta)
+            self.fetches += 1
+        return True
+
+    def _write(self, code, data, meta):
+        """先写临时文件再原子替换; 已打开的旧 mmap 仍指向旧文件, 读者不受影响"""
+        data_path, meta_path = self._paths(code)
+        tmp = data_path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, data)
+        os.replace(tmp, data_path)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+        # 空数组无法 mmap, 直接保留内存副本
+        self._remember(code, np.load(data_path, mmap_mode='r') if data.size else data, meta)
+
+    def window(self, code, count=None):
+        """最近 count 根 (KlineBars, count 为 None 时全部), 无本地数据时为 None"""
+        with self._lock:
+            data, _ = self._load(code)
+            self.disk_hits += 1
+        if data is None:
+            return None
+        bars = KlineBars(data)
+        return bars if count is None else bars.tail(count)
+
+    def has(self, code):
+        with self._lock:
+            return self._load(code)[0] is not None
+
+    def stats(self):
+        with self._lock:
+            codes = sum(1 for f in os.listdir(self.root) if f.endswith('.npy'))
+            return {'path': self.root, 'codes': codes, 'open': len(self._open),
+                    'fetches': self.fetches, 'appends': self.appends,
+                    'rebases': self.rebases, 'reads': self.disk_hits}
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+配对发现与协整 — 同行业股票两两配对, 按日K对数价格批量计算
+每个行业: 收益相关矩阵 (一次矩阵乘法) 筛出候选, 候选对的 OLS 对冲比、Engle-Granger 残差 ADF t 值与半衰期由 Gram 矩阵批量组合
+配对簿按行业增量更新 (行业内日K无变化则跳过), 实时价差 z 值由行情快照计算
+"""
+import math
+import threading
+
+import numpy as np
+
+PAIR_LOOKBACK = 120     # 日K根数
+MIN_BARS = 60           # 窗口内有效K线少于该数的股票不参与
+MIN_CORR = 0.6          # 日收益相关系数下限 (候选筛选)
+ADF_CRITICAL = -3.34    # Engle-Granger 两变量 5% 临界值 (无滞后项近似)
+MAX_HALF_LIFE = 60.0    # 交易日
+
+_FIELDS = ('corr', 'beta', 'alpha', 'adf_t', 'half_life', 'spread_std', 'last_spread')
+
+
+def align_log_prices(bars_by_code, lookback=PAIR_LOOKBACK, min_bars=MIN_BARS):
+    """{code: KlineBars} → (codes, dates, log 收盘价 [n, T]); 按交易日并集对齐, 停牌向前填充
+
+    窗口开头之前就没有数据 (新上市) 或有效K线不足 min_bars 的代码剔除。
+    """
+    bars_by_code = {c: b for c, b in bars_by_code.items() if b is not None and len(b)}
+    if not bars_by_code:
+        return [], np.zeros(0, dtype=np.int64), np.zeros((0, 0))
+    dates = np.unique(np.concatenate([b.date[-lookback:] for b in bars_by_code.values()]).astype(np.int64))
+    dates = dates[-lookback:]
+    codes, rows = [], []
+    for code, bars in bars_by_code.items():
+        d = bars.date.astype(np.int64)
+        keep = d >= dates[0]
+        if keep.sum() < min_bars:
+            continue
+        close = bars.close
+        row = np.full(len(dates), np.nan)
+        row[np.searchsorted(dates, d[keep])] = close[keep]
+        if np.isnan(row[0]):
+            # 窗口首日停牌: 取之前最近的收盘价; 没有则说明上市晚于窗口
+            before = np.flatnonzero(~keep)
+            if not len(before):
+                continue
+            row[0] = close[before[-1]]
+        valid = ~np.isnan(row)
+        row = row[np.maximum.accumulate(np.where(valid, np.arange(len(row)), 0))]
+        if (row <= 0).any():
+            continue
+        codes.append(code)
+        rows.append(np.log(row))
+    return codes, dates, np.array(rows).reshape(len(rows), len(dates))
+
+
+def _quad(g, I, J, beta):
+    """价差 a - β·b 的二次型: g[a, a] - β·(g[a, b] + g[b, a]) + β²·g[b, b]"""
+    return g[I, I] - beta * (g[I, J] + g[J, I]) + beta * beta * g[J, J]
+
+
+def scan_pairs(logp, min_corr=MIN_CORR, adf_critical=ADF_CRITICAL, max_half_life=MAX_HALF_LIFE):
+    """一个行业的 log 价格 [m, T] → 协整配对 (i, j, 统计量 dict), i < j, 以 i 对 j 回归
+
+    价差 S = p_i - β·p_j - α 是两条价格的线性组合, 其方差、ADF 回归 ΔS_t = c + φ·S_{t-1} 的各项平方和
+    都是两腿去均值序列的二次型: 先对全行业做几次 [m, T] × [T, m] 矩阵乘法得到 Gram 矩阵,
+    每个候选对只需 O(1) 组合, 不必逐对生成价差序列。
+    """
+    m, t = logp.shape
+    empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), {f: np.zeros(0) for f in _FIELDS})
+    if m < 2 or t < 10:
+        return empty
+    rets = np.diff(logp, axis=1)
+    rc = rets - rets.mean(axis=1, keepdims=True)
+    norm = np.sqrt((rc * rc).sum(axis=1))
+    rn = rc / np.where(norm > 0, norm, np.inf)[:, None]
+    corr = rn @ rn.T
+    iu, ju = np.triu_indices(m, 1)
+    cand = corr[iu, ju] >= min_corr
+    I, J = iu[cand], ju[cand]
+    if not len(I):
+        return empty
+
+    mean = logp.mean(axis=1)
+    pc = logp - mean[:, None]
+    cov = pc @ pc.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = cov[I, J] / cov[J, J]
+    alpha = mean[I] - beta * mean[J]
+
+    # ADF (无滞后项): 对 S_{t-1} 与 ΔS_t 各自去均值后回归, 半衰期 = -ln2 / ln(1 + φ)
+    lag = logp[:, :-1] - logp[:, :-1].mean(axis=1, keepdims=True)
+    delta = rets - rets.mean(axis=1, keepdims=True)
+    sxx = _quad(lag @ lag.T, I, J, beta)
+    sxy = _quad(lag @ delta.T, I, J, beta)
+    syy = _quad(delta @ delta.T, I, J, beta)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        phi = sxy / sxx
+        ssr = np.maximum(syy - phi * sxy, 0.0)
+        adf_t = phi / np.sqrt(ssr / max(t - 3, 1) / sxx)
+        half_life = np.where((phi < 0) & (phi > -1), -math.log(2) / np.log1p(phi), np.inf)
+    spread_std = np.sqrt(np.maximum(_quad(cov, I, J, beta), 0.0) / t)
+    last_spread = logp[I, -1] - beta * logp[J, -1] - alpha
+
+    ok = ((adf_t <= adf_critical) & (half_life >= 1) & (half_life <= max_half_life)
+          & (spread_std > 0) & np.isfinite(beta) & (beta > 0))
+    stats = {'corr': corr[I, J], 'beta': beta, 'alpha': alpha, 'adf_t': adf_t, 'half_life': half_life,
+             'spread_std': spread_std, 'last_spread': last_spread}
+    return I[ok], J[ok], {k: v[ok] for k, v in stats.items()}
+
+
+class PairBook:
+    """按行业维护的协整配对簿 (线程安全); update() 只重扫日K有变化的行业"""
+
+    def __init__(self, lookback=PAIR_LOOKBACK, min_corr=MIN_CORR, adf_critical=ADF_CRITICAL,
+                 max_half_life=MAX_HALF_LIFE):
+        self.lookback = lookback
+        self.min_corr = min_corr
+        self.adf_critical = adf_critical
+        self.max_half_life = max_half_life
+        self._lock = threading.Lock()
+        self._sectors = {}    # 行业 → {'a', 'b' (代码数组), 统计量数组..., 'stamp', 'size', 'end'}
+        self.scans = 0
+        self.skipped = 0
+        self.candidates = 0   # 累计检验的同行业配对数
+
+    @staticmethod
+    def _stamp(members, bars_by_code):
+        return tuple((c, len(bars_by_code[c]), int(bars_by_code[c].date[-1])) for c in members)
+
+    def update(self, bars_by_code, sectors):
+        """bars_by_code: {code: KlineBars}; sectors: {code: 行业}. 返回本次重扫的行业数"""
+        groups = {}
+        for code in sorted(bars_by_code):
+            bars = bars_by_code[code]
+            sector = sectors.get(code)
+            if sector and bars is not None and len(bars):
+                groups.setdefault(sector, []).append(code)
+        scanned = 0
+        for sector, members in groups.items():
+            stamp = self._stamp(members, bars_by_code)
+            with self._lock:
+                prev = self._sectors.get(sector)
+                if prev is not None and prev['stamp'] == stamp:
+                    self.skipped += 1
+                    continue
+            codes, dates, logp = align_log_prices({c: bars_by_code[c] for c in members}, self.lookback)
+            I, J, stats = scan_pairs(logp, self.min_corr, self.adf_critical, self.max_half_life)
+            codes = np.array(codes, dtype=object)
+            entry = {'a': codes[I], 'b': codes[J], **stats, 'stamp': stamp, 'size': len(codes),
+                     'end': int(dates[-1]) if len(dates) else None}
+            with self._lock:
+                self._sectors[sector] = entry
+                self.scans += 1
+                self.candidates += len(codes) * (len(codes) - 1) // 2
+            scanned += 1
+        with self._lock:
+            for sector in set(self._sectors) - set(groups):
+                del self._sectors[sector]
+        return scanned
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(e['a']) for e in self._sectors.values())
+
+    def pairs(self, top=None):
+        """全部配对, 按 ADF t 值升序 (协整越强越靠前)"""
+        with self._lock:
+            rows = [
+                {'sector': sector, 'a': a, 'b': b, **{f: float(e[f][k]) for f in _FIELDS}}
+                for sector, e in self._sectors.items()
+                for k, (a, b) in enumerate(zip(e['a'].tolist(), e['b'].tolist()))
+            ]
+        rows.sort(key=lambda r: r['adf_t'])
+        return rows[:top] if top else rows
+
+    def live(self, frame, min_z=0.0):
+        """用行情快照计算每个配对的实时价差 z 值 (价差为 OLS 残差, 均值为 0); 按 |z| 降序, 停牌 / 缺价的跳过"""
+        rows = self.pairs()
+        if not rows or not len(frame):
+            return []
+        pos = {}
+        for r in rows:
+            for code in (r['a'], r['b']):
+                if code not in pos:
+                    i = frame.index_of(code)
+                    pos[code] = -1 if i is None else i
+        ia = np.array([pos[r['a']] for r in rows], dtype=np.int64)
+        ib = np.array([pos[r['b']] for r in rows], dtype=np.int64)
+        ok = (ia >= 0) & (ib >= 0)
+        pa = np.where(ok, frame.price[ia], 0.0)
+        pb = np.where(ok, frame.price[ib], 0.0)
+        ok &= (pa > 0) & (pb > 0)
+        beta = np.array([r['beta'] for r in rows])
+        alpha = np.array([r['alpha'] for r in rows])
+        std = np.array([r['spread_std'] for r in rows])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            spread = np.log(np.where(ok, pa, 1.0)) - beta * np.log(np.where(ok, pb, 1.0)) - alpha
+            z = np.where(ok, spread / std, np.nan)
+        out = []
+        for k in np.argsort(-np.abs(np.nan_to_num(z)), kind='stable').tolist():
+            if ok[k] and abs(z[k]) >= min_z:
+                out.append({**rows[k], 'z': float(z[k]), 'ia': int(ia[k]), 'ib': int(ib[k])})
+        return out
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sectors': len(self._sectors),
+                'pairs': sum(len(e['a']) for e in self._sectors.values()),
+                'codes': sum(e['size'] for e in self._sectors.values()),
+                'scans': self.scans, 'skipped': self.skipped, 'candidates': self.candidates,
+            }
@@ -0,0 +1,911 @@
+#!/usr/bin/env python3
+"""
+性能基准与等价性校验 — 数据层优化的回归检查
+用法: python3 perf_checks.py <check> [options]
+    parser       行情批量解析器 vs 逐行解析器 (--payload 使用录制的腾讯响应体)
+    indicators   向量化指标 vs 逐只标量实现 (MA / EMA / 波动率 / ATR / 支撑阻力 / RSI / MACD)
+    stream       流式指标状态逐笔更新 vs 每笔重算整段窗口
+    loop_lag     策略引擎运行期间的事件循环延迟 (同步抓取 vs 异步数据源, 模拟上游延迟)
+    dividend_rank 红利低波横截面排名: 数组 argsort vs 逐 dict 三次排序 (全市场规模)
+    backtest     回测 5 年 × 300 只日K (耗时 / 指标与流式口径一致 / 组合记账与风控约束)
+    sweep        参数扫描: 进程池 + 共享内存 vs 串行回测 (结果一致), 滚动验证切分
+    features     因子特征库 vs 逐只从 dict 推导 (结果一致 / 新快照只重算变化的行)
+    multi_factor 横截面多因子打分: 向量化 vs 纯 Python (缩尾 / 行业中性 / z-score)
+    pairs        同行业配对协整扫描: 批量矩阵运算 vs 逐对回归 (结果一致 / 增量重扫 / 实时 z 值)
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+import akshare_service as aks
+import factor_model
+import feature_store
+import indicator_stream
+import indicators
+import kline_store
+import pair_engine
+
+
+def _bench(fn, rounds):
+    """运行 rounds 次, 返回 (最快耗时 ms, 最后一次结果)"""
+    best = float('inf')
+    result = None
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, result
+
+
+def _report(title, rows):
+    print(f'── {title}')
+    base = rows[0][1]
+    for label, ms in rows:
+        print(f'  {label:<24}{ms:>10.2f} ms   x{base / ms:.1f}')
+
+
+# ═══════════════════════════════════════════
+# 合成行情 — 结构与腾讯 / 新浪接口一致
+# ═══════════════════════════════════════════
+_NAME_CHARS = '贵州茅台五粮液平安银行招商宁德时代比亚迪中芯国际科技电力能源医药'
+
+
+def synthetic_codes(n):
+    codes = []
+    for i in range(n):
+        prefix = ('600', '601', '000', '002', '300', '688')[i % 6]
+        codes.append(f'{prefix}{i // 6:03d}')
+    return codes
+
+
+def synthetic_tencent_body(codes, seed=1):
+    """生成 GBK 编码的腾讯批量行情响应体"""
+    rnd = random.Random(seed)
+    lines = []
+    for code in codes:
+        f = ['0'] * 53
+        prev = rnd.uniform(3, 200)
+        price = prev * (1 + rnd.uniform(-0.1, 0.1))
+        f[0] = '1'
+        f[1] = ''.join(rnd.choice(_NAME_CHARS) for _ in range(4))
+        f[2] = code
+        f[3], f[4], f[5] = f'{price:.2f}', f'{prev:.2f}', f'{prev * rnd.uniform(0.98, 1.02):.2f}'
+        f[31], f[32] = f'{price - prev:.2f}', f'{(price - prev) / prev * 100:.2f}'
+        f[33], f[34] = f'{max(price, prev) * 1.01:.2f}', f'{min(price, prev) * 0.99:.2f}'
+        f[36], f[37] = str(rnd.randint(100, 5_000_000)), f'{rnd.uniform(1e3, 5e6):.4f}'
+        f[38], f[39], f[46] = f'{rnd.uniform(0, 15):.2f}', f'{rnd.uniform(-50, 300):.2f}', f'{rnd.uniform(0.3, 20):.2f}'
+        lines.append(f'v_{aks._code_to_tencent(code)}="' + '~'.join(f) + '";')
+    return ('\n'.join(lines) + '\n').encode('gbk')
+
+
+def synthetic_sina_body(codes, seed=1):
+    """生成 GBK 编码的新浪批量行情响应体"""
+    rnd = random.Random(seed)
+    lines = []
+    for code in codes:
+        prev = rnd.uniform(3, 200)
+        price = prev * (1 + rnd.uniform(-0.1, 0.1))
+        f = [''.join(rnd.choice(_NAME_CHARS) for _ in range(4)),
+             f'{prev * 1.001:.3f}', f'{prev:.3f}', f'{price:.3f}',
+             f'{max(price, prev) * 1.01:.3f}', f'{min(price, prev) * 0.99:.3f}',
+             '0', '0', str(rnd.randint(100, 10 ** 8)), f'{rnd.uniform(1e5, 1e10):.3f}']
+        f += ['0'] * 22
+        lines.append(f'var hq_str_{aks._code_to_sina(code)}="' + ','.join(f) + '";')
+    return ('\n'.join(lines) + '\n').encode('gbk')
+
+
+# ═══════════════════════════════════════════
+# 行情解析器
+# ═══════════════════════════════════════════
+def check_parser(args):
+    if args.payload:
+        with open(args.payload, 'rb') as f:
+            tencent = f.read()
+        sina = None
+    else:
+        codes = synthetic_codes(args.symbols)
+        tencent = synthetic_tencent_body(codes)
+        sina = synthetic_sina_body(codes)
+
+    cases = [('腾讯', tencent, aks._parse_tencent_row, aks._parse_tencent_bulk)]
+    if sina is not None:
+        cases.append(('新浪', sina, aks._parse_sina_row, aks._parse_sina_bulk))
+
+    ok = True
+    for label, body, parse_row, parse_bulk in cases:
+        line_ms, line_frame = _bench(
+            lambda: aks._fill_frame(body.decode('gbk', errors='replace'), parse_row), args.rounds)
+        bulk_ms, bulk_frame = _bench(lambda: parse_bulk(body), args.rounds)
+        _report(f'{label} {len(line_frame)} 只 / {len(body) / 1024:.0f} KB', [
+            ('逐行解析 (GBK+正则)', line_ms),
+            ('整包解析', bulk_ms),
+        ])
+        same = line_frame.to_dicts() == bulk_frame.to_dicts()
+        print(f'  结果一致: {same}')
+        ok = ok and same
+    return ok
+
+
+# ═══════════════════════════════════════════
+# 技术指标 — 标量参考实现为优化前的逐只计算 (MA / 波动率 / 支撑阻力) 与教科书递推
+# ═══════════════════════════════════════════
+def synthetic_closes(n, days, seed=1):
+    """随机游走收盘价面板; 部分股票历史较短 (左侧 NaN), 少量含非正价格"""
+    rnd = np.random.default_rng(seed)
+    close = 20 * np.exp(np.cumsum(rnd.normal(0, 0.02, (n, days)), axis=1))
+    high = close * (1 + rnd.uniform(0, 0.03, close.shape))
+    low = close * (1 - rnd.uniform(0, 0.03, close.shape))
+    for i in range(3, n, 97):
+        close[i, int(rnd.integers(0, days))] = 0.0
+    for i in range(0, n, 7):
+        start = int(rnd.integers(1, days))
+        close[i, :start] = high[i, :start] = low[i, :start] = np.nan
+    return close, high, low
+
+
+def _ref_ma(prices, period):
+    if len(prices) < period:
+        return None
+    return sum(prices[-period:]) / period
+
+
+def _ref_volatility(closes):
+    closes = [c for c in closes if c > 0]
+    if len(closes) < 5:
+        return 999.0
+    returns = [math.log(closes[i] / closes[i - 1]) for i in range(1, len(closes))]
+    mean = sum(returns) / len(returns)
+    var = sum((r - mean) ** 2 for r in returns) / len(returns)
+    return math.sqrt(var) * math.sqrt(252)
+
+
+def _ref_ema(xs, span):
+    alpha = 2 / (span + 1)
+    out, prev = [], None
+    for x in xs:
+        prev = x if prev is None else alpha * x + (1 - alpha) * prev
+        out.append(prev)
+    return out
+
+
+def _ref_rma(xs, period):
+    out, prev = [], None
+    for i, x in enumerate(xs):
+        if i + 1 < period:
+            out.append(None)
+            continue
+        prev = sum(xs[:period]) / period if prev is None else prev + (x - prev) / period
+        out.append(prev)
+    return out
+
+
+def _ref_rsi(closes, period):
+    deltas = [b - a for a, b in zip(closes, closes[1:])]
+    gains = _ref_rma([max(d, 0) for d in deltas], period)
+    losses = _ref_rma([max(-d, 0) for d in deltas], period)
+    last_gain, last_loss = gains[-1] if gains else None, losses[-1] if losses else None
+    if last_gain is None:
+        return None
+    return 100.0 if last_loss == 0 else 100 - 100 / (1 + last_gain / last_loss)
+
+
+def _ref_atr(highs, lows, closes, period):
+    trs = [highs[0] - lows[0]] + [
+        max(h - l, abs(h - pc), abs(l - pc)) for h, l, pc in zip(highs[1:], lows[1:], closes)]
+    return _ref_rma(trs, period)[-1]
+
+
+def _ref_macd(closes):
+    dif = [f - s for f, s in zip(_ref_ema(closes, 12), _ref_ema(closes, 26))]
+    dea = _ref_ema(dif, 9)
+    return dif[-1], dea[-1], 2 * (dif[-1] - dea[-1])
+
+
+def _scalar_indicators(close, high, low):
+    """逐只股票计算, 每只一个 dict (指标取最后一日)"""
+    out = []
+    for c_row, h_row, l_row in zip(close, high, low):
+        keep = ~np.isnan(c_row)
+        cs, hs, ls = c_row[keep].tolist(), h_row[keep].tolist(), l_row[keep].tolist()
+        positive = [c for c in cs if c > 0]
+        out.append({
+            'ma5': _ref_ma(cs, 5), 'ma20': _ref_ma(cs, 20), 'ma60': _ref_ma(cs, 60),
+            'ema12': _ref_ema(cs, 12)[-1],
+            'vol': _ref_volatility(cs),
+            'support': min(ls[-20:]) if len(ls) >= 20 else None,
+            'resistance': max(hs[-20:]) if len(hs) >= 20 else None,
+            'atr': _ref_atr(hs, ls, cs, 14) if len(cs) >= 14 else None,
+            'rsi': _ref_rsi(positive, 14) if len(positive) == len(cs) and len(cs) > 14 else None,
+            'macd': _ref_macd(cs),
+        })
+    return out
+
+
+def _vector_indicators(close, high, low):
+    dif, dea, hist = indicators.macd(close)
+    vol = indicators.volatility(close)
+    return {
+        'ma5': indicators.last(indicators.sma(close, 5)),
+        'ma20': indicators.last(indicators.sma(close, 20)),
+        'ma60': indicators.last(indicators.sma(close, 60)),
+        'ema12': indicators.last(indicators.ema(close, 12)),
+        'vol': np.where(np.isnan(vol), 999.0, vol),
+        'support': indicators.last(indicators.rolling_min(low, 20)),
+        'resistance': indicators.last(indicators.rolling_max(high, 20)),
+        'atr': indicators.last(indicators.atr(high, low, close, 14)),
+        'rsi': indicators.last(indicators.rsi(close, 14)),
+        'macd': np.stack([indicators.last(dif), indicators.last(dea), indicators.last(hist)], axis=-1),
+    }
+
+
+def _same(ref, got, rtol=1e-9):
+    if ref is None:
+        return bool(np.all(np.isnan(got)))
+    return bool(np.allclose(np.asarray(ref, dtype=np.float64), got, rtol=rtol, atol=1e-12))
+
+
+def check_indicators(args):
+    close, high, low = synthetic_closes(args.symbols, 120)
+    scalar_ms, ref = _bench(lambda: _scalar_indicators(close, high, low), max(1, args.rounds // 2))
+    vector_ms, got = _bench(lambda: _vector_indicators(close, high, low), args.rounds)
+    _report(f'{len(close)} 只 × {close.shape[1]} 日', [
+        ('逐只标量计算', scalar_ms),
+        ('全池向量化', vector_ms),
+    ])
+    ok = True
+    for key in got:
+        # 含非正价格的股票 RSI 口径不同 (标量参考不处理), 跳过
+        bad = [i for i, row in enumerate(ref)
+               if not (key == 'rsi' and row['rsi'] is None and np.any(close[i] <= 0))
+               and not _same(row[key], got[key][i])]
+        print(f'  {key:<12}{"一致" if not bad else f"不一致 {len(bad)} 只, 如第 {bad[0]} 只"}')
+        ok = ok and not bad
+    return ok
+
+
+# ═══════════════════════════════════════════
+# 流式指标 — 日内每笔行情覆盖当日K线, 次日开盘时定稿
+# ═══════════════════════════════════════════
+def _window_values(close, high, low):
+    """按整段窗口重算 (与 IndicatorStream 同口径)"""
+    values = {f'ma{w}': float(indicators.sma(close[-w:], w)[-1]) for w in indicator_stream.MA_WINDOWS}
+    values['volatility'] = float(indicators.volatility(close[-(indicator_stream.VOL_WINDOW + 1):]))
+    w = indicator_stream.EXTREMUM_WINDOW
+    values['support'] = float(indicators.rolling_min(low[-w:], w)[-1])
+    values['resistance'] = float(indicators.rolling_max(high[-w:], w)[-1])
+    return values
+
+
+def check_stream(args):
+    n = min(args.symbols, 100)
+    seed_days, live_days, ticks = 60, 10, 20
+    close, high, low = synthetic_closes(n, seed_days + live_days)
+    # 补齐缺失 / 非正价格, 使整段重算与流式状态口径一致
+    close, high, low = (np.where(np.nan_to_num(a) > 0, a, 10.0) for a in (close, high, low))
+    dates = np.arange(seed_days + live_days, dtype=np.float64) + 20260101
+    volume = np.ones_like(close)
+    prices = np.random.default_rng(2).uniform(0.99, 1.01, (live_days, ticks, n)) * close[:, seed_days:].T[:, None, :]
+    prices[:, -1, :] = close[:, seed_days:].T   # 当日最后一笔即收盘价
+
+    def replay(recompute):
+        states = []
+        for i in range(n):
+            data = np.stack([dates, close[i], close[i], high[i], low[i], volume[i]])[:, :seed_days]
+            states.append(indicator_stream.IndicatorStream().seed(str(i), kline_store.KlineBars(data), 0))
+        worst = 0.0
+        for k, d in enumerate(range(seed_days, seed_days + live_days)):
+            for t in range(ticks):
+                for i, state in enumerate(states):
+                    px = float(prices[k, t, i])
+                    state.update(int(dates[d]), close[i, d], high[i, d], low[i, d], px)
+                    if recompute:
+                        ref = _window_values(np.append(close[i, :d], px), high[i, :d + 1], low[i, :d + 1])
+                        got = state.values()
+                        worst = max(worst, max(abs(got[key] - v) / max(abs(v), 1.0) for key, v in ref.items()))
+        return worst
+
+    stream_ms, _ = _bench(lambda: replay(False), 1)
+    full_ms, worst = _bench(lambda: replay(True), 1)
+    _report(f'{n} 只 × {live_days} 日 × {ticks} 笔', [
+        ('每笔重算窗口 (含比对)', full_ms),
+        ('流式 O(1) 更新', stream_ms),
+    ])
+    ok = worst < 1e-9
+    print(f'  最大误差: {worst:.2e} {"一致" if ok else "不一致"}')
+    return ok
+
+# ═══════════════════════════════════════════
+# 事件循环延迟 — 策略引擎运行时, 其余协程 (API / WebSocket) 能否按时调度
+# ═══════════════════════════════════════════
+LOOP_LAG_BUDGET = 0.1   # 秒, 异步数据源下允许的最大调度延迟
+
+
+def synthetic_kline_body(code, count, seed=1):
+    """腾讯 fqkline 响应体"""
+    rnd = random.Random(f'{code}-{seed}')
+    rows, price, day = [], rnd.uniform(5, 100), 0
+    for i in range(count):
+        price *= 1 + rnd.uniform(-0.03, 0.03)
+        day += 1 + (i % 5 == 4) * 2
+        date = time.strftime('%Y-%m-%d', time.localtime(time.time() - (count * 1.4 - day) * 86400))
+        rows.append([date, f'{price:.2f}', f'{price:.2f}', f'{price * 1.01:.2f}', f'{price * 0.99:.2f}', '10000'])
+    return json.dumps({'data': {aks._code_to_tencent(code): {'qfqday': rows}}}).encode()
+
+
+def _fake_body(url):
+    if 'fqkline' in url:
+        symbol, _, _, _, count = url.split('param=')[1].split(',')[:5]
+        return synthetic_kline_body(symbol[2:], int(count))
+    codes = [c[2:] for c in url.rsplit('=', 1)[1].split(',')]
+    return synthetic_tencent_body(codes)
+
+
+def _simulate_upstream(latency):
+    """把 akshare_service 的 HTTP 出口换成固定延迟的合成响应 (同步阻塞 / 协程各一份)"""
+    def get_bytes(url, *args, **kwargs):
+        time.sleep(latency)
+        return _fake_body(url)
+
+    async def get_async(url, timeout=10, headers=None, encoding='gbk', stale=True):
+        await asyncio.sleep(latency)
+        body = _fake_body(url)
+        return body if encoding is None else body.decode(encoding, errors='replace')
+
+    aks._http_get_bytes = get_bytes
+    aks._http_get_async = get_async
+
+
+def _reset_data_layer():
+    """每轮使用全新的存储目录与缓存, 两种路径都从冷启动开始"""
+    aks.configure_data_dir(tempfile.mkdtemp(prefix='perf_checks_'))
+    aks._kline_store = None
+    aks._indicator_stream = aks.indicator_stream.IndicatorStream()
+    aks._quote_cache = aks.SnapshotCache(aks._quote_cache.ttl)
+
+
+async def _max_loop_lag(run, period=0.005):
+    """运行 run() 期间, 每 period 秒一次的心跳协程的最大调度延迟 (秒) 与总耗时"""
+    lags = []
+    done = False
+
+    async def heartbeat():
+        while not done:
+            t0 = time.perf_counter()
+            await asyncio.sleep(period)
+            lags.append(time.perf_counter() - t0 - period)
+
+    task = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0)
+    t0 = time.perf_counter()
+    await run()
+    elapsed = time.perf_counter() - t0
+    done = True
+    await task
+    return max(lags), elapsed
+
+
+def _backend_path():
+    """把 backend/ 加入 sys.path, 并把数据库指向临时文件 (不读写 backend/quant.db)"""
+    backend = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+    if backend not in sys.path:
+        sys.path.insert(0, backend)
+        import db
+        db.DB_PATH = os.path.join(tempfile.mkdtemp(prefix='perf_checks_db_'), 'quant.db')
+
+
+def _close_backend():
+    """关闭检查中打开的数据库连接 (aiosqlite 工作线程不退出会阻塞解释器退出)"""
+    db = sys.modules.get('db')
+    if db is not None:
+        asyncio.run(db.close_db())
+
+
+def check_loop_lag(args):
+    _backend_path()
+    from services import price_service
+    from strategies.dividend_low_vol import DIVIDEND_YIELDS
+    from strategies.engine import StrategyEngine
+
+    _simulate_upstream(latency=0.05)
+
+    async def blocking_run():
+        # 改造前: 同步抓股票池, 再逐只同步抓日K
+        pool = price_service.fetch_stock_pool()
+        for stock in pool:
+            if stock['code'] in DIVIDEND_YIELDS:
+                price_service.fetch_kline(stock['code'], 25)
+
+    engine = StrategyEngine(persist=False)
+    rows, lags = [], {}
+    for label, run in (('同步抓取 (改造前)', blocking_run), ('异步数据源', engine.run_all)):
+        _reset_data_layer()
+        lag, elapsed = asyncio.run(_max_loop_lag(run))
+        lags[label] = lag
+        rows.append((label, elapsed * 1000))
+    _report('策略引擎一轮 (上游延迟 50 ms)', rows)
+    for label, lag in lags.items():
+        print(f'  {label:<20}事件循环最大延迟 {lag * 1000:>8.1f} ms')
+    ok = lags['异步数据源'] < LOOP_LAG_BUDGET
+    print(f'  异步数据源延迟 < {LOOP_LAG_BUDGET * 1000:.0f} ms: {ok}')
+    return ok
+
+
+# ═══════════════════════════════════════════
+# 红利低波排名 — 全市场规模的横截面打分
+# ═══════════════════════════════════════════
+def _ref_dividend_signals(scored):
+    """改造前的实现: dict 列表排序三次, 为每只股票生成信号 → [(code, signal, confidence, expected_return, factors)]"""
+    scored = [dict(s) for s in scored]
+    scored.sort(key=lambda x: x['div_yield'], reverse=True)
+    for i, s in enumerate(scored):
+        s['div_rank'] = i / max(len(scored) - 1, 1)
+    scored.sort(key=lambda x: x['volatility'])
+    for i, s in enumerate(scored):
+        s['vol_rank'] = i / max(len(scored) - 1, 1)
+    for s in scored:
+        s['score'] = s['div_rank'] * 0.5 + s['vol_rank'] * 0.5
+    scored.sort(key=lambda x: x['score'])
+
+    out = []
+    n = len(scored)
+    top5 = max(1, n // 5)
+    for i, s in enumerate(scored):
+        if i < top5:
+            row = ('buy', round(0.7 + 0.2 * (1 - i / top5), 2), round(s['div_yield'] * 0.8, 1),
+                   [f"股息率 {s['div_yield']:.1f}%", f"波动率 {s['volatility']:.1%}", '高股息低波动'])
+        elif i >= n - top5:
+            row = ('sell', round(0.5 + 0.2 * ((i - n + top5) / top5), 2), round(-s['volatility'] * 10, 1),
+                   [f"股息率 {s['div_yield']:.1f}%", f"波动率 {s['volatility']:.1%}", '低股息高波动'])
+        else:
+            row = ('hold', 0.4, round(s['div_yield'] * 0.3, 1), [f"股息率 {s['div_yield']:.1f}%", '中性'])
+        out.append((s['code'], *row))
+    return out
+
+
+def _synthetic_dividend_universe(n, seed=7):
+    """股息率保留一位小数、部分波动率缺失 (999), 制造大量并列"""
+    rng = np.random.default_rng(seed)
+    codes = [f'{i:06d}' for i in range(n)]
+    div = np.round(rng.uniform(0, 6, n), 1)
+    vol = np.round(rng.uniform(0.1, 0.6, n), 3)
+    vol[rng.random(n) < 0.05] = 999.0
+    return codes, div, vol
+
+
+def check_dividend_rank(args):
+    _backend_path()
+    from strategies.dividend_low_vol import DividendLowVolStrategy, rank_scores
+
+    n = args.symbols
+    codes, div, vol = _synthetic_dividend_universe(n)
+    include = set(codes[n // 2:n // 2 + 10])
+    scored = [{'code': c, 'name': c, 'div_yield': d, 'volatility': v}
+              for c, d, v in zip(codes, div.tolist(), vol.tolist())]
+    data = {'codes': codes, 'names': codes, 'div_yield': div, 'volatility': vol}
+    strat = DividendLowVolStrategy(feed=object(), dividend_yields=dict(zip(codes, div.tolist())),
+                                   include_codes=include)
+
+    ref_ms, ref = _bench(lambda: _ref_dividend_signals(scored), args.rounds)
+    rank_ms, _ = _bench(lambda: rank_scores(div, vol), args.rounds)
+    vec_ms, got = _bench(lambda: strat.compute(data), args.rounds)
+    _report(f'{n} 只横截面打分 + 信号', [
+        ('dict 排序 + 全量信号 (改造前)', ref_ms),
+        ('argsort 打分 (仅排名)', rank_ms),
+        ('argsort + 首尾信号', vec_ms),
+    ])
+
+    expected = [r for r in ref if r[1] != 'hold' or r[0] in include]
+    actual = [(s.stock_code, s.signal, s.confidence, s.expected_return, s.factors) for s in got]
+    ok = actual == expected
+    # 小股票池 (默认 30 只) 的顺序同样一致
+    for size in (3, 4, 5, 30, 31):
+        small = _ref_dividend_signals(scored[:size])
+        sub = {'codes': codes[:size], 'names': codes[:size], 'div_yield': div[:size], 'volatility': vol[:size]}
+        strat.include_codes = set(codes[:size])
+        ok = ok and [(s.stock_code, s.signal, s.confidence, s.expected_return, s.factors)
+                     for s in strat.compute(sub)] == small
+    print(f'  信号 {len(actual)} 条 (首尾 + 指定 {len(include)} 只), 与改造前顺序一致: {ok}')
+    return ok
+
+
+# ═══════════════════════════════════════════
+# 回测 — 5 年 × 300 只日K, 单核秒级
+# ═══════════════════════════════════════════
+BACKTEST_BUDGET = 10.0   # 秒
+
+
+def _synthetic_backtest_data(n, days, seed=11):
+    """几何随机游走日K; 部分股票晚上市 / 随机停牌, 少量 ST"""
+    from backtest.data import BacktestData
+
+    rng = np.random.default_rng(seed)
+    close = 20 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, (n, days)), axis=1))
+    open_ = close * np.exp(rng.normal(0, 0.005, (n, days)))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, (n, days)))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, (n, days)))
+    volume = rng.uniform(1e4, 1e6, (n, days)).round()
+    missing = rng.random((n, days)) < 0.01
+    missing[: n // 10, : days // 4] = True
+    for a in (open_, high, low, close, volume):
+        a[missing] = np.nan
+    dates = np.array([int(d.strftime('%Y%m%d')) for d in
+                      np.arange('2021-01-04', '2031-01-01', dtype='datetime64[D]').astype(object)
+                      if d.weekday() < 5][:days])
+    codes = [f'{600000 + i:06d}' for i in range(n)]
+    names = [f'ST样本{i}' if i % 50 == 7 else f'样本{i}' for i in range(n)]
+    return BacktestData(codes, dates, open_, high, low, close, volume, names=names)
+
+
+def check_backtest(args):
+    _backend_path()
+    from backtest.feed import BacktestFeed
+    from backtest.portfolio import RiskLimits
+    from backtest.runner import run_backtest
+    from strategies.dividend_low_vol import DividendLowVolStrategy
+
+    n, days = min(args.symbols, 300), 1250
+    data = _synthetic_backtest_data(n, days)
+    rng = np.random.default_rng(3)
+    strat = DividendLowVolStrategy(feed=object(),
+                                   dividend_yields=dict(zip(data.codes, np.round(rng.uniform(0, 6, n), 1).tolist())))
+    limits = RiskLimits(max_order_amount=200_000, max_position_ratio=0.1, max_daily_orders=50)
+
+    t0 = time.perf_counter()
+    result = asyncio.run(run_backtest(strat, data, rebalance_every=1, limits=limits, warmup=30))
+    elapsed = time.perf_counter() - t0
+    summary = result.summary()
+    _report(f'{n} 只 × {days} 日回测 (每日调仓)', [('回测总耗时', elapsed * 1000)])
+    print('  ' + ', '.join(f'{k}={summary[k]}' for k in
+                           ('annualReturn', 'sharpe', 'maxDrawdown', 'annualTurnover', 'trades', 'rejected')))
+
+    # 时点指标与实盘流式指标一致
+    feed = BacktestFeed(data)
+    worst = 0.0
+    for i in rng.choice(n, 5, replace=False).tolist():
+        state = indicator_stream.RollingState(0)
+        for t in range(days):
+            if np.isnan(data.close[i, t]):
+                continue
+            state.update(int(data.dates[t]), data.open[i, t], data.high[i, t], data.low[i, t],
+                         data.close[i, t], data.volume[i, t])
+            if t % 7:
+                continue
+            ref = state.values()
+            got = asyncio.run(feed.at(t).indicators(data.codes[i]))
+            for key, v in ref.items():
+                if (v is None) != (got[key] is None):
+                    worst = float('inf')
+                elif v is not None:
+                    worst = max(worst, abs(got[key] - v) / max(abs(v), 1.0))
+    # 组合约束: 现金非负, 整手持仓, ST 不持有
+    p = result.portfolio
+    lots_ok = all(v % limits.lot_size == 0 for v in p.positions.values())
+    st_ok = not any('ST' in data.names[data.index[c]] for c in p.positions)
+    ok = elapsed < BACKTEST_BUDGET and worst < 1e-9 and (p.cash >= -1e-6).all() and lots_ok and st_ok
+    print(f'  指标最大误差 {worst:.2e}, 现金非负 {(p.cash >= -1e-6).all()}, 整手 {lots_ok}, 无 ST {st_ok}')
+    print(f'  耗时 < {BACKTEST_BUDGET:.0f} s 且全部一致: {ok}')
+    return ok
+
+
+def check_sweep(args):
+    _backend_path()
+    from backtest.portfolio import RiskLimits
+    from backtest.runner import run_backtest
+    from backtest.sweep import grid, run_sweep, walk_forward_splits
+    from strategies.dividend_low_vol import DividendLowVolStrategy
+
+    n, days = min(args.symbols, 200), 750
+    data = _synthetic_backtest_data(n, days)
+    rng = np.random.default_rng(5)
+    strat = DividendLowVolStrategy(feed=object(),
+                                   dividend_yields=dict(zip(data.codes, np.round(rng.uniform(0, 6, n), 1).tolist())))
+    limits = RiskLimits(max_order_amount=200_000, max_position_ratio=0.1, max_daily_orders=50)
+    candidates = grid({'yield_weight': [0.3, 0.5, 0.7, 0.9], 'tail_fraction': [0.1, 0.2]})
+    kw = dict(rebalance_every=5, warmup=30, limits=limits)
+
+    # 串行基线: 每组参数单独建数据源, 与改造前的用法一致
+    t0 = time.perf_counter()
+    serial = [asyncio.run(run_backtest(strat.with_params(**p), data, **kw)).summary() for p in candidates]
+    t_serial = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    result = run_sweep(strat, data, candidates, **kw)
+    t_pool = time.perf_counter() - t0
+    _report(f'{n} 只 × {days} 日, {len(candidates)} 组参数扫描', [
+        ('串行', t_serial * 1000), (f'进程池 ({os.cpu_count()} 核)', t_pool * 1000)])
+
+    by_params = {json.dumps(r['params'], sort_keys=True): r for r in result.rows}
+    same = all(
+        by_params[json.dumps(p, sort_keys=True)][m] == ref.get(m)
+        for p, ref in zip(candidates, serial) for m in ('sharpe', 'annualReturn', 'maxDrawdown')
+    )
+    best = result.ranked()[0]
+    print(f'  最优 {best["params"]} sharpe={best["sharpe"]}, 与串行结果一致: {same}')
+
+    splits = walk_forward_splits(days, 250, 125)
+    wf = run_sweep(strat, data, candidates, splits=splits, **kw)
+    for f in wf.folds:
+        print(f'  fold {f["fold"]}: {f["params"]} 训练 sharpe={f["train"]["sharpe"]}'
+              f' → 测试 sharpe={f["test"]["sharpe"]} ({f["testStart"]} ~ {f["testEnd"]})')
+    ok = same and len(wf.folds) == len(splits) == 4
+    print(f'  滚动验证 {len(splits)} 折, 结果一致: {ok}')
+    return ok
+
+
+# ═══════════════════════════════════════════
+# 因子特征库 — 参考实现为各调用方逐只从行情 dict / 指标 dict 推导
+# ═══════════════════════════════════════════
+def _ref_quote_factors(q):
+    chg, pe, pb, turnover = q['changePercent'], q['pe'], q['pb'], q['turnoverRate']
+    amount, high, low, prev = q['amount'], q['high'], q['low'], q['prevClose']
+    return {
+        'momentum': chg, 'pe': pe, 'pb': pb, 'turnover': turnover,
+        'amount_yi': amount / 1e4 if amount > 0 else 0,
+        'amplitude': (high - low) / prev * 100 if prev > 0 and high > 0 and low > 0 else abs(chg) * 1.2,
+        'pe_bucket': 1 if 0 < pe < 20 else 2 if 0 < pe < 40 else 3 if pe > 0 else 0,
+        'pb_bucket': 1 if 0 < pb < 1.5 else 2 if 0 < pb < 3 else 3 if pb > 0 else 0,
+        'turnover_bucket': 2 if turnover > 3 else 1 if turnover > 1 else 0,
+    }
+
+
+def _ref_daily_factors(ind):
+    out = {k: ind[k] for k in ('close', 'volatility', 'bars')}
+    close = ind['close']
+    for w in indicator_stream.MA_WINDOWS:
+        ma = ind[f'ma{w}']
+        out[f'ma{w}'] = ma
+        out[f'ma_pos{w}'] = close / ma - 1 if ma else None
+    out['support_gap'] = close / ind['support'] - 1 if ind['support'] else None
+    out['resistance_gap'] = 1 - close / ind['resistance'] if ind['resistance'] else None
+    return out
+
+
+def _matrix_same(ref_rows, names, got):
+    for i, ref in enumerate(ref_rows):
+        for j, name in enumerate(names):
+            v, g = ref[name], got[i, j]
+            if v is None:
+                if not np.isnan(g):
+                    return False
+            elif not abs(g - v) <= 1e-12 * max(abs(v), 1.0):
+                return False
+    return True
+
+
+def check_features(args):
+    n = args.symbols
+    codes = synthetic_codes(n)
+    frame = aks._parse_tencent_bulk(synthetic_tencent_body(codes))
+    # 下一份快照: 5% 的股票价量变化
+    moved = aks.QuoteFrame(frame.codes, frame.names, frame.values.copy())
+    rows = np.random.default_rng(4).choice(len(frame), max(1, len(frame) // 20), replace=False)
+    moved.values[aks.COL['price'], rows] *= 1.01
+    moved.values[aks.COL['changePercent'], rows] += 1.0
+
+    # 日K: 流式指标状态 (每只 60 根)
+    m = min(n, 500)
+    close, high, low = synthetic_closes(m, 60)
+    close, high, low = (np.where(np.nan_to_num(a) > 0, a, 10.0) for a in (close, high, low))
+    dates = np.arange(60, dtype=np.float64) + 20260101
+    stream = indicator_stream.IndicatorStream()
+    for i in range(m):
+        stream.seed(codes[i], kline_store.KlineBars(np.stack([dates, close[i], close[i], high[i], low[i], np.ones(60)])), 0)
+
+    qnames = list(feature_store.QUOTE_FACTORS)
+    dnames = list(feature_store.DAILY_FACTORS)
+    store = feature_store.FeatureStore()
+
+    def ref_quotes(f):
+        return [_ref_quote_factors(q) for q in f.to_dicts()]
+
+    def ref_daily():
+        return [_ref_daily_factors(stream.values(c)) for c in codes[:m]]
+
+    def refresh(f):
+        store.on_frame(f)
+        store.refresh_daily(codes[:m], 0, lambda c: stream.stamp(c, 0), stream.values)
+        return store.matrix(qnames, codes), store.matrix(dnames, codes[:m])
+
+    ref_ms, (rq, rd) = _bench(lambda: (ref_quotes(moved), ref_daily()), args.rounds)
+    first_ms, _ = _bench(lambda: refresh(frame), 1)
+    incr_ms, (gq, gd) = _bench(lambda: refresh(moved), 1)
+    hit_ms, _ = _bench(lambda: refresh(moved), args.rounds)
+    computed, reused = dict(store.computed), dict(store.reused)
+    _report(f'{len(frame)} 只行情因子 + {m} 只日K因子', [
+        ('逐只从 dict 推导', ref_ms),
+        ('特征库首次计算', first_ms),
+        ('新快照 (5% 变化)', incr_ms),
+        ('同一快照再次读取', hit_ms),
+    ])
+    same = _matrix_same(rq, qnames, gq) and _matrix_same(rd, dnames, gd)
+    # 新快照只重算变化的行, 日K状态不变则全部复用
+    incremental = computed['quote'] == len(frame) + len(rows) and computed['daily'] == m
+    built = feature_store.build_matrix(dnames, codes[:m], None, {c: stream.values(c) for c in codes[:m]})
+    same = same and np.array_equal(built, gd, equal_nan=True)
+    print(f'  重算 {computed}, 复用 {reused}')
+    print(f'  与逐只推导一致: {same}, 增量重算: {incremental}')
+    return same and incremental
+
+
+# ═══════════════════════════════════════════
+# 多因子打分 — 参考实现为逐因子 / 逐只的纯 Python 缩尾、行业去均值与标准化
+# ═══════════════════════════════════════════
+def _ref_factor_scores(raw, groups, weights):
+    n, k = raw.shape
+    ids = {}
+    for g in groups:
+        ids[g] = ids.get(g, 0) + 1
+    group = [g if ids[g] >= factor_model.MIN_GROUP else None for g in groups]
+    z = np.zeros((n, k))
+    for j in range(k):
+        col = raw[:, j].tolist()
+        valid = [v for v in col if v == v]
+        if not valid:
+            continue
+        lo, hi = np.quantile(valid, factor_model.WINSOR_LIMITS).tolist()
+        col = [min(max(v, lo), hi) if v == v else v for v in col]
+        sums, counts = {}, {}
+        for g, v in zip(group, col):
+            if v == v:
+                sums[g] = sums.get(g, 0.0) + v
+                counts[g] = counts.get(g, 0) + 1
+        col = [v - sums[g] / counts[g] if v == v else v for g, v in zip(group, col)]
+        valid = [v for v in col if v == v]
+        mean = sum(valid) / len(valid)
+        std = math.sqrt(sum((v - mean) ** 2 for v in valid) / len(valid))
+        z[:, j] = [(v - mean) / std if v == v and std > 0 else 0.0 for v in col]
+    w = np.array([weights[f] for f in weights])
+    return (z * (w / np.abs(w).sum())).sum(axis=1)
+
+
+def check_multi_factor(args):
+    codes = synthetic_codes(args.symbols)
+    frame = aks._parse_tencent_bulk(synthetic_tencent_body(codes))
+    n = len(frame)
+    sectors = [f'行业{i % 31}' for i in range(n)]
+    weights = factor_model.DEFAULT_WEIGHTS
+    features = feature_store.build_matrix(factor_model.feature_names(weights), frame.codes.tolist(), frame)
+
+    ref_ms, ref = _bench(
+        lambda: _ref_factor_scores(factor_model.raw_factors(features, weights), sectors, weights), 1)
+    vec_ms, scores = _bench(lambda: factor_model.score(features, weights, sectors), args.rounds)
+    now = datetime.now()
+    card_ms, cards = _bench(lambda: aks.build_insights(frame, 'multi_factor', now), args.rounds)
+    _report(f'{n} 只多因子打分 (缩尾 + 行业中性 + z-score)', [
+        ('逐只纯 Python', ref_ms),
+        ('向量化', vec_ms),
+        ('洞察卡片 (含特征库)', card_ms),
+    ])
+    worst = float(np.max(np.abs(scores.score - ref))) if n else 0.0
+    contrib_ok = np.allclose(scores.contributions.sum(axis=1), scores.score)
+    ordered = all(scores.score[a] >= scores.score[b] for a, b in zip(scores.order[:-1], scores.order[1:]))
+    print(f'  最大误差 {worst:.2e}, 贡献之和 = 综合分: {contrib_ok}, 排名有序: {ordered}, 卡片 {len(cards)} 张')
+    return worst < 1e-9 and contrib_ok and ordered and 0 < len(cards) <= 5
+
+
+# ═══════════════════════════════════════════
+# 配对协整 — 参考实现为逐对 corrcoef / polyfit / lstsq
+# ═══════════════════════════════════════════
+def _synthetic_sector_bars(m, t, seed=11):
+    """同一行业 m 只: 共同因子 + 各自的平稳 AR(1) 偏离 (约 1/3 为随机游走偏离, 不协整)"""
+    rng = np.random.default_rng(seed)
+    factor = np.cumsum(rng.normal(0, 0.02, t))
+    noise = np.zeros((m, t))
+    eps = rng.normal(0, 0.006, (m, t))
+    phi = np.where(np.arange(m) % 3 == 0, 1.0, rng.uniform(0.6, 0.9, m))
+    for k in range(1, t):
+        noise[:, k] = phi * noise[:, k - 1] + eps[:, k]
+    logp = rng.uniform(1, 4, m)[:, None] + rng.uniform(0.6, 1.4, m)[:, None] * factor + noise
+    dates = np.arange(t, dtype=np.float64) + 20250101
+    close = np.exp(logp)
+    codes = [f'{600000 + i:06d}' for i in range(m)]
+    return {c: kline_store.KlineBars(np.stack([dates, close[i], close[i], close[i], close[i], np.ones(t)]))
+            for i, c in enumerate(codes)}
+
+
+def _ref_scan_pairs(logp, min_corr=pair_engine.MIN_CORR):
+    rets = np.diff(logp, axis=1)
+    out = {}
+    m, t = logp.shape
+    for i in range(m):
+        for j in range(i + 1, m):
+            corr = np.corrcoef(rets[i], rets[j])[0, 1]
+            if corr < min_corr:
+                continue
+            beta, alpha = np.polyfit(logp[j], logp[i], 1)
+            spread = logp[i] - beta * logp[j] - alpha
+            x = np.column_stack([np.ones(t - 1), spread[:-1]])
+            coef, res, _, _ = np.linalg.lstsq(x, np.diff(spread), rcond=None)
+            phi = coef[1]
+            lag_c = spread[:-1] - spread[:-1].mean()
+            se = math.sqrt(res[0] / (t - 3) / (lag_c @ lag_c))
+            half_life = -math.log(2) / math.log1p(phi) if -1 < phi < 0 else float('inf')
+            if (phi / se <= pair_engine.ADF_CRITICAL and 1 <= half_life <= pair_engine.MAX_HALF_LIFE
+                    and beta > 0 and spread.std() > 0):
+                out[(i, j)] = (corr, beta, alpha, phi / se, half_life)
+    return out
+
+
+def check_pairs(args):
+    m = min(args.symbols, 300)
+    t = pair_engine.PAIR_LOOKBACK
+    bars = _synthetic_sector_bars(m, t)
+    codes, _, logp = pair_engine.align_log_prices(bars, t)
+
+    ref_ms, ref = _bench(lambda: _ref_scan_pairs(logp), 1)
+    vec_ms, (I, J, stats) = _bench(lambda: pair_engine.scan_pairs(logp), args.rounds)
+    big = _synthetic_sector_bars(2000, t, seed=12)
+    _, _, big_logp = pair_engine.align_log_prices(big, t)
+    big_ms, (bI, _, _) = _bench(lambda: pair_engine.scan_pairs(big_logp), 1)
+    _report(f'同行业配对扫描 ({t} 日)', [
+        (f'逐对回归 ({m} 只, {m * (m - 1) // 2} 对)', ref_ms),
+        (f'Gram 矩阵批量 ({m} 只)', vec_ms),
+        (f'Gram 矩阵批量 (2000 只, {2000 * 1999 // 2} 对)', big_ms),
+    ])
+    got = {(i, j): tuple(stats[f][k] for f in ('corr', 'beta', 'alpha', 'adf_t', 'half_life'))
+           for k, (i, j) in enumerate(zip(I.tolist(), J.tolist()))}
+    same = set(got) == set(ref) and all(np.allclose(got[p], ref[p], rtol=1e-7) for p in ref)
+
+    # 增量: 日K不变的行业不重扫, 只有改动行业重扫
+    book = pair_engine.PairBook()
+    half = {c: b for k, (c, b) in enumerate(bars.items()) if k < 60}
+    sectors = {c: ('甲' if k < 30 else '乙') for k, c in enumerate(half)}
+    first = book.update(half, sectors)
+    again = book.update(half, sectors)
+    code = next(iter(half))
+    extended = half[code].data.copy()
+    extended[0, -1] += 1
+    changed = book.update({**half, code: kline_store.KlineBars(extended)}, sectors)
+    incremental = (first, again, changed) == (2, 0, 1)
+
+    # 实时 z 值: 以最后一根收盘价为行情时等于窗口末端价差 / 标准差
+    frame = aks.QuoteFrame.from_dicts([{'code': c, 'name': c, 'price': float(half[c].close[-1])} for c in half])
+    live = book.live(frame)
+    live_ok = bool(live) and all(abs(r['z'] - r['last_spread'] / r['spread_std']) < 1e-9 for r in live)
+    print(f'  配对 {len(ref)} / 2000 只 {len(bI)}, 与逐对回归一致: {same}, '
+          f'增量重扫 {first}/{again}/{changed}: {incremental}, 实时 z: {live_ok} ({len(live)} 对)')
+    return same and incremental and live_ok
+
+
+CHECKS = {
+    'parser': check_parser,
+    'indicators': check_indicators,
+    'stream': check_stream,
+    'loop_lag': check_loop_lag,
+    'dividend_rank': check_dividend_rank,
+    'backtest': check_backtest,
+    'sweep': check_sweep,
+    'features': check_features,
+    'multi_factor': check_multi_factor,
+    'pairs': check_pairs,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='数据层性能基准 / 等价性校验')
+    parser.add_argument('check', choices=sorted(CHECKS) + ['all'])
+    parser.add_argument('--rounds', type=int, default=5, help='每项重复次数, 取最快')
+    parser.add_argument('--symbols', type=int, default=5000, help='合成数据的股票数')
+    parser.add_argument('--payload', help='录制的腾讯批量行情响应体 (原始 bytes)')
+    args = parser.parse_args(argv)
+
+    names = sorted(CHECKS) if args.check == 'all' else [args.check]
+    ok = True
+    try:
+        for name in names:
+            ok = CHECKS[name](args) and ok
+    finally:
+        _close_backend()
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
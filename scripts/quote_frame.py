@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+列式行情快照 — 每个字段一列 NumPy 数组
+解析器直接写入预分配数组; 洞察/预警按列向量化筛选, 只对命中的行生成 dict
+"""
+import numpy as np
+
+# 数值列, 顺序与行情 dict 的键顺序一致
+FIELDS = (
+    'price', 'change', 'changePercent', 'volume', 'amount', 'high', 'low',
+    'open', 'prevClose', 'turnover', 'pe', 'pb',
+)
+# 列名 → 行情 dict 键 (API 响应沿用 turnoverRate)
+DICT_KEYS = ('code', 'name') + tuple('turnoverRate' if f == 'turnover' else f for f in FIELDS)
+COL = {f: i for i, f in enumerate(FIELDS)}
+_VOLUME = COL['volume']
+
+
+class QuoteFrame:
+    """一次行情快照: codes / names 为 object 数组, 数值列存于 values[len(FIELDS), n]
+
+    构建完成后视为只读, to_dicts() 结果会被缓存。
+    """
+    __slots__ = ('codes', 'names', 'values', '_dicts', '_index')
+
+    def __init__(self, codes, names, values):
+        self.codes = codes
+        self.names = names
+        self.values = values
+        self._dicts = None
+        self._index = None
+
+    @classmethod
+    def empty(cls, n):
+        """预分配 n 行, 由解析器逐行/逐列填充后 truncate"""
+        return cls(np.empty(n, dtype=object), np.empty(n, dtype=object),
+                   np.zeros((len(FIELDS), n), dtype=np.float64))
+
+    @classmethod
+    def from_dicts(cls, quotes):
+        """由行情 dict 列表构建 (兼容旧数据源)"""
+        n = len(quotes)
+        frame = cls.empty(n)
+        for i, q in enumerate(quotes):
+            frame.codes[i] = q['code']
+            frame.names[i] = q['name']
+            frame.values[:, i] = [q.get(k, 0) or 0 for k in DICT_KEYS[2:]]
+        return frame
+
+    @classmethod
+    def concat(cls, frames):
+        frames = [f for f in frames if len(f)]
+        if not frames:
+            return cls.empty(0)
+        if len(frames) == 1:
+            return frames[0]
+        return cls(np.concatenate([f.codes for f in frames]),
+                   np.concatenate([f.names for f in frames]),
+                   np.concatenate([f.values for f in frames], axis=1))
+
+    def truncate(self, n):
+        """丢弃预分配多余的行"""
+        if n == len(self.codes):
+            return self
+        return QuoteFrame(self.codes[:n].copy(), self.names[:n].copy(),
+                          np.ascontiguousarray(self.values[:, :n]))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getattr__(self, name):
+        # frame.price / frame.changePercent ... → 对应列 (视图)
+        try:
+            return self.values[COL[name]]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def take(self, idx):
+        """按下标 / 布尔掩码取子集"""
+        return QuoteFrame(self.codes[idx], self.names[idx], self.values[:, idx])
+
+    def index_of(self, code):
+        """代码 → 行号, 不存在返回 None"""
+        if self._index is None:
+            self._index = {c: i for i, c in enumerate(self.codes.tolist())}
+        return self._index.get(code)
+
+    def to_dicts(self):
+        """转为行情 dict 列表 (API 响应格式), 结果缓存"""
+        if self._dicts is None:
+            cols = [col.tolist() for col in self.values]
+            cols[_VOLUME] = self.values[_VOLUME].astype(np.int64).tolist()
+            rows = zip(self.codes.tolist(), self.names.tolist(), *cols)
+            self._dicts = [dict(zip(DICT_KEYS, r)) for r in rows]
+        return self._dicts
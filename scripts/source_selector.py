@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+延迟感知的数据源选择 — 腾讯 / 新浪对冲请求
+按数据源记录滚动延迟与错误率; 主源在分位数截止时间内未返回时向备源发出对冲请求, 取先成功者
+主源近期错误率过高时自动与备源对调
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+WINDOW = 100              # 滚动窗口 (请求数)
+HEDGE_PERCENTILE = 0.9    # 截止时间 = 主源成功延迟的 P90
+MIN_DEADLINE = 0.2        # 秒
+MAX_DEADLINE = 3.0
+DEFAULT_DEADLINE = 1.0    # 样本不足时
+MIN_SAMPLES = 5
+DEMOTE_ERROR_RATE = 0.5   # 主源错误率达到该值且高于备源时对调
+HEDGE_WORKERS = 8
+
+_executor = None
+_executor_lock = threading.Lock()
+_registry = {}
+
+
+class RejectedResult(ValueError):
+    """数据源返回了不可用的结果 (如空行情)"""
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='hedge')
+        return _executor
+
+
+class SourceStats:
+    """单个数据源的滚动延迟 / 错误率"""
+
+    def __init__(self, window=WINDOW):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)  # 成功请求耗时 (秒)
+        self._outcomes = deque(maxlen=window)   # True=成功
+        self.requests = 0
+        self.errors = 0
+        self.wins = 0      # 作为最终结果被采用的次数
+        self.hedged = 0    # 作为主源时触发对冲的次数
+
+    def record(self, elapsed, ok):
+        with self._lock:
+            self.requests += 1
+            self._outcomes.append(ok)
+            if ok:
+                self._latencies.append(elapsed)
+            else:
+                self.errors += 1
+
+    def count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def samples(self):
+        with self._lock:
+            return len(self._latencies)
+
+    def percentile(self, p):
+        with self._lock:
+            data = sorted(self._latencies)
+        if not data:
+            return None
+        return data[min(len(data) - 1, int(p * len(data)))]
+
+    def error_rate(self):
+        with self._lock:
+            return self._error_rate()
+
+    def _error_rate(self):
+        n = len(self._outcomes)
+        return (n - sum(self._outcomes)) / n if n else 0.0
+
+    def snapshot(self):
+        p50, p90, p99 = (self.percentile(p) for p in (0.5, 0.9, 0.99))
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'wins': self.wins,
+                'hedged': self.hedged,
+                'errorRate': round(self._error_rate(), 4),
+                'p50Ms': round(p50 * 1000, 1) if p50 is not None else None,
+                'p90Ms': round(p90 * 1000, 1) if p90 is not None else None,
+                'p99Ms': round(p99 * 1000, 1) if p99 is not None else None,
+            }
+
+
+class HedgedSelector:
+    """主 / 备两个数据源的对冲调用; 同步走线程池, 协程走 asyncio.wait"""
+
+    def __init__(self, name, sources, percentile=HEDGE_PERCENTILE):
+        self.name = name
+        self.sources = tuple(sources)
+        self.percentile = percentile
+        self.stats = {s: SourceStats() for s in self.sources}
+        _registry[name] = self
+
+    def order(self):
+        """主源在前; 主源近期错误率过高且备源更好时对调"""
+        primary, secondary = self.sources
+        p_err = self.stats[primary].error_rate()
+        if p_err >= DEMOTE_ERROR_RATE and self.stats[secondary].error_rate() < p_err:
+            return secondary, primary
+        return primary, secondary
+
+    def deadline(self, source):
+        """对冲截止时间 (秒): 该源成功延迟的分位数, 限制在 [MIN, MAX]"""
+        st = self.stats[source]
+        if st.samples() < MIN_SAMPLES:
+            return DEFAULT_DEADLINE
+        return min(MAX_DEADLINE, max(MIN_DEADLINE, st.percentile(self.percentile)))
+
+    def _plan(self, fns):
+        order = [s for s in self.order() if s in fns]
+        if not order:
+            raise ValueError(f'{self.name}: 无可用数据源')
+        return order
+
+    def _run(self, source, fn, accept):
+        t0 = time.perf_counter()
+        try:
+            result = fn()
+            if accept is not None and not accept(result):
+                raise RejectedResult(f'{source}: 结果不可用')
+        except Exception:
+            self.stats[source].record(time.perf_counter() - t0, False)
+            raise
+        self.stats[source].record(time.perf_counter() - t0, True)
+        return result
+
+    def call(self, fns, accept=None):
+        """同步对冲调用: fns 为 {数据源: 无参函数}, 返回 (结果, 数据源)
+
+        主源失败时立即切备源; 全部失败抛出最后一个异常。落败的请求在后台完成并计入统计。
+        """
+        order = self._plan(fns)
+        pool = _get_executor()
+        pending = {}
+        launched = []
+
+        def launch(source):
+            launched.append(source)
+            pending[pool.submit(self._run, source, fns[source], accept)] = source
+
+        launch(order[0])
+        deadline = time.monotonic() + self.deadline(order[0])
+        error = None
+        while pending:
+            can_hedge = len(launched) < len(order)
+            timeout = max(0.0, deadline - time.monotonic()) if can_hedge else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                self.stats[order[0]].count('hedged')
+                launch(order[len(launched)])
+                continue
+            for fut in done:
+                source = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    error = e
+                    continue
+                self.stats[source].count('wins')
+                return result, source
+            if not pending and len(launched) < len(order):
+                launch(order[len(launched)])
+        raise error
+
+    async def acall(self, fns, accept=None):
+        """协程版对冲调用: fns 为 {数据源: 无参协程函数}, 返回 (结果, 数据源); 落败请求被取消"""
+        order = self._plan(fns)
+        pending = {}
+        launched = []
+
+        async def run(source):
+            t0 = time.perf_counter()
+            try:
+                result = await fns[source]()
+                if accept is not None and not accept(result):
+                    raise RejectedResult(f'{source}: 结果不可用')
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats[source].record(time.perf_counter() - t0, False)
+                raise
+            self.stats[source].record(time.perf_counter() - t0, True)
+            return result
+
+        def launch(source):
+            launched.append(source)
+            pending[asyncio.ensure_future(run(source))] = source
+
+        launch(order[0])
+        deadline = time.monotonic() + self.deadline(order[0])
+        error = None
+        try:
+            while pending:
+                can_hedge = len(launched) < len(order)
+                timeout = max(0.0, deadline - time.monotonic()) if can_hedge else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.stats[order[0]].count('hedged')
+                    launch(order[len(launched)])
+                    continue
+                for task in done:
+                    source = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    self.stats[source].count('wins')
+                    return result, source
+                if not pending and len(launched) < len(order):
+                    launch(order[len(launched)])
+        finally:
+            for task in pending:
+                task.cancel()
+        raise error
+
+    def snapshot(self):
+        return {
+            'order': list(self.order()),
+            'deadlineMs': {s: round(self.deadline(s) * 1000, 1) for s in self.sources},
+            'sources': {s: st.snapshot() for s, st in self.stats.items()},
+        }
+
+
+def all_stats():
+    """所有选择器的数据源统计"""
+    return {name: sel.snapshot() for name, sel in _registry.items()}
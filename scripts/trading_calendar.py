@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+A股交易时段判断 — 本地存储决定何时向上游增量刷新
+不含节假日表: 节假日按工作日处理, 最多多抓几根已有数据
+"""
+from datetime import timedelta
+
+
+def in_session(now):
+    """交易时段 (工作日 9:15-15:00, 午休也算在内)"""
+    if now.weekday() >= 5:
+        return False
+    minutes = now.hour * 60 + now.minute
+    return 9 * 60 + 15 <= minutes < 15 * 60
+
+
+def is_settled(now):
+    """当日数据是否已定稿 (收盘后或周末)"""
+    return now.weekday() >= 5 or now.hour >= 15
+
+
+def weekdays_between(start, end):
+    """start (不含) 到 end (含) 之间的工作日数"""
+    n = 0
+    d = start + timedelta(days=1)
+    while d <= end:
+        if d.weekday() < 5:
+            n += 1
+        d += timedelta(days=1)
+    return n
+
+
+def session_opened(now):
+    """当日已开盘 (工作日 9:15 之后, 含收盘后); 此时行情快照代表当日K线"""
+    return now.weekday() < 5 and now.hour * 60 + now.minute >= 9 * 60 + 15
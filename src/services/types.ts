@@ -369,6 +369,14 @@ export interface StrategyInsight {
   analystViews: AnalystView[];
   signal: 'bullish' | 'bearish' | 'neutral';
   keyMetrics?: Record<string, string>;
+  factorContributions?: FactorContribution[];  // 多因子: 各因子 z 值与加权贡献
+}
+
+export interface FactorContribution {
+  factor: string;
+  label: string;
+  z: number;
+  contribution: number;
 }
 
 // === 多周期趋势预测 ===